@@ -0,0 +1,90 @@
+class _DeviceAdapters(object):
+    __slots__ = ('rssi', 'seen', 'pinned', 'payload', 'payload_time')
+
+    def __init__(self):
+        self.rssi: dict = {}  # adapter -> smoothed rssi
+        self.seen: dict = {}  # adapter -> last time the device was heard
+        self.pinned: str = None
+        self.payload: bytes = None
+        self.payload_time: float = 0.0
+
+
+class AdapterSelector(object):
+    """
+    Picks, for each device, the adapter hearing it with the best signal, so that frames heard by several adapters are
+    processed once.
+
+    Signal strength is smoothed per device and adapter. A device is pinned to its best adapter: another adapter only
+    takes over when its signal is better by more than 'hysteresis' dB, or when the pinned adapter did not hear the
+    device for 'failover' seconds. Frames from other adapters are dropped, as well as frames identical to the last
+    accepted one of the device within 'window' seconds, which covers adapter switches.
+    """
+
+    def __init__(self, window: float, hysteresis: float, failover: float, smoothing: float = 0.25):
+        self.window: float = window
+        self.hysteresis: float = hysteresis
+        self.failover: float = failover
+        self.smoothing: float = smoothing
+        self.duplicates: int = 0  # Frames already accepted from another adapter
+        self.suppressed: int = 0  # Frames from adapters the device is not pinned to
+        self.switches: int = 0    # Pinned adapter changes
+        self._devices: dict = {}
+
+    def accept(self, key, adapter: str, payload: bytes, rssi: int, now: float) -> bool:
+        """
+        Record the frame reception and tell whether it should be processed.
+        """
+        if (device := self._devices.get(key, None)) is None:
+            device = self._devices[key] = _DeviceAdapters()
+
+        rssi = -127 if rssi is None else rssi
+        smoothed = device.rssi.get(adapter, None)
+        device.rssi[adapter] = rssi if smoothed is None else smoothed + self.smoothing * (rssi - smoothed)
+        device.seen[adapter] = now
+
+        if device.pinned is None:
+            device.pinned = adapter
+        elif device.pinned != adapter:
+            if (now - device.seen.get(device.pinned, 0.0) > self.failover
+                    or device.rssi[adapter] > device.rssi.get(device.pinned, -127) + self.hysteresis):
+                device.pinned = adapter
+                self.switches += 1
+            else:
+                self.suppressed += 1
+                return False
+
+        if payload == device.payload and now < device.payload_time + self.window:
+            self.duplicates += 1
+            return False
+        device.payload = payload
+        device.payload_time = now
+        return True
+
+    def pinned(self, key) -> str:
+        if (device := self._devices.get(key, None)) is None:
+            return None
+        return device.pinned
+
+    def forget_adapter(self, adapter: str):
+        """
+        Drop all records of a removed adapter, devices pinned to it are pinned again on their next frame.
+        """
+        for device in self._devices.values():
+            device.rssi.pop(adapter, None)
+            device.seen.pop(adapter, None)
+            if device.pinned == adapter:
+                device.pinned = None
+
+    def discard(self, key):
+        self._devices.pop(key, None)
+
+    def prune(self, now: float):
+        """
+        Remove devices not heard by any adapter for the failover period, they would be pinned again anyway.
+        """
+        for key in [key for key, device in self._devices.items()
+                    if now - max(device.seen.values(), default=0.0) > self.failover]:
+            del self._devices[key]
+
+    def __len__(self):
+        return len(self._devices)
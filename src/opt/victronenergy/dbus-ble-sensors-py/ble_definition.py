@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+import pickle
+import logging
+from ve_types import VeDataBasicType
+from ble_model import HOOK_KEYS
+from conf import PROCESS_NAME, DATA_DIR, DEFINITION_CACHE_DIR
+
+# Bumped on changes of the compiled definition structure, invalidating cached definitions
+DEFINITION_FORMAT = 3
+
+# Keys of a definition file which are not device info fields, cf. BleDevice
+_DEFINITION_KEYS = ('class_name', 'description', 'manufacturer_ids', 'length', 'min_length', 'discriminator',
+                    'mac_echo_offset', 'model', 'models')
+# Keys of a reg, cf. BleDevice
+_REG_KEYS = ('name', 'type', 'offset', 'bits', 'shift', 'scale', 'bias', 'flags', 'xlate', 'inval', 'roles')
+# Info fields which are integers, possibly written as hexadecimal strings
+_INT_KEYS = ('manufacturer_id', 'product_id')
+
+
+def _to_int(value: object, where: str) -> int:
+    if isinstance(value, str):
+        try:
+            return int(value, 0)
+        except ValueError:
+            pass
+    elif isinstance(value, int) and not isinstance(value, bool):
+        return value
+    raise ValueError(f"{where} must be an integer, got {value!r}")
+
+
+def _to_type(value: object, where: str) -> VeDataBasicType:
+    try:
+        return VeDataBasicType[value]
+    except (KeyError, TypeError):
+        raise ValueError(f"{where} has unknown type {value!r}") from None
+
+
+def _compile_reg(reg: dict, where: str) -> dict:
+    if not isinstance(reg, dict):
+        raise ValueError(f"{where} must be an object")
+    where = f"{where} {reg.get('name', '')!r}"
+    unknown = [key for key in reg if key not in _REG_KEYS]
+    if unknown:
+        raise ValueError(f"{where} has unknown keys {unknown!r}")
+    reg = dict(reg)
+    reg['type'] = _to_type(reg.get('type', None), where)
+    for key in ['offset', 'bits', 'shift', 'inval']:
+        if key in reg:
+            reg[key] = _to_int(reg[key], f"{where} {key!r}")
+    if 'xlate' in reg and not isinstance(reg['xlate'], str):
+        raise ValueError(f"{where} 'xlate' must be a method name")
+    return reg
+
+
+def _compile_info(info: dict, where: str) -> dict:
+    info = dict(info)
+    for key in _INT_KEYS:
+        if key in info:
+            info[key] = _to_int(info[key], f"{where} {key!r}")
+    for list_key, hook_key in HOOK_KEYS.items():
+        if list_key not in info:
+            continue
+        if not isinstance(info[list_key], list):
+            raise ValueError(f"{where} {list_key!r} must be a list")
+        if list_key == 'regs':
+            info[list_key] = [_compile_reg(reg, f"{where} reg") for reg in info[list_key]]
+        for item in info[list_key]:
+            if not isinstance(item, dict):
+                raise ValueError(f"{where} {list_key!r} items must be objects")
+            if hook_key in item and not isinstance(item[hook_key], str):
+                raise ValueError(f"{where} {list_key!r} {hook_key!r} must be a method name")
+    if 'settings' in info:
+        info['settings'] = [dict(setting) for setting in info['settings']]
+        for setting in info['settings']:
+            if isinstance(props := setting.get('props', None), dict) and 'type' in props:
+                setting['props'] = dict(props, type=_to_type(props['type'], f"{where} setting {setting.get('name', '')!r}"))
+    return info
+
+
+def compile_definition(source: dict, where: str = 'definition') -> dict:
+    """
+    Validate and normalize a device definition, as read from its JSON file:
+    - 'manufacturer_id' : mandatory, ble manufacturer id,
+    - 'manufacturer_ids': all ble manufacturer ids of the devices, if they use several,
+    - 'class_name'      : name of the class created for definitions without Python module,
+    - 'length'          : manufacturer data length, if fixed,
+    - 'min_length'      : manufacturer data minimum length,
+    - 'discriminator'   : list of {'offset', 'value', 'mask'} bytes the manufacturer data must match,
+    - 'mac_echo_offset' : offset of the 3 last bytes of the mac address in the manufacturer data, if they are,
+    - 'model'           : reg giving the model key, all devices share a single model if not defined,
+    - 'models'          : model keys, as strings, to device info fields specific to the model, other models being
+                          ignored before configuration if the 'model' reg is a single byte,
+    - other keys are device info fields, cf. BleDevice, types being names and methods being device class method names.
+    Integers can be written as hexadecimal strings, i.e. "0x02E1".
+    """
+    if not isinstance(source, dict):
+        raise ValueError(f"{where} must be an object")
+    if 'manufacturer_id' not in source:
+        raise ValueError(f"{where} 'manufacturer_id' is missing")
+    if (length := source.get('length', None)) is not None:
+        length = _to_int(length, f"{where} 'length'")
+    min_length = _to_int(source.get('min_length', None) or 0, f"{where} 'min_length'")
+    discriminator = []
+    for byte in source.get('discriminator', None) or []:
+        if not isinstance(byte, dict):
+            raise ValueError(f"{where} discriminator items must be objects")
+        discriminator.append((_to_int(byte.get('offset', None), f"{where} discriminator 'offset'"),
+                              _to_int(byte.get('mask', 0xff), f"{where} discriminator 'mask'"),
+                              _to_int(byte.get('value', None), f"{where} discriminator 'value'")))
+    if (mac_echo_offset := source.get('mac_echo_offset', None)) is not None:
+        mac_echo_offset = _to_int(mac_echo_offset, f"{where} 'mac_echo_offset'")
+    if (manufacturer_ids := source.get('manufacturer_ids', None)) is not None:
+        if not isinstance(manufacturer_ids, list) or not manufacturer_ids:
+            raise ValueError(f"{where} 'manufacturer_ids' must be a non empty list")
+        manufacturer_ids = tuple(_to_int(man_id, f"{where} 'manufacturer_ids'") for man_id in manufacturer_ids)
+    # Discriminator and mac address bytes must be within the manufacturer data
+    min_length = max([min_length] + [offset + 1 for offset, _, _ in discriminator]
+                     + ([] if mac_echo_offset is None else [mac_echo_offset + 3]))
+    if length is not None and length < min_length:
+        raise ValueError(f"{where} discriminator or mac address bytes are past 'length'")
+
+    models = {}
+    for key, model_info in (source.get('models', None) or {}).items():
+        if not isinstance(model_info, dict):
+            raise ValueError(f"{where} model {key!r} must be an object")
+        models[_to_int(key, f"{where} model key")] = _compile_info(model_info, f"{where} model {key!r}")
+    model = source.get('model', None)
+    if model is not None:
+        model = _compile_reg(dict(model, name='model'), f"{where} model")
+        if not model['type'].is_int():
+            raise ValueError(f"{where} model reg must be an integer")
+    elif models:
+        raise ValueError(f"{where} 'models' need a 'model' reg")
+    # Known models of a single byte model reg are a discriminator too
+    model_byte = None
+    if models and model['type'] == VeDataBasicType.VE_UN8 and not any(key in model for key in ['scale', 'bias', 'xlate']):
+        shift = model.get('shift', 0)
+        mask = (1 << model.get('bits', 8)) - 1
+        if shift + mask.bit_length() <= 8:
+            model_byte = (model['offset'], mask << shift, tuple(sorted(key << shift for key in models if 0 <= key <= mask)))
+            min_length = max(min_length, model['offset'] + 1)
+
+    info = _compile_info({key: value for key, value in source.items() if key not in _DEFINITION_KEYS}, where)
+    return {
+        'format': DEFINITION_FORMAT,
+        'class_name': source.get('class_name', None),
+        'manufacturer_id': info['manufacturer_id'],
+        'manufacturer_ids': manufacturer_ids,
+        'length': length,
+        'min_length': min_length,
+        'discriminator': tuple(discriminator),
+        'mac_echo_offset': mac_echo_offset,
+        'model_byte': model_byte,
+        'model': model,
+        'models': models,
+        'info': info,
+    }
+
+
+def get_hooks(definition: dict) -> set:
+    """
+    Names of the device class methods a compiled definition refers to.
+    """
+    hooks = set()
+    for info in [definition['info']] + list(definition['models'].values()):
+        for list_key, hook_key in HOOK_KEYS.items():
+            hooks.update(item[hook_key] for item in info.get(list_key, []) if hook_key in item)
+    return hooks
+
+
+def _get_cache_paths(file_path: str) -> list:
+    """
+    Cache paths of a definition file, preferred first: XDG_CACHE_HOME or the data partition, as the code directory is
+    read-only on Venus OS, then next to the definition file, as Python does for compiled modules.
+    """
+    directory, filename = os.path.split(os.path.abspath(file_path))
+    cache_dirs = []
+    if (cache_home := os.environ.get('XDG_CACHE_HOME', None)):
+        cache_dirs.append(os.path.join(cache_home, PROCESS_NAME))
+    elif os.path.isdir(DATA_DIR):
+        cache_dirs.append(DEFINITION_CACHE_DIR)
+    cache_dirs.append(os.path.join(directory, '__pycache__'))
+    return [os.path.join(cache_dir, f"{filename}.pickle") for cache_dir in cache_dirs]
+
+
+def _write_cache(cache_path: str, cached: tuple) -> bool:
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(f"{cache_path}.tmp", 'wb') as file:
+            pickle.dump(cached, file)
+        os.replace(f"{cache_path}.tmp", cache_path)
+        return True
+    except Exception as e:
+        logging.debug(f"Can not write device definition cache {cache_path!r}: {e!r}")
+        try:
+            os.remove(f"{cache_path}.tmp")
+        except OSError:
+            pass
+        return False
+
+
+def load_definition(file_path: str) -> dict:
+    """
+    Compiled definition of a JSON device definition file, from its cache when it is up to date.
+    """
+    stat = os.stat(file_path)
+    # Pickles of another Python version may not load, or not the same way. Cache directories are shared by definition
+    # files of any directory.
+    stamp = (DEFINITION_FORMAT, sys.implementation.cache_tag, os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    cache_paths = _get_cache_paths(file_path)
+    for cache_path in cache_paths:
+        try:
+            with open(cache_path, 'rb') as file:
+                cached_stamp, definition = pickle.load(file)
+            if cached_stamp == stamp:
+                return definition
+        except OSError:
+            pass  # No readable cache
+        except Exception as e:
+            logging.warning(f"Ignoring device definition cache {cache_path!r}: {e!r}")
+
+    with open(file_path, 'r', encoding='utf-8') as file:
+        try:
+            source = json.load(file)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{file_path!r} is not valid JSON: {e}") from None
+    definition = compile_definition(source, repr(file_path))
+
+    # The cache is optional, i.e. read-only file systems
+    for cache_path in cache_paths:
+        if _write_cache(cache_path, (stamp, definition)):
+            break
+    return definition
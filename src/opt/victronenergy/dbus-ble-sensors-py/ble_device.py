@@ -4,9 +4,17 @@ import inspect
 import logging
 import importlib.util
 from functools import partial
+from collections import ChainMap
 from dbus_ble_service import DbusBleService
 from dbus_role_service import DbusRoleService
 from ble_role import BleRole
+from ble_regs import RegsPlan, get_reg_roles
+from ble_model import ModelDefinition
+from ble_definition import load_definition, get_hooks
+from device_index import DeviceClassIndex, get_specificity
+from frame_validator import FrameValidator
+from hot_log import HOT_LOG
+from conf import LOOKUP_TABLES_MAX
 from ve_types import *
 
 
@@ -16,20 +24,83 @@ class BleDevice(object):
 
     Children class:
         - must overload class variable 'MANUFACTURER_ID' and 'configure' method with self.info.update
-    method to overload entries as described in code.
+    method to overload entries as described in code, or class variable 'DEFINITION_FILE'.
         - can overload 'update_data' method to add post parsing custom logic
+        - should overload 'get_model_key' method so that devices of a same model share their configuration
     """
 
     MANUFACTURER_ID = None  # To be overloaded in children classes: int, ble manufacturer id
-
-    # Dict of devices classes, key is manufacturer id
+    MANUFACTURER_IDS = None  # Optional overload, tuple of all manufacturer ids of the class, (MANUFACTURER_ID,) if None
+
+    # Optional overloads, cheap discriminators selecting the class among the ones of a manufacturer id without
+    # configuring devices, cf. device_index.py. Manufacturer data not matching them is ignored.
+    DATA_LENGTHS = None  # Tuple of manufacturer data lengths, any length if None
+    MIN_DATA_LENGTH = 0  # Manufacturer data minimum length
+    DISCRIMINATOR = ()  # Tuple of (offset, mask, value) of manufacturer data bytes, (byte & mask) must equal value
+    MAC_ECHO_OFFSET = None  # Offset of the 3 last bytes of the mac address in manufacturer data, if it has them
+    MODEL_BYTE = None  # (offset, mask, values) of the model byte, (byte & mask) must be one of the values
+    # Optional overload, True to check manufacturer data with the hand-written 'check_frame' of the class instead of
+    # its compiled discriminators, cf. check_manufacturer_data
+    HAND_WRITTEN_CHECK = False
+
+    # Optional overload, JSON device definition file, cf. ble_definition.py, relative to this file directory. It gives
+    # MANUFACTURER_ID and default 'configure', 'get_model_key' and 'check_manufacturer_data' methods.
+    DEFINITION_FILE = None
+    DEFINITION = None  # Compiled DEFINITION_FILE
+
+    # Optional overload, default minimum number of seconds between two processed frames, 0 to process them all.
+    # Can be overridden globally or per device through com.victronenergy.ble settings.
+    PROCESS_INTERVAL = 0
+
+    # Dict of devices classes lists, most specific first, key is manufacturer id
     DEVICE_CLASSES = {}
+    # Device class selection index, cf. device_index.py
+    DEVICE_INDEX = DeviceClassIndex(DEVICE_CLASSES)
+    # Incremented on each classes load, allows caches depending on device classes to be invalidated
+    CLASSES_GENERATION = 0
+    # Lookup tables shared by all devices, cf. lookup_table
+    LOOKUP_TABLES = {}
+    # Configurations shared by devices of a same model, key is (device class, model key), cf. load_model
+    MODEL_DEFINITIONS = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if (definition_file := cls.__dict__.get('DEFINITION_FILE', None)) is None:
+            return
+        definition_file = os.path.join(os.path.dirname(__file__), definition_file)
+        cls.DEFINITION = definition = load_definition(definition_file)
+        if 'MANUFACTURER_ID' not in cls.__dict__:
+            cls.MANUFACTURER_ID = definition['manufacturer_id']
+        if 'MANUFACTURER_IDS' not in cls.__dict__ and definition['manufacturer_ids'] is not None:
+            cls.MANUFACTURER_IDS = definition['manufacturer_ids']
+        cls.DATA_LENGTHS = None if definition['length'] is None else (definition['length'],)
+        cls.MIN_DATA_LENGTH = definition['min_length']
+        cls.DISCRIMINATOR = definition['discriminator']
+        cls.MAC_ECHO_OFFSET = definition['mac_echo_offset']
+        cls.MODEL_BYTE = definition['model_byte']
+        for hook in get_hooks(cls.DEFINITION):
+            if not callable(getattr(cls, hook, None)):
+                raise ValueError(f"{definition_file!r} refers to method {hook!r} which {cls.__name__!r} does not have")
+            # Shared by all devices of a model, cf. ModelDefinition
+            if not isinstance(inspect.getattr_static(cls, hook), (staticmethod, classmethod)):
+                raise ValueError(
+                    f"{definition_file!r} refers to method {hook!r} which must be a static or class method of {cls.__name__!r}")
 
     def __init__(self, dev_mac: str):
         self._role_services: dict = {}
         self._plog: str = None
+        self.process_interval: float = self.PROCESS_INTERVAL
+        self._registered: bool = False
+        self.enabled: bool = False  # Latest known enabled state, refreshed on each processed frame
+        self.adapter: str = None  # Adapter the device frames are processed from
+        self._regs_plan: RegsPlan = None  # Compiled 'regs' configuration, cf. _load_configuration
+        self._enabled_roles: set = None  # Roles the regs plan is specialized to, None for all roles
+        self._model: ModelDefinition = None  # Shared configuration, None if configured on its own, cf. load_model
+        self._frame_validator: FrameValidator = None  # Compiled discriminators, cf. check_manufacturer_data
 
         # Mandatory fields must be overloaded by subclasses, optional ones can be left as is.
+        # Once the device shares the definition of its model, cf. load_model, this is a read-only view of it, lists
+        # being tuples and dicts mappings proxies, and methods referenced by its fields must be static or class methods.
         self.info = {
             'dev_mac': dev_mac,         # Internal
             'product_id': 0x0000,       # Mandatory, int, custom product id. As no product ID list exists, invent one.
@@ -47,10 +118,15 @@ class BleDevice(object):
                                         # - shift  : bit offset, in case the data is not "byte aligned"
                                         # - scale  : scale to divide the value with
                                         # - bias   : bias to add to the value
-                                        # - flags  : can be : REG_FLAG_BIG_ENDIAN, REG_FLAG_INVALID
-                                        # - xlate  : custom method to be executed after data parsing
+                                        # - flags  : can be : REG_FLAG_BIG_ENDIAN, REG_FLAG_INVALID, REG_FLAG_NO_LUT
+                                        # - xlate  : custom method to be executed after data parsing. Results of regs up
+                                        #            to 12 bits are tabulated, so it must only depend on the value,
+                                        #            unless flag REG_FLAG_NO_LUT is set.
                                         # - inval  : if flag REG_FLAG_INVALID is set, value that invalidates the data
                                         # - roles  : list of role names concerned by the data. If not defined, all roles, if contains None, data is ignored.
+            # Optional, dict, keys are role names, values are lists of reg names needed by 'update_data' hooks of the role,
+            # always parsed and routed to the role when it is enabled, whatever their 'roles'
+            'dependencies': {},
             'settings': [],             # Optional,  list of dict, settings that could be set through UI
             'alarms': [],               # Optional,  list of dict, raisable alarms, defined with :
                                         # - name   : Name of the alarm
@@ -62,15 +138,112 @@ class BleDevice(object):
 
     def configure(self, manufacturer_data: bytes):
         """
-        Mandatory overload, use self.info.update() to add specific configuration.
+        Mandatory overload, use self.info.update() to add specific configuration, unless the class has a
+        DEFINITION_FILE.
+        """
+        if (definition := self.DEFINITION) is None:
+            raise NotImplementedError("Device class must be configured")
+        infos = [definition['info']]
+        if definition['models']:
+            model_id = self._load_number(definition['model'], manufacturer_data)
+            if (model_info := definition['models'].get(model_id, None)) is None:
+                raise ValueError(f"Unknown {type(self).__name__} model ID: {model_id}")
+            infos.append(model_info)
+        for info in infos:
+            self.info.update(self._bind_hooks(info))
+
+    def _bind_hooks(self, info: dict) -> dict:
+        # Copy of definition info fields, method names being replaced by the methods
+        info = dict(info)
+        for list_key, hook_key in [('regs', 'xlate'), ('alarms', 'update'), ('settings', 'onchange')]:
+            if list_key in info:
+                info[list_key] = [dict(item, **{hook_key: getattr(self, item[hook_key])}) if hook_key in item
+                                  else dict(item) for item in info[list_key]]
+        if 'roles' in info:
+            info['roles'] = {role_name: dict(role_config) for role_name, role_config in info['roles'].items()}
+        return info
+
+    def get_model_key(self, manufacturer_data: bytes) -> object:
+        """
+        Optional overload. Hashable key identifying the configuration 'configure' builds from this manufacturer data,
+        i.e. a model id, so that devices of a same model share it, read-only and with static or class methods only.
+        None, the default, to configure each device on its own, or the 'model' reg value for classes with a
+        DEFINITION_FILE.
         """
-        raise NotImplementedError("Device class must be configured")
+        if (definition := self.DEFINITION) is None:
+            return None
+        if definition['model'] is None:
+            return 0  # Single model
+        if len(manufacturer_data) < definition['min_length']:
+            return None
+        return self._load_number(definition['model'], manufacturer_data)
+
+    def load_model(self, manufacturer_data: bytes):
+        """
+        Configure the device with the shared definition of its model, built and validated on first use, or on its
+        own with 'configure' if the class gives no model key.
+        """
+        if (model_key := self.get_model_key(manufacturer_data)) is None:
+            self.configure(manufacturer_data)
+            return
+        dev_class = type(self)
+        if (model := BleDevice.MODEL_DEFINITIONS.get((dev_class, model_key), None)) is None:
+            prototype = dev_class(self.info['dev_mac'])
+            prototype.configure(manufacturer_data)
+            prototype.info['manufacturer_id'] = dev_class.MANUFACTURER_ID
+            prototype._plog = f"{dev_class.__name__} model {model_key!r}:"
+            prototype._check_configuration()
+            del prototype.info['dev_mac']
+            model = BleDevice.MODEL_DEFINITIONS[(dev_class, model_key)] = ModelDefinition(
+                model_key, prototype.info, prototype)
+            logging.debug(f"{prototype._plog} definition loaded")
+        self._model = model
+        # Only per device values are stored on the instance
+        self.info = ChainMap({'dev_mac': self.info['dev_mac']}, model.info)
 
     def check_manufacturer_data(self, manufacturer_data: bytes) -> bool:
         """
         Optional override. Executed at just after manufacturer advertising data reception, to check if the data
         are worth parsing. Return True to continue with parsing, False to ignore the advertisement. 
+        Checks the class discriminators by default, compiled for the device unless 'match_frame' is overridden, or
+        'check_frame' if HAND_WRITTEN_CHECK is set.
+        """
+        if (validator := self._frame_validator) is None:
+            mac_tail = bytes.fromhex(self.info['dev_mac'][6:])
+            if self.HAND_WRITTEN_CHECK:
+                validator = self.check_frame
+            elif type(self).match_frame.__func__ is BleDevice.match_frame.__func__:
+                validator = FrameValidator.compile(type(self), mac_tail)
+            else:
+                validator = partial(self.match_frame, mac_tail=mac_tail)
+            self._frame_validator = validator
+        return validator(manufacturer_data)
+
+    def check_frame(self, manufacturer_data: bytes) -> bool:
+        """
+        Optional overload. Hand-written manufacturer data check of the device, used instead of the compiled
+        discriminators when HAND_WRITTEN_CHECK is set. Checks the class discriminators one by one by default.
+        """
+        return self.match_frame(manufacturer_data, bytes.fromhex(self.info['dev_mac'][6:]))
+
+    @classmethod
+    def match_frame(cls, manufacturer_data: bytes, mac_tail: bytes) -> bool:
+        """
+        Check manufacturer data against the class discriminators, 'mac_tail' being the 3 last bytes of the mac address.
         """
+        if cls.DATA_LENGTHS is not None and len(manufacturer_data) not in cls.DATA_LENGTHS:
+            return False
+        if len(manufacturer_data) < cls.MIN_DATA_LENGTH:
+            return False
+        for offset, mask, value in cls.DISCRIMINATOR:
+            if offset >= len(manufacturer_data) or manufacturer_data[offset] & mask != value:
+                return False
+        if (offset := cls.MAC_ECHO_OFFSET) is not None and manufacturer_data[offset:offset + 3] != mac_tail:
+            return False
+        if cls.MODEL_BYTE is not None:
+            offset, mask, values = cls.MODEL_BYTE
+            if offset >= len(manufacturer_data) or manufacturer_data[offset] & mask not in values:
+                return False
         return True
 
     def update_data(self, role_service: DbusRoleService, sensor_data: dict):
@@ -80,12 +253,25 @@ class BleDevice(object):
         """
         pass
 
+    @classmethod
+    def lookup_table(cls, key, size: int, function) -> list:
+        """
+        Table of 'function' results for indexes 0 to 'size' - 1, computed on first use and shared by all devices of the
+        class. 'key' identifies the table within the class, i.e. compensation coefficients and settings values.
+        """
+        if (table := BleDevice.LOOKUP_TABLES.get((cls, key), None)) is None:
+            if len(BleDevice.LOOKUP_TABLES) >= LOOKUP_TABLES_MAX:
+                BleDevice.LOOKUP_TABLES.clear()
+            table = BleDevice.LOOKUP_TABLES[(cls, key)] = [function(index) for index in range(size)]
+        return table
+
     @staticmethod
     def load_classes(execution_path: str):
         device_classes_prefix = f"{os.path.splitext(os.path.basename(__file__))[0]}_"
 
         # Loading manufacturer specific classes
-        for filename in os.listdir(os.path.dirname(execution_path)):
+        filenames = os.listdir(os.path.dirname(execution_path))
+        for filename in filenames:
             if filename.startswith(device_classes_prefix) and filename.endswith('.py'):
                 file_path = os.path.join(os.path.dirname(execution_path), filename)
                 module_name = os.path.splitext(filename)[0]
@@ -105,25 +291,64 @@ class BleDevice(object):
                 # Check and import
                 for name, obj in inspect.getmembers(module, inspect.isclass):
                     if obj.__module__ == module.__name__ and issubclass(obj, BleDevice) and obj is not BleDevice:
-                        man_id = getattr(obj, 'MANUFACTURER_ID', None)
-                        if not isinstance(man_id, int):
-                            logging.error(
-                                f"Device class {module_name!r}@{file_path!r} has invalid MANUFACTURER_ID: {man_id!r}")
-                            continue
-                        if man_id in BleDevice.DEVICE_CLASSES:
-                            prev = BleDevice.DEVICE_CLASSES[man_id].__name__
-                            logging.error(
-                                f"Manufacturer id {man_id!r} in {module_name!r}@{file_path!r} is already registered in {prev!r}, ignoring it")
-                            continue
-                        BleDevice.DEVICE_CLASSES[man_id] = obj
-                        break
+                        if BleDevice._register_class(obj, module_name, file_path):
+                            break
+
+            elif filename.startswith(device_classes_prefix) and filename.endswith('.json'):
+                module_name = os.path.splitext(filename)[0]
+                if f"{module_name}.py" in filenames:
+                    # Definition of a Python device class
+                    continue
+                file_path = os.path.join(os.path.dirname(execution_path), filename)
+                try:
+                    definition = load_definition(file_path)
+                    class_name = definition['class_name'] or f"BleDevice{module_name[len(device_classes_prefix):].title()}"
+                    obj = type(class_name, (BleDevice,), {'DEFINITION_FILE': file_path, '__module__': module_name})
+                except Exception:
+                    logging.exception(f"Failed to load device definition {module_name!r}@{file_path!r}")
+                    continue
+                BleDevice._register_class(obj, module_name, file_path)
+        BleDevice.CLASSES_GENERATION += 1
+        BleDevice.MODEL_DEFINITIONS.clear()
+        BleDevice.DEVICE_INDEX = DeviceClassIndex(BleDevice.DEVICE_CLASSES)
         logging.info(f"Device classes: {BleDevice.DEVICE_CLASSES!r}")
 
+    @staticmethod
+    def _register_class(dev_class, module_name: str, file_path: str) -> bool:
+        man_id = getattr(dev_class, 'MANUFACTURER_ID', None)
+        if not isinstance(man_id, int):
+            logging.error(f"Device class {module_name!r}@{file_path!r} has invalid MANUFACTURER_ID: {man_id!r}")
+            return False
+        man_ids = dev_class.MANUFACTURER_IDS or (man_id,)
+        if not all(isinstance(other_id, int) for other_id in man_ids):
+            logging.error(f"Device class {module_name!r}@{file_path!r} has invalid MANUFACTURER_IDS: {man_ids!r}")
+            return False
+        for man_id in man_ids:
+            classes = BleDevice.DEVICE_CLASSES.setdefault(man_id, [])
+            if any(prev.__name__ == dev_class.__name__ for prev in classes):
+                logging.error(
+                    f"Device class {dev_class.__name__!r} in {module_name!r}@{file_path!r} is already registered for manufacturer id {man_id!r}, ignoring it")
+                continue
+            if any(get_specificity(prev) == 0 for prev in classes) or (get_specificity(dev_class) == 0 and classes):
+                logging.warning(
+                    f"Device class {dev_class.__name__!r} in {module_name!r}@{file_path!r} shares manufacturer id {man_id!r} with a class without discriminators")
+            classes.append(dev_class)
+            # Stable sort, registration order among classes as specific
+            classes.sort(key=get_specificity, reverse=True)
+        return True
+
     def _load_configuration(self):
-        self.info['manufacturer_id'] = self.MANUFACTURER_ID
+        if self._model is None:
+            self.info['manufacturer_id'] = self.MANUFACTURER_ID
         self.info['device_name'] = self.info['device_name'] + ' ' + self.info['dev_mac'][-6:].upper()
         self._plog = f"{self.info['dev_mac']} - {self.info['device_name']}:"
+        if self._model is None:
+            # Shared definitions are checked once, when loaded
+            self._check_configuration()
+        self.info['dev_id'] = self.info['dev_prefix'] + '_' + self.info['dev_mac']
+        self._compile_regs()
 
+    def _check_configuration(self):
         for key in ['manufacturer_id', 'product_id', 'product_name', 'device_name', 'dev_prefix', 'roles', 'regs', 'settings', 'alarms']:
             if key not in self.info:
                 raise ValueError(f"{self._plog} configuration '{key}' is missing")
@@ -175,6 +400,17 @@ class BleDevice(object):
             if 'bits' in reg and not isinstance(reg['bits'], int):
                 raise ValueError(f"{self._plog} 'bits' in reg {reg['name']} must be an integer")
 
+        dependencies = self.info.get('dependencies', None) or {}
+        if not isinstance(dependencies, dict):
+            raise ValueError(f"{self._plog} Configuration 'dependencies' must be a dict")
+        reg_names = {reg['name'] for reg in self.info['regs']}
+        for role_name, names in dependencies.items():
+            if role_name not in self.info['roles']:
+                raise ValueError(f"{self._plog} Role '{role_name}' in dependencies is not defined in device roles")
+            for name in names:
+                if name not in reg_names:
+                    raise ValueError(f"{self._plog} Unknown reg '{name}' in dependencies of role '{role_name}'")
+
         for index, setting in enumerate(self.info['settings']):
             if 'name' not in setting:
                 raise ValueError(f"{self._plog} Missing 'name' in setting at index {index}")
@@ -195,7 +431,12 @@ class BleDevice(object):
                 if key not in alarm:
                     raise ValueError(f"{self._plog} Missing key '{key}' in alarm {alarm['name']}")
 
-        self.info['dev_id'] = self.info['dev_prefix'] + '_' + self.info['dev_mac']
+    def _compile_regs(self):
+        if self._model is not None:
+            self._regs_plan = self._model.get_regs_plan(self._enabled_roles)
+            return
+        self._regs_plan = RegsPlan(self.info['regs'], self.info['roles'], self._load_reg,
+                                   enabled_roles=self._enabled_roles, dependencies=self.info.get('dependencies', None))
 
     def init(self):
         # Setting configuration
@@ -216,8 +457,38 @@ class BleDevice(object):
             self._role_services[role_name] = role_service
             # Creating entries in ble service to enable/disable options
             DbusBleService.get().register_role_service(role_service)
+
+        # Parse regs of enabled roles only
+        self._enabled_roles = {role_name for role_name in self._role_services
+                               if DbusBleService.get().is_device_role_enabled(self.info, role_name) is True}
+        self._compile_regs()
+
+        # Device level options
+        DbusBleService.get().register_device(self, self.update_process_interval)
+        self._registered = True
+        self.update_process_interval()
         logging.debug(f"{self._plog} initialized")
 
+    def on_role_enabled_changed(self, role_name: str, is_enabled: bool):
+        """
+        Specialize the regs plan to the new set of enabled roles, called on role 'Enabled' setting changes.
+        """
+        if self._enabled_roles is None or (role_name in self._enabled_roles) == is_enabled:
+            return
+        if is_enabled:
+            self._enabled_roles.add(role_name)
+        else:
+            self._enabled_roles.discard(role_name)
+        logging.debug(f"{self._plog} parsing regs of roles {sorted(self._enabled_roles)!r}")
+        self._compile_regs()
+
+    def update_process_interval(self, device_interval: int = None, global_interval: int = None):
+        """
+        Refresh the minimum interval between two processed frames, called on related settings changes.
+        """
+        self.process_interval = DbusBleService.get().get_process_interval(
+            self.info, self.PROCESS_INTERVAL, device_interval, global_interval)
+
     def _load_str(self, reg: dict, manufacturer_data: bytes) -> str:
         # Check there is enough data
         offset: int = reg['offset']
@@ -286,28 +557,33 @@ class BleDevice(object):
             value = None
         return value
 
+    def _load_reg(self, reg: dict, manufacturer_data: bytes) -> object:  # int | float | str | None
+        if (_type := reg['type']).is_int():
+            return self._load_number(reg, manufacturer_data)
+        elif _type == VE_HEAP_STR:
+            return self._load_str(reg, manufacturer_data)
+        elif _type == VE_FLOAT:
+            logging.error(f"{self._plog} can not parse 'VE_FLOAT' type items")
+        return None
+
     def _parse_manufacturer_data(self, manufacturer_data: bytes) -> dict:
+        if self._regs_plan is not None:
+            return self._regs_plan.parse(manufacturer_data, self._load_reg)
+        return self._parse_regs(manufacturer_data)
+
+    def _parse_regs(self, manufacturer_data: bytes) -> dict:
+        """
+        Parse each reg on its own, reference implementation of the compiled plan.
+        """
         values = {}
         for role in self.info['roles']:
             values[role] = {}
         for reg in self.info['regs']:
-            value = None
-            if (_type := reg['type']).is_int():
-                value = self._load_number(reg, manufacturer_data)
-            elif _type == VE_HEAP_STR:
-                value = self._load_str(reg, manufacturer_data)
-            elif _type == VE_FLOAT:
-                logging.error(f"{self._plog} can not parse 'VE_FLOAT' type items")
-
+            value = self._load_reg(reg, manufacturer_data)
             if value is None:
                 continue
 
-            if (roles := reg.get('roles', None)) and None in roles:
-                continue
-            if roles is None:
-                roles = self.info['roles']
-
-            for role in roles:
+            for role in get_reg_roles(reg, self.info['roles'], self.info.get('dependencies', None)):
                 values[role][(reg['name'])] = value
         return values
 
@@ -320,19 +596,24 @@ class BleDevice(object):
         """
         Main data parsing and update method.
         """
-        if not DbusBleService.get().is_device_enabled(self.info):
-            logging.debug(f"{self._plog} device not enabled, skipping")
+        self.enabled = DbusBleService.get().is_device_enabled(self.info)
+        if not self.enabled:
+            HOT_LOG.debug(self._plog, "%s device not enabled, skipping", self._plog)
             return
 
         # Parse data
         sensor_data: dict = self._parse_manufacturer_data(manufacturer_data)
-        logging.debug(f"{self._plog} data {manufacturer_data!r} parsed: {sensor_data!r}")
-        for role_service in self._role_services.values():
-            if not DbusBleService.get().is_device_role_enabled(self.info, role_service.ble_role.NAME) is True:
-                logging.debug(f"{self._plog} role {role_service.ble_role.NAME!r} not enabled, skipping")
+        HOT_LOG.debug(self._plog, "%s data %r parsed: %r", self._plog, manufacturer_data, sensor_data)
+        for role_name, role_service in self._role_services.items():
+            if not DbusBleService.get().is_device_role_enabled(self.info, role_name) is True:
+                HOT_LOG.debug(self._plog, "%s role %r not enabled, skipping", self._plog, role_name)
                 continue
             # Filtering data
-            role_data = sensor_data[role_service.ble_role.NAME]
+            if (role_data := sensor_data.get(role_name, None)) is None:
+                # Role enabled without the regs plan being told yet
+                self.on_role_enabled_changed(role_name, True)
+                sensor_data = self._parse_manufacturer_data(manufacturer_data)
+                role_data = sensor_data[role_name]
             if role_data:
                 # Update sensor data from update callbacks
                 role_service.ble_role.update_data(role_service, role_data)
@@ -361,6 +642,12 @@ class BleDevice(object):
             except Exception:
                 logging.exception(f"{self._plog} error unregistering role service from BLE service")
         self._role_services.clear()
+        if self._registered:
+            self._registered = False
+            try:
+                DbusBleService.get().unregister_device(self, self.update_process_interval)
+            except Exception:
+                logging.exception(f"{self._plog} error unregistering device from BLE service")
 
     def __del__(self):
         self.delete()
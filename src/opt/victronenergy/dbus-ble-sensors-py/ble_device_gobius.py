@@ -1,67 +1,39 @@
-from ve_types import *
 from ble_device import BleDevice
 
 
 class BleDeviceGobius(BleDevice):
     """
-    Gobius C device class.
+    Gobius C device class, configured by ble_device_gobius.json.
+
+    As stated on Victron's site, manufacturer_data is 14 bytes:
+      0    : HardwareID (7 bits used)
+      1    : Temperature (7 bits used; °C = value - 40), MSB reserved
+      2-3  : Distance (mm, uint16 LE)
+      4-6  : UID tail = advertiser address bytes [2:0]
+      7-9  : Firmware version (major, middle, minor)
+      10   : Status Flags (ignored here)
+      11-13: Spare (ignored; expected 0)
 
     Cf.
     - https://gobiusc.com/
     - https://github.com/victronenergy/dbus-ble-sensors/blob/master/src/gobius.c
     """
 
-    MANUFACTURER_ID = 0x0F53 # 'Fledt & Meiton Marin AB'
+    DEFINITION_FILE = 'ble_device_gobius.json'  # Manufacturer id 0x0F53, 'Fledt & Meiton Marin AB'
 
     _GOBIUS_ERROR = 0xffff
     _GOBIUS_STARTUP = 0xfffe
 
-    def configure(self, manufacturer_data: bytes):
+    def get_model_key(self, manufacturer_data: bytes) -> object:
+        # Firmware version is part of the configuration
+        return bytes(manufacturer_data[7:10]) if len(manufacturer_data) >= 10 else None
 
-        self.info.update({
-            'manufacturer_id': BleDeviceGobius.MANUFACTURER_ID,
-            'product_id': 0x0000,  # TODO: find the appropriate value
-            'product_name': 'Gobius sensor',
-            'device_name': 'Gobius C',
-            'dev_prefix': 'gobius',
-            'firmware_version': f"{manufacturer_data[7]}.{manufacturer_data[8]}.{manufacturer_data[9]}",
-            'roles': {'tank': {}},
-            'regs': [
-                # As stated on Victron's site, manufacturer_data is 14 bytes:
-                #   0    : HardwareID (7 bits used)
-                #   1    : Temperature (7 bits used; °C = value - 40), MSB reserved
-                #   2-3  : Distance (mm, uint16 LE)
-                #   4-6  : UID tail = advertiser address bytes [2:0]
-                #   7-9  : Firmware version (major, middle, minor)
-                #   10   : Status Flags (ignored here)
-                #   11-13: Spare (ignored; expected 0)
-                {
-                    'name':  'HardwareID',
-                    'type': VE_UN8,
-                    'offset': 0,
-                    'bits': 7,
-                    # .format	= &veUnitNone,
-                },
-                {
-                    'name':  'Temperature',
-                    'type': VE_UN8,
-                    'offset': 1,
-                    'bits': 7,
-                    'scale': 1,
-                    'bias': -40,
-                    # .format	= &veUnitCelsius1Dec,
-                },
-                {
-                    'name':  'RawValue',
-                    'type': VE_UN16,
-                    'offset': 2,
-                    'xlate': self.gobius_level
-                    # .format	= &veUnitcm,
-                },
-            ]
-        })
+    def configure(self, manufacturer_data: bytes):
+        super().configure(manufacturer_data)
+        self.info['firmware_version'] = f"{manufacturer_data[7]}.{manufacturer_data[8]}.{manufacturer_data[9]}"
 
-    def check_manufacturer_data(self, manufacturer_data: bytes) -> bool:
+    def check_frame(self, manufacturer_data: bytes) -> bool:
+        # Hand-written equivalent of the class discriminators, cf. HAND_WRITTEN_CHECK
         if len(manufacturer_data) != 14:
             return False
 
@@ -73,7 +45,8 @@ class BleDeviceGobius(BleDevice):
             return False
         return True
 
-    def gobius_level(self, value: int) -> float:
-        if value in [self._GOBIUS_STARTUP, self._GOBIUS_ERROR]:
+    @classmethod
+    def gobius_level(cls, value: int) -> float:
+        if value in [cls._GOBIUS_STARTUP, cls._GOBIUS_ERROR]:
             return -1
         return value / 10
@@ -1,6 +1,7 @@
 from ve_types import *
 from ble_device import BleDevice
 import logging
+from functools import partial
 from dbus_role_service import DbusRoleService
 
 
@@ -21,6 +22,9 @@ class BleDeviceMopeka(BleDevice):
     """
 
     MANUFACTURER_ID = 0x0059 # 'Nordic Semiconductor ASA'
+    PROCESS_INTERVAL = 5  # Advertises every second or so, slow changing values
+    DATA_LENGTHS = (10,)
+    MAC_ECHO_OFFSET = 5  # NIC (Network Interface Controller)
 
     MODELS = {
         3: {
@@ -100,12 +104,14 @@ class BleDeviceMopeka(BleDevice):
             'roles': {'tank': {}, 'temperature': {}, 'movement': {}}
         }
     }
+    MODEL_BYTE = (0, 0x7F, tuple(MODELS))  # Hardware ID
 
     _COEFS_H2O: tuple[float, float, float] = (0.600592, 0.003124, -0.00001368)
     _COEFS_LPG: tuple[float, float, float] = (0.573045, -0.002822, -0.00000535)
     _COEFS_GASOLINE: tuple[float, float, float] = (0.7373417462, -0.001978229885, 0.00000202162)
     _COEFS_AIR: tuple[float, float, float] = (0.153096, 0.000327, -0.000000294)
     _COEFS_BUTANE: tuple[float, float] = (0.03615, 0.000815)
+    _TEMPERATURE_STEPS: int = 128  # Advertised temperatures, 7 bits, offset by 40 degrees
 
     def _get_model_info(self, manufacturer_data: bytes) -> dict:
         model_id = self._load_number(
@@ -117,6 +123,10 @@ class BleDeviceMopeka(BleDevice):
             raise ValueError(f"Unknown Mopeka model ID: {model_id}")
         return model_info
 
+    def get_model_key(self, manufacturer_data: bytes) -> object:
+        # Hardware ID
+        return manufacturer_data[0] & 0x7f if manufacturer_data else None
+
     def configure(self, manufacturer_data: bytes):
         model_info = self._get_model_info(manufacturer_data)
 
@@ -208,11 +218,15 @@ class BleDeviceMopeka(BleDevice):
                     'name': '/Alarms/LowBattery',
                     'update': self._get_low_battery_state
                 }
-            ]
+            ],
+            # Tank level computation of update_data
+            'dependencies': {'tank': ['HardwareID', 'TankLevelExtension', 'Temperature']},
         })
         self.info.update(model_info)
 
-    def check_manufacturer_data(self, manufacturer_data: bytes) -> bool:
+    def check_frame(self, manufacturer_data: bytes) -> bool:
+        # Hand-written equivalent of the class discriminators, cf. HAND_WRITTEN_CHECK, unknown models being rejected by
+        # configure instead
         if len(manufacturer_data) != 10:
             return False
 
@@ -230,6 +244,14 @@ class BleDeviceMopeka(BleDevice):
         """
         return self._COEFS_BUTANE[0] + self._COEFS_BUTANE[1] * temperature * (butane_ratio / 100.0)
 
+    def _get_scale(self, coefs: tuple, butane_ratio: int, temperature: float) -> float:
+        """
+        Calculate the raw value scale factor based on temperature, fluid coefficients and butane ratio for LPG.
+        """
+        scale = 0.0 if butane_ratio is None else self._get_scale_butane(butane_ratio, temperature)
+        scale += coefs[0] + coefs[1] * temperature + coefs[2] * temperature * temperature
+        return scale
+
     def update_data(self, role_service: DbusRoleService, sensor_data: dict):
         """
         Check for presence of extension bit on certain hardware/firmware saturates at 16383.
@@ -255,11 +277,11 @@ class BleDeviceMopeka(BleDevice):
             logging.warning(f"{self._plog} can not update sensor data, missing hardware ID value")
             return
         coefs = None
-        scale = 0.0
+        butane_ratio = None
         match hardware_id:
             case 3:
                 coefs = self._COEFS_LPG
-                scale = self._get_scale_butane(role_service['ButaneRatio'], temperature)
+                butane_ratio = role_service['ButaneRatio']
             case 4:
                 coefs = self._COEFS_AIR
             case 5:
@@ -274,7 +296,7 @@ class BleDeviceMopeka(BleDevice):
                         coefs = self._COEFS_H2O
                     case 8:
                         coefs = self._COEFS_LPG
-                        scale = self._get_scale_butane(role_service['ButaneRatio'], temperature)
+                        butane_ratio = role_service['ButaneRatio']
                     case 6 | 7:
                         coefs = self._COEFS_GASOLINE
                     case _:
@@ -283,10 +305,16 @@ class BleDeviceMopeka(BleDevice):
             case _:
                 logging.warning(f"{self._plog} can not update sensor data, unknown hardware ID: {hardware_id}")
                 return
-        scale += coefs[0] + coefs[1] * temperature + coefs[2] * temperature * temperature
+        if (index := int(temperature)) == temperature and 0 <= index < self._TEMPERATURE_STEPS:
+            # Whole degrees, as advertised: tabulated per fluid and butane ratio
+            scale = self.lookup_table((coefs, butane_ratio), self._TEMPERATURE_STEPS,
+                                      partial(self._get_scale, coefs, butane_ratio))[index]
+        else:
+            scale = self._get_scale(coefs, butane_ratio, temperature)
         sensor_data['RawValue'] = (raw_value * scale) / 10
 
-    def _get_low_battery_state(self, role_service: DbusRoleService) -> int:
+    @staticmethod
+    def _get_low_battery_state(role_service: DbusRoleService) -> int:
         # Percentage based on 3 volt CR2032 battery
         if (battery_voltage := role_service.get('BatteryVoltage', None)) is None:
             return 0
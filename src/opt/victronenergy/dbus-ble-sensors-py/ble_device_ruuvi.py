@@ -18,6 +18,8 @@ class BleDeviceRuuvi(BleDevice):
     """
 
     MANUFACTURER_ID = 0x0499 # 'Ruuvi Innovations Ltd.'
+    PROCESS_INTERVAL = 5  # Advertises every second or so, slow changing values
+    DATA_LENGTHS = (20, 24)  # Formats 6 and 5, cf. manufacturer_data_length
 
     @staticmethod
     def _get_low_battery_state(role_service: DbusRoleService) -> int:
@@ -231,10 +233,24 @@ class BleDeviceRuuvi(BleDevice):
             ],
         }
     }
+    MODEL_BYTE = (0, 0xFF, tuple(MODELS))  # Data format
 
     def __init__(self, address: str):
         super().__init__(address)
-        self.manufacturer_data_length = None
+        self.model_id = None
+
+    @property
+    def manufacturer_data_length(self) -> int:
+        if self.model_id is None:
+            return None
+        return 24 if self.model_id == 5 else 20
+
+    def get_model_key(self, manufacturer_data: bytes) -> object:
+        return manufacturer_data[0] if manufacturer_data else None
+
+    def load_model(self, manufacturer_data: bytes):
+        super().load_model(manufacturer_data)
+        self.model_id = self.get_model_key(manufacturer_data)
 
     def configure(self, manufacturer_data: bytes):
         self.info.update({
@@ -251,7 +267,7 @@ class BleDeviceRuuvi(BleDevice):
         if model_info is None:
             raise ValueError(f"Unknown Ruuvi model ID: {model_id}")
 
-        self.manufacturer_data_length = 24 if model_id == 5 else 20
+        self.model_id = model_id
         self.info.update(model_info)
 
     def check_manufacturer_data(self, manufacturer_data: bytes) -> bool:
@@ -18,6 +18,11 @@ class BleDeviceTeltonika(BleDevice):
     """
 
     MANUFACTURER_ID = 0x089A # 'Private limited company "Teltonika"'
+    MIN_DATA_LENGTH = 2  # Version and flags
+
+    def get_model_key(self, manufacturer_data: bytes) -> object:
+        # Flags of the advertised values, cf. _compute_regs
+        return manufacturer_data[1] & 0xB7 if len(manufacturer_data) >= 2 else None
 
     def configure(self, manufacturer_data: bytes):
         self.info.update({
@@ -184,5 +189,6 @@ class BleDeviceTeltonika(BleDevice):
                 'bias': 2000,
             })
 
-    def _get_low_battery_state(self, role_service: DbusRoleService) -> int:
+    @staticmethod
+    def _get_low_battery_state(role_service: DbusRoleService) -> int:
         return int((role_service['LowBattery'] or 0) >= 1)
@@ -0,0 +1,52 @@
+from types import MappingProxyType
+from ble_regs import RegsPlan
+
+# Reg, alarm and setting keys holding a device method
+HOOK_KEYS = {'regs': 'xlate', 'alarms': 'update', 'settings': 'onchange'}
+
+
+def freeze(value: object) -> object:
+    """
+    Read-only copy of a configuration: dicts as mappings proxies, lists as tuples, other values as is.
+    """
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class ModelDefinition(object):
+    """
+    Validated and read-only configuration of a device model, shared by all devices of the model, cf.
+    BleDevice.load_model.
+
+    Methods referenced by the configuration, i.e. regs 'xlate', alarms 'update' and settings 'onchange', are shared
+    by all devices of the model, so they must be static or class methods, not methods bound to 'prototype', the
+    instance the model was configured with. Per device values are given to them as arguments, i.e. the role service of
+    the device. Regs plans are shared too, one per set of enabled roles.
+    """
+    __slots__ = ('key', 'info', 'prototype', '_regs_plans')
+
+    def __init__(self, key: object, info: dict, prototype: object):
+        for list_key, hook_key in HOOK_KEYS.items():
+            for item in info.get(list_key, []):
+                if getattr(item.get(hook_key, None), '__self__', None) is prototype:
+                    raise ValueError(f"{type(prototype).__name__} model {key!r}: {list_key} {hook_key!r} method "
+                                     f"{item[hook_key].__name__!r} is shared by all devices of the model, it must be a "
+                                     f"static or class method")
+        self.key: object = key
+        self.info: MappingProxyType = freeze(info)
+        self.prototype: object = prototype  # BleDevice
+        self._regs_plans: dict = {}  # frozenset of enabled role names, None for all roles -> RegsPlan
+
+    def get_regs_plan(self, enabled_roles: set = None) -> RegsPlan:
+        plan_key = None if enabled_roles is None else frozenset(enabled_roles)
+        if (plan := self._regs_plans.get(plan_key, None)) is None:
+            plan = self._regs_plans[plan_key] = RegsPlan(
+                self.info['regs'], self.info['roles'], None, enabled_roles=plan_key,
+                dependencies=self.info.get('dependencies', None))
+        return plan
+
+    def __repr__(self):
+        return f"ModelDefinition({type(self.prototype).__name__}, {self.key!r})"
@@ -0,0 +1,197 @@
+import struct
+import logging
+from conf import REGS_LUT_MAX_BITS
+
+# struct format codes of byte aligned integers, by size in bytes, unsigned and signed
+_STRUCT_CODES = {
+    1: ('B', 'b'),
+    2: ('H', 'h'),
+    4: ('I', 'i'),
+}
+
+
+def get_reg_roles(reg: dict, roles, dependencies: dict = None) -> list:
+    """
+    Roles a reg value is routed to: its 'roles' or all roles, none if they contain None, plus the roles depending on
+    it, cf. BleDevice 'dependencies' configuration.
+    """
+    if (reg_roles := reg.get('roles', None)) is None:
+        reg_roles = list(roles)
+    elif None in reg_roles:
+        reg_roles = []
+    if dependencies:
+        reg_roles = list(reg_roles)
+        for role, names in dependencies.items():
+            if reg['name'] in names and role not in reg_roles:
+                reg_roles.append(role)
+    return reg_roles
+
+
+def _apply_post(value, post: tuple):
+    scale, bias, xlate, invalid, inval = post
+    if scale:
+        value = value / scale
+    if bias:
+        value = value + bias
+    if xlate:
+        value = xlate(value)
+    if invalid and value == inval:
+        value = None
+    return value
+
+
+class _Field(object):
+    __slots__ = ('reg', 'name', 'targets', 'post', 'table')
+
+    def __init__(self, reg: dict, targets: tuple):
+        self.reg: dict = reg
+        self.name: str = reg['name']
+        self.targets: tuple = targets  # Indexes of the roles the value is routed to
+        flags = reg.get('flags', [])
+        # Post actions, None when there is none: scale, bias, xlate, invalid value check and invalid value
+        post = (reg.get('scale', None) or None, reg.get('bias', None) or None, reg.get('xlate', None) or None,
+                'REG_FLAG_INVALID' in flags, reg.get('inval', None))
+        self.post: tuple = post if any(post[:4]) else None
+        # Post actions results of every raw value of small integers, indexed by raw value, negative ones included
+        self.table: list = None
+        if self.post is not None and 'REG_FLAG_NO_LUT' not in flags and (_type := reg['type']).is_int():
+            if (bits := reg.get('bits', None)) is None:
+                bits = _type.int_size() * 8
+            if bits <= REGS_LUT_MAX_BITS:
+                self.table = self._tabulate(bits, _type.is_int_signed())
+
+    def _tabulate(self, bits: int, signed: bool) -> list:
+        sign = (1 << (bits - 1)) if signed else 0
+        try:
+            return [_apply_post(raw - ((raw & sign) << 1), self.post) for raw in range(1 << bits)]
+        except Exception as e:
+            # Post actions not defined on the whole domain, applied on each frame instead
+            logging.debug(f"Reg {self.name!r} can not be tabulated: {e!r}")
+            return None
+
+
+class RegsPlan(object):
+    """
+    Parsing plan of a device 'regs' configuration, cf. BleDevice, giving the same values as parsing each reg of each
+    frame on its own.
+
+    Regs are compiled once per manufacturer data length into:
+    - struct.Struct instances reading groups of non overlapping byte aligned 8, 16 and 32 bits integers,
+    - shift, mask and sign constants applied to a single integer of the whole frame for other integers,
+    - 'fallback(reg, manufacturer_data)' calls for strings, other types and regs not fitting in the data, the fallback
+      given to parse() if any, so a plan can be shared by devices.
+    Scale, bias, xlate and invalid value checks are pre-bound, and values are routed directly to their roles.
+    For integers of at most REGS_LUT_MAX_BITS bits, their results are tabulated once for all raw values, so xlate
+    methods must be pure functions of the raw value, unless the reg has the 'REG_FLAG_NO_LUT' flag.
+
+    When 'enabled_roles' is given, values are only returned for these roles, regs routed to none of them are left
+    out. Regs routed to no role at all are always left out.
+    """
+
+    def __init__(self, regs: list, roles, fallback, enabled_roles=None, dependencies: dict = None):
+        self._roles: tuple = tuple(role for role in roles if enabled_roles is None or role in enabled_roles)
+        self._fallback = fallback
+        self._fields: list = []
+        role_indexes = {role: index for index, role in enumerate(self._roles)}
+        for reg in regs:
+            targets = tuple(role_indexes[role] for role in get_reg_roles(reg, roles, dependencies) if role in role_indexes)
+            if targets:
+                self._fields.append(_Field(reg, targets))
+        self._plans: dict = {}  # manufacturer data length -> compiled plan
+
+    def _compile(self, length: int) -> tuple:
+        structs = {'<': [], '>': []}  # byte order -> (offset, size, code, field index)
+        bit_fields = {'little': [], 'big': []}  # byte order -> (field index, shift, mask, sign bit)
+        fallbacks = []
+        for index, field in enumerate(self._fields):
+            reg = field.reg
+            if not (_type := reg['type']).is_int():
+                fallbacks.append(index)
+                continue
+            offset = reg['offset']
+            shift = reg.get('shift', None) or 0
+            if (bits := reg.get('bits', None)) is None:
+                bits = _type.int_size() * 8
+            size = (bits + shift + 7) >> 3
+            if size > length - offset:
+                # Error logged by the fallback
+                fallbacks.append(index)
+                continue
+            big_endian = 'REG_FLAG_BIG_ENDIAN' in reg.get('flags', [])
+            signed = _type.is_int_signed()
+            if shift == 0 and size in _STRUCT_CODES and bits == size * 8:
+                structs['>' if big_endian else '<'].append((offset, size, _STRUCT_CODES[size][signed], index))
+            elif big_endian:
+                bit_fields['big'].append(
+                    (index, (length - offset - size) * 8 + shift, (1 << bits) - 1, (1 << (bits - 1)) if signed else 0))
+            else:
+                bit_fields['little'].append(
+                    (index, offset * 8 + shift, (1 << bits) - 1, (1 << (bits - 1)) if signed else 0))
+
+        # Pack byte aligned fields in as few structs as possible, a field overlapping the previous one starts a new struct
+        unpackers = []
+        for byte_order, fields in structs.items():
+            groups = []
+            for offset, size, code, index in sorted(fields):
+                if not groups or offset < groups[-1][0]:
+                    groups.append([0, byte_order, []])
+                group = groups[-1]
+                if offset > group[0]:
+                    group[1] += f"{offset - group[0]}x"
+                group[1] += code
+                group[0] = offset + size
+                group[2].append(index)
+            for _, fmt, indexes in groups:
+                unpackers.append((struct.Struct(fmt).unpack_from, tuple(indexes)))
+
+        steps = tuple((index, field.name, field.targets, field.table if field.table is not None else field.post,
+                       index in fallbacks) for index, field in enumerate(self._fields))
+        return tuple(unpackers), tuple(bit_fields['little']), tuple(bit_fields['big']), steps
+
+    def parse(self, manufacturer_data: bytes, fallback=None) -> dict:
+        """
+        Parse manufacturer data, returns values per role.
+        """
+        if (plan := self._plans.get(len(manufacturer_data), None)) is None:
+            plan = self._plans[len(manufacturer_data)] = self._compile(len(manufacturer_data))
+        unpackers, little_fields, big_fields, steps = plan
+
+        raw = [None] * len(steps)
+        for unpack_from, indexes in unpackers:
+            for index, value in zip(indexes, unpack_from(manufacturer_data)):
+                raw[index] = value
+        if little_fields:
+            frame = int.from_bytes(manufacturer_data, 'little')
+            for index, shift, mask, sign in little_fields:
+                value = (frame >> shift) & mask
+                raw[index] = value - ((value & sign) << 1)
+        if big_fields:
+            frame = int.from_bytes(manufacturer_data, 'big')
+            for index, shift, mask, sign in big_fields:
+                value = (frame >> shift) & mask
+                raw[index] = value - ((value & sign) << 1)
+
+        outputs = [{} for _ in self._roles]
+        for index, name, targets, post, is_fallback in steps:
+            if is_fallback:
+                value = (fallback or self._fallback)(self._fields[index].reg, manufacturer_data)
+            elif post.__class__ is list:
+                # Lookup table, negative raw values index it from the end
+                value = post[raw[index]]
+            else:
+                value = raw[index]
+                if post is not None:
+                    scale, bias, xlate, invalid, inval = post
+                    if scale:
+                        value = value / scale
+                    if bias:
+                        value = value + bias
+                    if xlate:
+                        value = xlate(value)
+                    if invalid and value == inval:
+                        value = None
+            if value is None:
+                continue
+            for target in targets:
+                outputs[target][name] = value
+        return dict(zip(self._roles, outputs))
@@ -0,0 +1,133 @@
+from __future__ import annotations
+import os
+import logging
+import asyncio
+import inspect
+import importlib.util
+
+
+class BleScanner(object):
+    """
+    Base class of scanner backends, running discovery on one adapter.
+    Backends are defined in 'ble_scanner_*.py' files and registered by NAME, cf. load_classes.
+
+    Advertisements are reported to 'callback(adapter, address, manufacturer_data, rssi)': 'address' is the
+    'AA:BB:CC:DD:EE:FF' device address, 'manufacturer_data' a dict of bytes keyed by manufacturer id and 'rssi' an int,
+    or None if unknown.
+
+    'filters' are the BlueZ discovery filters of an active scan, cf. org.bluez.Adapter1.SetDiscoveryFilter.
+    'manufacturer_ids' requests a passive scan only reporting those manufacturer ids, backends not supporting it raise
+    NotImplementedError when started.
+    'options' are backend specific options, as strings.
+    """
+
+    NAME = None  # To be overloaded in children classes: str, backend name
+
+    # Optional overload, adapters simulated by the backend, None to use BlueZ adapters
+    ADAPTERS = None
+
+    # Dict of scanner classes, key is backend name
+    SCANNER_CLASSES = {}
+
+    def __init__(self, adapter: str, callback, bus=None, filters: dict = None, manufacturer_ids: list = None,
+                 options: dict = None):
+        self.adapter: str = adapter
+        self.filters: dict = filters
+        self.manufacturer_ids: list = manufacturer_ids
+        self.options: dict = options or {}
+        self._callback = callback
+        self._bus = bus
+
+    @staticmethod
+    def get_class(name: str):
+        return BleScanner.SCANNER_CLASSES.get(name, None)
+
+    @staticmethod
+    def load_classes(execution_path: str):
+        scanner_classes_prefix = f"{os.path.splitext(os.path.basename(__file__))[0]}_"
+
+        # Loading backend classes, a backend whose dependencies are missing is skipped
+        for filename in os.listdir(os.path.dirname(execution_path)):
+            if filename.startswith(scanner_classes_prefix) and filename.endswith('.py'):
+                file_path = os.path.join(os.path.dirname(execution_path), filename)
+                module_name = os.path.splitext(filename)[0]
+
+                # Import the module from file
+                spec = importlib.util.spec_from_file_location(module_name, file_path)
+                if spec is None or spec.loader is None:
+                    logging.error(f"Failed to get spec for scanner class {module_name!r}@{file_path!r}")
+                    continue
+                module = importlib.util.module_from_spec(spec)
+                try:
+                    spec.loader.exec_module(module)
+                except Exception:
+                    logging.exception(f"Failed to import scanner class {module_name!r}@{file_path!r}")
+                    continue
+
+                # Check and import
+                for name, obj in inspect.getmembers(module, inspect.isclass):
+                    if obj.__module__ == module.__name__ and issubclass(obj, BleScanner) and obj is not BleScanner:
+                        name = getattr(obj, 'NAME', None)
+                        if not name:
+                            logging.error(f"Scanner class {module_name!r}@{file_path!r} has invalid NAME: {name!r}")
+                            continue
+                        if name in BleScanner.SCANNER_CLASSES:
+                            prev = BleScanner.SCANNER_CLASSES[name].__name__
+                            logging.error(
+                                f"Scanner {name!r} in {module_name!r}@{file_path!r} is already registered in {prev!r}, ignoring it")
+                            continue
+                        BleScanner.SCANNER_CLASSES[name] = obj
+                        break
+        logging.info(f"Scanner classes: {BleScanner.SCANNER_CLASSES!r}")
+
+    async def start(self):
+        raise NotImplementedError()
+
+    async def stop(self):
+        raise NotImplementedError()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.stop()
+        return False
+
+
+class BleScannerTask(BleScanner):
+    """
+    Base class of backends generating advertisements from an asyncio task instead of a radio, for tests and profiling.
+    Manufacturer ids and RSSI filters are applied before reporting advertisements.
+    """
+
+    ADAPTERS = ['virtual0']
+
+    def __init__(self, adapter: str, callback, bus=None, filters: dict = None, manufacturer_ids: list = None,
+                 options: dict = None):
+        super().__init__(adapter, callback, bus, filters, manufacturer_ids, options)
+        self._task: asyncio.Task = None
+        self._rssi_floor: int = (filters or {}).get('RSSI', None)
+        self._man_ids: set = set(manufacturer_ids) if manufacturer_ids else None
+
+    async def _run(self):
+        """
+        Generate advertisements, until cancelled.
+        """
+        raise NotImplementedError()
+
+    def _report(self, address: str, man_id: int, man_data: bytes, rssi: int):
+        if self._man_ids is not None and man_id not in self._man_ids:
+            return
+        if self._rssi_floor is not None and rssi < self._rssi_floor:
+            return
+        self._callback(self.adapter, address, {man_id: man_data}, rssi)
+
+    async def start(self):
+        self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.wait([self._task])
+            self._task = None
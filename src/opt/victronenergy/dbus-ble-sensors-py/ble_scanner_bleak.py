@@ -0,0 +1,49 @@
+import bleak
+from bleak.exc import BleakError, BleakDBusError
+import bluez_filter
+from ble_scanner import BleScanner
+
+# Advertisement monitor registration errors meaning passive scanning is not available, not that it failed this time
+_MONITOR_UNSUPPORTED_ERRORS = (
+    'org.freedesktop.DBus.Error.UnknownMethod',
+    'org.freedesktop.DBus.Error.UnknownInterface',
+    'org.freedesktop.DBus.Error.UnknownObject',
+    'org.bluez.Error.NotSupported',
+    'org.bluez.Error.InvalidArguments',
+)
+
+
+class BleScannerBleak(BleScanner):
+    """
+    Scanner backend based on bleak, supporting passive scanning through BlueZ advertisement monitors.
+    """
+
+    NAME = 'bleak'
+
+    def __init__(self, adapter: str, callback, bus=None, filters: dict = None, manufacturer_ids: list = None,
+                 options: dict = None):
+        super().__init__(adapter, callback, bus, filters, manufacturer_ids, options)
+        if manufacturer_ids:
+            kwargs = bluez_filter.scanner_args(manufacturer_ids)
+        else:
+            kwargs = {'bluez': {'filters': filters}} if filters else {}
+        self._scanner = bleak.BleakScanner(adapter=adapter, detection_callback=self._on_detection, **kwargs)
+
+    def _on_detection(self, device, advertisement_data):
+        self._callback(self.adapter, device.address, advertisement_data.manufacturer_data, advertisement_data.rssi)
+
+    async def start(self):
+        try:
+            await self._scanner.start()
+        except BleakDBusError as e:
+            if self.manufacturer_ids and e.dbus_error in _MONITOR_UNSUPPORTED_ERRORS:
+                raise NotImplementedError(f"{self.adapter}: advertisement monitors are not supported: {e}") from e
+            raise
+        except BleakError as e:
+            # Raised by bleak instead of the unknown RegisterMonitor method error
+            if self.manufacturer_ids and str(e).startswith('passive scanning'):
+                raise NotImplementedError(f"{self.adapter}: advertisement monitors are not supported: {e}") from e
+            raise
+
+    async def stop(self):
+        await self._scanner.stop()
@@ -0,0 +1,144 @@
+import logging
+import dbus
+from xml.etree import ElementTree
+from ble_scanner import BleScanner
+
+BLUEZ_SERVICE = 'org.bluez'
+ADAPTER_INTERFACE = 'org.bluez.Adapter1'
+DEVICE_INTERFACE = 'org.bluez.Device1'
+
+# Dbus types of BlueZ discovery filter values
+_FILTER_TYPES = {
+    'RSSI': dbus.Int16,
+    'Pathloss': dbus.UInt16,
+    'DuplicateData': dbus.Boolean,
+    'Discoverable': dbus.Boolean,
+}
+
+
+class BleScannerBluez(BleScanner):
+    """
+    Scanner backend listening to BlueZ device signals on the service dbus-python connection.
+
+    Only manufacturer data and RSSI are read from the signals, skipping bleak property caches, device and
+    advertisement objects. Manufacturer data are reported as received, byte arrays keyed by manufacturer id, devices
+    being only reported once their manufacturer data are known: a device without any would be ignored for a while,
+    whereas its first signals may only carry its RSSI. Passive scanning is not supported.
+    """
+
+    NAME = 'bluez'
+
+    def __init__(self, adapter: str, callback, bus=None, filters: dict = None, manufacturer_ids: list = None,
+                 options: dict = None):
+        super().__init__(adapter, callback, bus, filters, manufacturer_ids, options)
+        self._path: str = f"/org/bluez/{adapter}"
+        self._device_prefix: str = f"{self._path}/dev_"
+        # Device path -> [manufacturer data, rssi], as BlueZ only signals changed properties
+        self._devices: dict = {}
+        self._receivers: list = []
+
+    def _discovery_filter(self) -> dbus.Dictionary:
+        filters = {'Transport': 'le'}
+        filters.update(self.filters or {})
+        return dbus.Dictionary(
+            {key: _FILTER_TYPES[key](value) if key in _FILTER_TYPES else value for key, value in filters.items()},
+            signature='sv'
+        )
+
+    async def start(self):
+        if self.manufacturer_ids:
+            raise NotImplementedError(f"{self.NAME!r} backend does not support passive scanning")
+
+        self._receivers = [
+            self._bus.add_signal_receiver(
+                self._on_properties_changed,
+                signal_name='PropertiesChanged',
+                dbus_interface='org.freedesktop.DBus.Properties',
+                bus_name=BLUEZ_SERVICE,
+                arg0=DEVICE_INTERFACE,
+                path_keyword='path',
+                byte_arrays=True
+            ),
+            self._bus.add_signal_receiver(
+                self._on_interfaces_added,
+                signal_name='InterfacesAdded',
+                dbus_interface='org.freedesktop.DBus.ObjectManager',
+                bus_name=BLUEZ_SERVICE,
+                path='/',
+                arg0path=f"{self._path}/",
+                byte_arrays=True
+            ),
+            self._bus.add_signal_receiver(
+                self._on_interfaces_removed,
+                signal_name='InterfacesRemoved',
+                dbus_interface='org.freedesktop.DBus.ObjectManager',
+                bus_name=BLUEZ_SERVICE,
+                path='/',
+                arg0path=f"{self._path}/"
+            ),
+        ]
+
+        # Devices already known by the adapter, their unchanged properties will not be signaled. Only its device
+        # objects are read, instead of the whole BlueZ objects tree of all adapters, devices and GATT services.
+        introspectable = dbus.Interface(
+            self._bus.get_object(BLUEZ_SERVICE, self._path, introspect=False), 'org.freedesktop.DBus.Introspectable')
+        for node in ElementTree.fromstring(str(introspectable.Introspect())).findall('node'):
+            if (name := node.get('name', '')).startswith('dev_'):
+                self._read_device(f"{self._path}/{name}")
+
+        adapter = dbus.Interface(self._bus.get_object(BLUEZ_SERVICE, self._path), ADAPTER_INTERFACE)
+        adapter.SetDiscoveryFilter(self._discovery_filter())
+        adapter.StartDiscovery()
+
+    async def stop(self):
+        for receiver in self._receivers:
+            receiver.remove()
+        self._receivers.clear()
+        self._devices.clear()
+        try:
+            adapter = dbus.Interface(self._bus.get_object(BLUEZ_SERVICE, self._path), ADAPTER_INTERFACE)
+            adapter.StopDiscovery()
+        except dbus.exceptions.DBusException as e:
+            # Adapter removed, or discovery already stopped
+            logging.debug(f"{self.adapter}: can not stop discovery: {e}")
+
+    def _read_device(self, path: str):
+        def on_reply(props):
+            if path not in self._devices:
+                # Else signaled meanwhile, more recent
+                self._devices[path] = [props.get('ManufacturerData', None), props.get('RSSI', None)]
+
+        def on_error(error):
+            logging.debug(f"{self.adapter}: can not read device {path!r}: {error}")
+
+        self._bus.call_async(BLUEZ_SERVICE, path, 'org.freedesktop.DBus.Properties', 'GetAll', 's', (DEVICE_INTERFACE,),
+                             on_reply, on_error, byte_arrays=True)
+
+    def _on_properties_changed(self, interface, changed, invalidated, path=None):
+        if not path.startswith(self._device_prefix):
+            return
+        man_data = changed.get('ManufacturerData', None)
+        rssi = changed.get('RSSI', None)
+        if man_data is None and rssi is None:
+            # Connection, name, services... changes
+            return
+        if (device := self._devices.get(path, None)) is None:
+            device = self._devices[path] = [None, None]
+        if man_data is not None:
+            device[0] = man_data
+        if rssi is not None:
+            device[1] = rssi
+        if device[0]:
+            self._callback(self.adapter, path[-17:].replace('_', ':'), device[0], device[1])
+
+    def _on_interfaces_added(self, path, interfaces):
+        if not path.startswith(self._device_prefix) or (props := interfaces.get(DEVICE_INTERFACE, None)) is None:
+            return
+        device = self._devices[path] = [props.get('ManufacturerData', None), props.get('RSSI', None)]
+        if device[0] and device[1] is not None:
+            # Only devices with a RSSI have just been received
+            self._callback(self.adapter, path[-17:].replace('_', ':'), device[0], device[1])
+
+    def _on_interfaces_removed(self, path, interfaces):
+        if DEVICE_INTERFACE in interfaces:
+            self._devices.pop(path, None)
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from ble_scanner import BleScannerTask
+from capture import is_capture, read_capture
+from mac_address import mac_to_address
+
+
+class BleScannerReplay(BleScannerTask):
+    """
+    Scanner backend replaying captured advertisements.
+
+    Options:
+    - 'file': capture file, either a binary sniffer capture, cf. capture.py, or a text file with one advertisement per
+      line, empty lines and lines starting with '#' being ignored:
+      '<timestamp in seconds> <address> <manufacturer id> <manufacturer data hex> [rssi]',
+      i.e. '12.5 01:23:45:11:22:33 0x0059 03643c8853112233f408 -60'
+    - 'speed': replay speed factor, 1 (default) for real time, 0 for as fast as possible
+    - 'loop': 1 to replay the capture endlessly, 0 (default) to replay it once
+    """
+
+    NAME = 'replay'
+    ADAPTERS = ['replay0']
+
+    # Number of advertisements replayed before yielding to the event loop when replaying as fast as possible
+    BATCH_SIZE = 64
+
+    @staticmethod
+    def read_capture(file_path: str) -> list:
+        """
+        Read a capture file, returns (timestamp, address, manufacturer id, manufacturer data, rssi) tuples.
+        """
+        if is_capture(file_path):
+            return [(frame.timestamp, mac_to_address(frame.mac), frame.man_id, frame.man_data, frame.rssi)
+                    for frame in read_capture(file_path)]
+        frames = []
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for line_number, line in enumerate(file, 1):
+                if not (line := line.strip()) or line.startswith('#'):
+                    continue
+                try:
+                    fields = line.split()
+                    rssi = int(fields[4]) if len(fields) > 4 else -127
+                    frames.append((float(fields[0]), fields[1].upper(), int(fields[2], 0), bytes.fromhex(fields[3]), rssi))
+                except (IndexError, ValueError) as e:
+                    logging.error(f"{file_path}:{line_number}: ignoring invalid capture line {line!r}: {e}")
+        return frames
+
+    async def _run(self):
+        frames = self.read_capture(self.options['file'])
+        speed = float(self.options.get('speed', 1))
+        loop = bool(int(self.options.get('loop', 0)))
+        logging.info(f"{self.adapter}: replaying {len(frames)} advertisements from {self.options['file']!r}, speed={speed!r}")
+        while frames:
+            start_time = asyncio.get_event_loop().time()
+            first_timestamp = frames[0][0]
+            for index, (timestamp, address, man_id, man_data, rssi) in enumerate(frames):
+                if speed > 0:
+                    if (delay := start_time + (timestamp - first_timestamp) / speed - asyncio.get_event_loop().time()) > 0:
+                        await asyncio.sleep(delay)
+                elif index % self.BATCH_SIZE == 0:
+                    await asyncio.sleep(0)
+                self._report(address, man_id, man_data, rssi)
+            if not loop:
+                break
+        logging.info(f"{self.adapter}: replay finished")
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from ble_scanner import BleScannerTask
+
+
+class _SyntheticDevice(object):
+    """
+    Virtual device generating valid frames of one of the supported sensors, with slowly changing values.
+    """
+    __slots__ = ('kind', 'address', 'mac', 'counter')
+
+    def __init__(self, kind: str, index: int):
+        self.kind: str = kind
+        # Random static addresses, two most significant bits set
+        self.mac: bytes = (0xC0_5E_00_00_00_00 + index).to_bytes(6, 'big')
+        self.address: str = ':'.join(f"{byte:02X}" for byte in self.mac)
+        self.counter: int = index
+
+    def next_frame(self) -> tuple:
+        """
+        Returns the manufacturer id and data of the next advertisement.
+        """
+        self.counter = (self.counter + 1) & 0xFFFF
+        step = self.counter & 0x3F
+        match self.kind:
+            case 'mopeka':
+                # Pro check LPG, raw value and temperature changing, NIC matching the address
+                raw = 5000 + step * 10
+                return 0x0059, bytes([0x03, 0x64, 0x3C + (step & 0x0F), raw & 0xFF, 0x40 | (raw >> 8)]) + self.mac[3:] + b'\xF4\x08'
+            case 'ruuvi':
+                # Data format 5, temperature and sequence number changing, MAC matching the address
+                return 0x0499, b'\x05' + (4500 + step * 5).to_bytes(2, 'big') + \
+                    b'\x55\xA8\xC8\x7D\x00\x64\xFF\x9C\x00\x00\x05\x78\x10' + self.counter.to_bytes(2, 'big') + self.mac
+            case 'teltonika':
+                # EYE sensor, temperature changing
+                return 0x089A, b'\x01\xb7' + (2200 + step * 5).to_bytes(2, 'big') + b'\x12\x0c\xcb\x0b\xff\xc7\x67'
+        raise ValueError(f"Unknown synthetic device kind {self.kind!r}")
+
+
+class BleScannerSynthetic(BleScannerTask):
+    """
+    Scanner backend generating advertisements of virtual Mopeka, Ruuvi and Teltonika devices.
+
+    Options:
+    - 'devices': number of virtual devices, 10 by default
+    - 'interval': advertising interval of each device in seconds, 1 by default
+    - 'kinds': comma separated device kinds, assigned in turn, 'mopeka,ruuvi,teltonika' by default
+    - 'rssi': RSSI of the advertisements, -60 by default
+    """
+
+    NAME = 'synthetic'
+    ADAPTERS = ['synthetic0']
+
+    KINDS = ['mopeka', 'ruuvi', 'teltonika']
+
+    async def _run(self):
+        count = int(self.options.get('devices', 10))
+        interval = float(self.options.get('interval', 1))
+        kinds = self.options.get('kinds', ','.join(self.KINDS)).split(',')
+        rssi = int(self.options.get('rssi', -60))
+        devices = [_SyntheticDevice(kinds[index % len(kinds)], index) for index in range(count)]
+        if not devices:
+            return
+        logging.info(f"{self.adapter}: generating advertisements of {count} devices every {interval!r} seconds")
+
+        # Devices advertise in turn, frames late because of event loop load are sent in a burst, up to one interval late
+        loop = asyncio.get_event_loop()
+        period = interval / count
+        next_time = loop.time()
+        index = 0
+        while True:
+            now = loop.time()
+            next_time = max(next_time, now - interval)
+            while next_time <= now:
+                device = devices[index]
+                man_id, man_data = device.next_frame()
+                self._report(device.address, man_id, man_data, rssi)
+                index = (index + 1) % count
+                next_time += period
+            await asyncio.sleep(next_time - now)
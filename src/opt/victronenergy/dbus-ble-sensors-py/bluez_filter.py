@@ -0,0 +1,24 @@
+# Advertising data type of manufacturer specific data, cf. Bluetooth assigned numbers
+AD_TYPE_MANUFACTURER_SPECIFIC_DATA = 0xFF
+
+
+def manufacturer_or_patterns(manufacturer_ids) -> list:
+    """
+    Build BlueZ advertisement monitor 'or patterns' matching manufacturer data of the given manufacturer ids.
+    Manufacturer data starts with the little endian company identifier, patterns are (start position, ad type, content).
+    """
+    return [
+        (0, AD_TYPE_MANUFACTURER_SPECIFIC_DATA, man_id.to_bytes(2, 'little'))
+        for man_id in sorted(set(manufacturer_ids))
+    ]
+
+
+def scanner_args(manufacturer_ids) -> dict:
+    """
+    Keyword arguments of a bleak scanner only reporting advertisements of the given manufacturer ids.
+    Filtering is done by bluetoothd through an advertisement monitor, which requires a passive scanner.
+    """
+    return {
+        'scanning_mode': 'passive',
+        'bluez': {'or_patterns': manufacturer_or_patterns(manufacturer_ids)},
+    }
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import sys
+import logging
+import struct
+from collections import namedtuple
+from mac_address import mac_to_address
+from man_id import MAN_NAMES
+
+# Binary capture format, little endian:
+# - file header: FILE_MAGIC, whose 7th byte is the format version,
+# - then one record per advertisement manufacturer data field: RECORD_HEADER, followed by the adapter name
+#   (ASCII) and the manufacturer data.
+FILE_MAGIC = b'BLECAP\x01\n'
+# Timestamp (seconds since epoch), mac address (big endian), rssi, manufacturer id, data length, adapter name length
+RECORD_HEADER = struct.Struct('<d6sbHHB')
+
+CaptureFrame = namedtuple('CaptureFrame', ('timestamp', 'adapter', 'mac', 'rssi', 'man_id', 'man_data'))
+
+
+def pack_record(timestamp: float, adapter: bytes, mac: int, rssi: int, man_id: int, man_data: bytes) -> bytes:
+    rssi = -127 if rssi is None else max(-128, min(127, rssi))
+    return RECORD_HEADER.pack(timestamp, mac.to_bytes(6, 'big'), rssi, man_id, len(man_data), len(adapter)) \
+        + adapter + man_data
+
+
+def is_capture(file_path: str) -> bool:
+    """
+    Tell if the file is a binary capture, as opposed to a text one.
+    """
+    with open(file_path, 'rb') as file:
+        return file.read(len(FILE_MAGIC)) == FILE_MAGIC
+
+
+def read_capture(file_path: str):
+    """
+    Iterate over the frames of a binary capture file. A truncated last record, i.e. after a power loss, is ignored.
+    """
+    with open(file_path, 'rb') as file:
+        if file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise ValueError(f"{file_path!r} is not a capture file")
+        data = file.read()
+    offset = 0
+    while offset < len(data):
+        if offset + RECORD_HEADER.size > len(data):
+            logging.warning(f"{file_path}: ignoring truncated record at offset {offset + len(FILE_MAGIC)}")
+            break
+        timestamp, mac, rssi, man_id, data_length, adapter_length = RECORD_HEADER.unpack_from(data, offset)
+        offset += RECORD_HEADER.size
+        if offset + adapter_length + data_length > len(data):
+            logging.warning(f"{file_path}: ignoring truncated record at offset {offset - RECORD_HEADER.size + len(FILE_MAGIC)}")
+            break
+        adapter = data[offset:offset + adapter_length].decode('ascii')
+        offset += adapter_length
+        yield CaptureFrame(timestamp, adapter, int.from_bytes(mac, 'big'), rssi, man_id, data[offset:offset + data_length])
+        offset += data_length
+
+
+def main():
+    # Print a capture in the text format of the replay scanner backend
+    # To be executed with command : python3 capture.py <capture file>
+    for frame in read_capture(sys.argv[1]):
+        print(f"{frame.timestamp:.3f} {mac_to_address(frame.mac)} 0x{frame.man_id:04X} {frame.man_data.hex()} {frame.rssi}"
+              f" # {frame.adapter} {MAN_NAMES.get(frame.man_id, '?')}")
+
+
+if __name__ == "__main__":
+    main()
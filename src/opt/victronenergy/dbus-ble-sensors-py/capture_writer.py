@@ -0,0 +1,137 @@
+import os
+import logging
+import threading
+import time
+from collections import deque
+from capture import FILE_MAGIC, pack_record
+from conf import CAPTURE_MAX_SIZE, CAPTURE_BACKUP_COUNT, CAPTURE_FLUSH_INTERVAL, CAPTURE_MAX_PENDING
+
+
+class CaptureWriter(object):
+    """
+    Appends advertisements to a binary capture file, cf. capture.py, from a background thread.
+
+    Scan callbacks only timestamp and queue frames, records are packed and written in batches every 'flush_interval'
+    seconds. The file is rotated past 'max_size' bytes, keeping 'backup_count' previous files ('<file>.1' being the
+    most recent). Frames can be restricted to some manufacturer ids and/or mac addresses, frames arriving while
+    'max_pending' frames are already queued are dropped and counted.
+    """
+
+    def __init__(self, file_path: str, all_frames: bool = False, man_ids=None, macs=None,
+                 max_size: int = CAPTURE_MAX_SIZE, backup_count: int = CAPTURE_BACKUP_COUNT,
+                 flush_interval: float = CAPTURE_FLUSH_INTERVAL, max_pending: int = CAPTURE_MAX_PENDING):
+        self.file_path: str = file_path
+        self.all_frames: bool = all_frames  # All frames, or only the ones of devices not known yet
+        self.man_ids: frozenset = frozenset(man_ids or ())
+        self.macs: frozenset = frozenset(macs or ())
+        self.max_size: int = max_size
+        self.backup_count: int = backup_count
+        self.flush_interval: float = flush_interval
+        self.max_pending: int = max_pending
+        self.written: int = 0    # Records written
+        self.dropped: int = 0    # Frames dropped, writer lagging behind
+        self.rotations: int = 0  # File rotations
+        self._pending: deque = deque()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread = None
+        self._file = None
+        self._size: int = 0
+
+    def write(self, adapter: str, mac: int, rssi: int, manufacturer_data: dict):
+        """
+        Queue an advertisement, called from scan callbacks.
+        """
+        if self.macs and mac not in self.macs:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((time.time(), adapter, mac, rssi, manufacturer_data))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        logging.info(f"Capturing {'all' if self.all_frames else 'new devices'} advertisements to {self.file_path!r}")
+        self._open()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='capture-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Write pending frames and close the file.
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        try:
+            while not self._stopping.wait(self.flush_interval):
+                self._flush()
+            self._flush()
+        except Exception:
+            logging.exception(f"Capture to {self.file_path!r} failed, stopping it")
+        finally:
+            self._file.close()
+            self._file = None
+
+    def _flush(self):
+        if not self._pending:
+            return
+        batch = bytearray()
+        count = 0
+        adapters = {}
+        pending = self._pending
+        man_ids = self.man_ids
+        while pending:
+            timestamp, adapter, mac, rssi, manufacturer_data = pending.popleft()
+            if (adapter_name := adapters.get(adapter, None)) is None:
+                adapter_name = adapters[adapter] = adapter.encode('ascii', 'replace')[:255]
+            for man_id, man_data in manufacturer_data.items():
+                if man_ids and man_id not in man_ids:
+                    continue
+                batch += pack_record(timestamp, adapter_name, mac, rssi, man_id, bytes(man_data))
+                count += 1
+        if not batch:
+            return
+        if self._size + len(batch) > self.max_size and self._size > len(FILE_MAGIC):
+            self._rotate()
+        self._file.write(batch)
+        self._file.flush()
+        self._size += len(batch)
+        self.written += count
+
+    def _open(self):
+        """
+        Open the capture file, appending to it if it is a capture, starting a new one otherwise.
+        """
+        if os.path.exists(self.file_path):
+            with open(self.file_path, 'rb') as file:
+                if file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                    self._rotate_files()
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.file_path, 'ab')
+        self._size = self._file.tell()
+        if self._size == 0:
+            self._file.write(FILE_MAGIC)
+            self._size = len(FILE_MAGIC)
+
+    def _rotate(self):
+        self._file.close()
+        self._rotate_files()
+        self._open()
+        self.rotations += 1
+
+    def _rotate_files(self):
+        if self.backup_count < 1:
+            os.remove(self.file_path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(source := f"{self.file_path}.{index}"):
+                os.replace(source, f"{self.file_path}.{index + 1}")
+        os.replace(self.file_path, f"{self.file_path}.1")
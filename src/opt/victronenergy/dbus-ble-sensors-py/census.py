@@ -0,0 +1,115 @@
+import time
+from collections import OrderedDict
+from man_id import MAN_NAMES
+
+
+class _CensusEntry(object):
+    __slots__ = ('man_id', 'count', 'first_seen', 'last_seen', 'rssi_min', 'rssi_max', 'lengths')
+
+    def __init__(self, man_id: int, now: float):
+        self.man_id: int = man_id
+        self.count: int = 0
+        self.first_seen: float = now
+        self.last_seen: float = now
+        self.rssi_min: int = 127
+        self.rssi_max: int = -127
+        self.lengths: int = 0  # Bit mask of the manufacturer data lengths seen
+
+    def update(self, length: int, rssi: int, now: float):
+        self.count += 1
+        self.last_seen = now
+        if rssi < self.rssi_min:
+            self.rssi_min = rssi
+        if rssi > self.rssi_max:
+            self.rssi_max = rssi
+        self.lengths |= 1 << min(length, 255)
+
+    def get_lengths(self) -> list:
+        return [length for length in range(256) if self.lengths >> length & 1]
+
+    def to_dict(self, time_offset: float) -> dict:
+        return {
+            'man_id': self.man_id,
+            'count': self.count,
+            'first_seen': round(self.first_seen + time_offset, 3),
+            'last_seen': round(self.last_seen + time_offset, 3),
+            'rssi_min': self.rssi_min,
+            'rssi_max': self.rssi_max,
+            'lengths': self.get_lengths(),
+        }
+
+
+class DiscoveryCensus(object):
+    """
+    Aggregated statistics on advertisements of devices not known yet, per manufacturer id and per mac address:
+    frame count, first and last seen times, RSSI range and distinct manufacturer data lengths.
+
+    Both tables are bounded: frames of manufacturers past 'max_manufacturers' are only counted as overflow, and the
+    least recently seen devices are dropped past 'max_devices'. Times are given by 'clock' and converted to wall clock
+    times on dump.
+    """
+
+    def __init__(self, max_manufacturers: int, max_devices: int, clock=time.monotonic):
+        self.max_manufacturers: int = max_manufacturers
+        self.max_devices: int = max_devices
+        self.overflow: int = 0  # Frames of manufacturers not fitting in the table
+        self._clock = clock
+        self._manufacturers: dict = {}  # man_id -> _CensusEntry
+        self._devices: OrderedDict = OrderedDict()  # mac -> _CensusEntry, least recently seen first
+
+    def record(self, mac: int, manufacturer_data: dict, rssi: int, now: float):
+        """
+        Account for an advertisement, 'now' being a time of 'clock'.
+        """
+        rssi = -127 if rssi is None else rssi
+        for man_id, man_data in manufacturer_data.items():
+            if (entry := self._manufacturers.get(man_id, None)) is None:
+                if len(self._manufacturers) >= self.max_manufacturers:
+                    self.overflow += 1
+                    continue
+                entry = self._manufacturers[man_id] = _CensusEntry(man_id, now)
+            entry.update(len(man_data), rssi, now)
+
+            if (device := self._devices.get(mac, None)) is None:
+                if len(self._devices) >= self.max_devices:
+                    self._devices.popitem(last=False)
+                device = self._devices[mac] = _CensusEntry(man_id, now)
+            else:
+                self._devices.move_to_end(mac)
+            device.update(len(man_data), rssi, now)
+
+    def summary(self, now: float = None) -> dict:
+        """
+        Per manufacturer summary, as '<man_id>/<field>' keys, 'now' being a time of 'clock'.
+        """
+        now = self._clock() if now is None else now
+        devices = {}
+        for device in self._devices.values():
+            devices[device.man_id] = devices.get(device.man_id, 0) + 1
+        summary = {'Overflow': self.overflow}
+        for man_id, entry in self._manufacturers.items():
+            summary.update({
+                f"{man_id:04X}/Name": MAN_NAMES.get(man_id, ''),
+                f"{man_id:04X}/Frames": entry.count,
+                f"{man_id:04X}/Devices": devices.get(man_id, 0),
+                f"{man_id:04X}/RssiMin": entry.rssi_min,
+                f"{man_id:04X}/RssiMax": entry.rssi_max,
+                f"{man_id:04X}/Lengths": ','.join(str(length) for length in entry.get_lengths()),
+                f"{man_id:04X}/LastSeen": int(now - entry.last_seen),
+            })
+        return summary
+
+    def dump(self) -> dict:
+        """
+        Full census, with wall clock times, to be serialized as JSON.
+        """
+        time_offset = time.time() - self._clock()
+        return {
+            'overflow': self.overflow,
+            'manufacturers': [dict(name=MAN_NAMES.get(man_id, ''), **entry.to_dict(time_offset))
+                              for man_id, entry in self._manufacturers.items()],
+            'devices': [dict(mac=f"{mac:012x}", **entry.to_dict(time_offset)) for mac, entry in self._devices.items()],
+        }
+
+    def __len__(self):
+        return len(self._devices)
@@ -7,7 +7,47 @@ PROCESS_VERSION = '1.1.1'
 
 # Timeouts
 IGNORED_DEVICES_TIMEOUT = 600  # 10 min
+IGNORED_DEVICES_MAX = 2048  # Least recently seen ignored devices are evaluated again past this size
 DEVICE_SERVICES_TIMEOUT = 1800  # 30 min
 SCAN_TIMEOUT = 15
 SCAN_INTERVAL_STANDARD = 20  # 90
 SCAN_SLEEP = max(0, SCAN_INTERVAL_STANDARD - SCAN_TIMEOUT)
+FAILURE_BACKOFF_MIN = 10  # Delay before retrying a device whose initialization failed, doubled on each failure
+FAILURE_BACKOFF_MAX = 3600  # Maximum delay before retrying a device whose initialization failed
+FAILURES_MAX = 256  # Maximum number of failed devices kept, oldest failures are retried first past this size
+DISCOVERY_TIMEOUT = 600  # Discovery mode duration, back to operating mode afterwards
+PRUNE_INTERVAL = 60  # Known/ignored device lists housekeeping period
+BLUEZ_REMOVE_BATCH = 32  # Stale BlueZ device objects removed per housekeeping period at most, the others wait
+PAYLOAD_REFRESH_INTERVAL = 30  # Default period after which an unchanged manufacturer data is processed again
+
+# Parsing
+REGS_LUT_MAX_BITS = 12  # Scale, bias and xlate results of regs up to this size are tabulated, cf. ble_regs.py
+LOOKUP_TABLES_MAX = 64  # Maximum number of device lookup tables, cf. BleDevice.lookup_table, cleared past this size
+DATA_DIR = '/data'  # Persistent and writable partition of Venus OS, the code one being read-only
+DEFINITION_CACHE_DIR = os.path.join(DATA_DIR, 'var', 'cache', PROCESS_NAME)  # Compiled definitions, if no XDG_CACHE_HOME
+
+# Hot path logging
+HOT_LOG_INTERVAL = 60  # Rate limiting period of per device messages, in seconds
+HOT_LOG_BURST = 2  # Number of identical per device messages emitted per period, others being summarized
+HOT_LOG_MAX_KEYS = 1024  # Maximum number of rate limited messages tracked, all are summarized past this size
+
+# Discovery census
+CENSUS_MAX_MANUFACTURERS = 64  # Manufacturer ids accounted for, frames of other ones are only counted as overflow
+CENSUS_MAX_DEVICES = 512  # Devices accounted for, least recently seen ones are dropped past this size
+CENSUS_DUMP_FILE = '/var/log/dbus-ble-sensors-py/census.json'  # Written when setting /Census/Dump to 1
+
+# Scanning
+INGEST_QUEUE_SIZE = 512  # Maximum number of advertisement records waiting to be processed
+INGEST_BATCH_SIZE = 32  # Number of records processed before yielding to the event loop
+SCAN_BACKEND = 'bleak'  # Default scanner backend, cf. ble_scanner_*.py files, can be changed with --backend option
+SCAN_PERSISTENT = True  # Keep one scanner open per adapter and duty cycle callbacks instead of restarting discovery
+ADAPTER_DEDUP_WINDOW = 2  # Frames identical to the last one of a device are dropped within this period, in seconds
+ADAPTER_RSSI_HYSTERESIS = 6  # Signal gain, in dB, needed for another adapter to take a device over
+ADAPTER_FAILOVER_TIMEOUT = 60  # A device is pinned to another adapter when its adapter did not hear it for this period
+
+# Sniffer capture
+CAPTURE_FILE = '/var/log/dbus-ble-sensors-py/sniffer.cap'  # Default capture file of sniffer mode
+CAPTURE_MAX_SIZE = 4 * 1024 * 1024  # Capture file is rotated past this size, in bytes
+CAPTURE_BACKUP_COUNT = 1  # Number of rotated capture files kept
+CAPTURE_FLUSH_INTERVAL = 1  # Period of capture writes, in seconds
+CAPTURE_MAX_PENDING = 8192  # Maximum number of frames waiting to be written, newer frames are dropped past this size
@@ -4,24 +4,41 @@ import os
 sys.path.insert(1, os.path.join(os.path.dirname(__file__), 'ext'))
 sys.path.insert(1, os.path.join(os.path.dirname(__file__), 'ext', 'velib_python'))
 import logging
-from logging.handlers import RotatingFileHandler
 import asyncio
+import atexit
+import json
 import dbus
 from dbus.mainloop.glib import DBusGMainLoop
 from argparse import ArgumentParser
 from ble_device import BleDevice
 from ble_role import BleRole
 from dbus_ble_service import DbusBleService
-import bleak
+from payload_cache import PayloadCache
+from ingest_throttle import IngestThrottle
+from ingest_queue import IngestQueue
+from expiring_table import ExpiringTable, BoundedExpiringSet
+from adapter_selector import AdapterSelector
+from failure_cache import FailureCache
+from mac_address import MacAddressCache, mac_to_int, mac_to_str
+from capture_writer import CaptureWriter
+from census import DiscoveryCensus
+from hot_log import HOT_LOG
+from ble_scanner import BleScanner
+from scan_profiles import ScanProfile, get_scan_profile
 import gbulb
 from logger import setup_logging
-from collections.abc import MutableMapping
 import time
-from conf import SCAN_TIMEOUT, SCAN_SLEEP, IGNORED_DEVICES_TIMEOUT, DEVICE_SERVICES_TIMEOUT, PROCESS_VERSION
-from man_id import MAN_NAMES
+from collections import OrderedDict
+from xml.etree import ElementTree
+from conf import SCAN_TIMEOUT, SCAN_SLEEP, SCAN_PERSISTENT, SCAN_BACKEND, PRUNE_INTERVAL, BLUEZ_REMOVE_BATCH, INGEST_QUEUE_SIZE, INGEST_BATCH_SIZE, IGNORED_DEVICES_TIMEOUT, IGNORED_DEVICES_MAX, DEVICE_SERVICES_TIMEOUT, PROCESS_VERSION
+from conf import ADAPTER_DEDUP_WINDOW, ADAPTER_RSSI_HYSTERESIS, ADAPTER_FAILOVER_TIMEOUT
+from conf import FAILURE_BACKOFF_MIN, FAILURE_BACKOFF_MAX, FAILURES_MAX, DISCOVERY_TIMEOUT, CAPTURE_FILE, CAPTURE_MAX_SIZE
+from conf import CENSUS_MAX_MANUFACTURERS, CENSUS_MAX_DEVICES, CENSUS_DUMP_FILE
+
+# Errors of BlueZ objects which do not exist, i.e. device objects of another adapter or already removed
+_BLUEZ_MISSING_ERRORS = ('org.freedesktop.DBus.Error.UnknownObject', 'org.freedesktop.DBus.Error.UnknownMethod',
+                         'org.freedesktop.DBus.Error.InvalidArgs', 'org.bluez.Error.DoesNotExist')
 
-SNIF_LOGGER = logging.getLogger("sniffer")
-SNIF_LOGGER.propagate = False
 
 class DbusBleSensors(object):
     """
@@ -36,210 +53,664 @@ class DbusBleSensors(object):
     TODO: Handle ve item format using units definition on GetText callbacks ?
     """
 
-    def __init__(self):
+    def __init__(self, capture: CaptureWriter = None, backend: str = SCAN_BACKEND, backend_options: dict = None):
         # Get dbus, default is system
         self._dbus: dbus.Bus = dbus.SessionBus() if 'DBUS_SESSION_BUS_ADDRESS' in os.environ else dbus.SystemBus()
         # Accessor to dbus ble dedicated service (default : com.victronenergy.ble)
         self._dbus_ble_service = DbusBleService()
 
-        # Initialze BT adapters search
-        self._adapters = []
-        self._list_adapters()
+        # Scanner backend, needed first as it may simulate adapters
+        BleScanner.load_classes(os.path.abspath(__file__))
+        if (scanner_class := BleScanner.get_class(backend)) is None:
+            raise ValueError(f"Unknown scanner backend {backend!r}, available: {list(BleScanner.SCANNER_CLASSES.keys())!r}")
+        self._scanner_class = scanner_class
+        self._backend_options: dict = backend_options or {}
+        logging.info(f"Using {backend!r} scanner backend, options={self._backend_options!r}")
 
-        # Known device lists
-        self._known_mac = DatedDict(ttl=DEVICE_SERVICES_TIMEOUT)
-        self._ignored_mac = DatedDict(ttl=IGNORED_DEVICES_TIMEOUT)
+        # BT adapters, searched once the state their callbacks use is initialized, cf. end of __init__
+        self._adapters = []
+        self._bluez_adapters: dict = {}  # Adapter name -> org.bluez.Adapter1 interface, BlueZ adapters only
+        self._bluez_signals = 0         # Adapter added/removed signals received
+        self._bluez_removed = 0         # Stale device objects removed from BlueZ
+        self._bluez_kept = 0            # Stale device objects kept as paired, trusted or connected
+        self._bluez_remove_errors = 0   # Device objects removal errors, other than already removed
+        self._bluez_stale: OrderedDict = OrderedDict()  # Macs of device objects to remove from BlueZ, oldest first
+
+        # Per adapter scheduler tasks, created once the event loop runs, and adapters currently in a scan window
+        self._scan_tasks: dict = None
+        self._active_adapters: set = set()
+
+        # Known device lists, keyed by integer mac address
+        self._mac_cache = MacAddressCache()
+        self._known_mac = ExpiringTable(ttl=DEVICE_SERVICES_TIMEOUT)
+        # Capped as rotating random addresses of phones and watches would make it grow without bound
+        self._ignored_mac = BoundedExpiringSet(ttl=IGNORED_DEVICES_TIMEOUT, max_size=IGNORED_DEVICES_MAX, keep_evicted=True)
+
+        # Operating mode: only devices enabled in settings are processed, unless discovery is on
+        self._owned_mac: set = set()
+        self._owned_only = False
+        self._operating_mode = False
+        self._discovery_end_time = None
+        self._dbus_ble_service.init_operating_mode(self._on_operating_mode_changed)
+        self._dbus_ble_service.init_discovery(self._on_discovery_changed)
+        self._dbus_ble_service.init_device_enabled(self._on_device_enabled_changed)
+        self._on_operating_mode_changed(self._dbus_ble_service.get_operating_mode())
+
+        # Sniffer mode capture, all frames being captured from scan callbacks or only the ones of new devices
+        self._capture: CaptureWriter = capture
+        self._capture_all: CaptureWriter = capture if capture is not None and capture.all_frames else None
+
+        # Statistics on advertisements of devices not known yet, published under /Census and dumped on demand
+        self._census = DiscoveryCensus(max_manufacturers=CENSUS_MAX_MANUFACTURERS, max_devices=CENSUS_MAX_DEVICES)
+        self._dbus_ble_service.init_census_dump(self._on_census_dump)
+
+        # Manufacturer id filtering by bluetoothd, disabled when sniffing or on adapters where it failed
+        self._filtered_adapters: set = set()
+        self._filter_failed: set = set()
+        self._dbus_ble_service.init_filtered_scan(self._on_filtered_scan_changed)
+
+        # Scan parameters: active or passive scanning, BlueZ filters, RSSI floor and processing duty cycle
+        self._scan_profile: ScanProfile = None
+        self._dbus_ble_service.init_scan_profile(self._on_scan_profile_changed)
+        self._on_scan_profile_changed(self._dbus_ble_service.get_scan_profile())
+
+        # Last manufacturer data per known device, to skip identical frames
+        self._payload_cache = PayloadCache(refresh=0)
+        self._dbus_ble_service.init_payload_refresh(self._on_payload_refresh_changed)
+        self._on_payload_refresh_changed(self._dbus_ble_service.get_payload_refresh())
+
+        # Best adapter per device, so that frames heard by several adapters are processed once
+        self._adapter_selector = AdapterSelector(
+            window=ADAPTER_DEDUP_WINDOW, hysteresis=ADAPTER_RSSI_HYSTERESIS, failover=ADAPTER_FAILOVER_TIMEOUT)
+
+        # Devices whose initialization failed, retried with an exponential backoff
+        self._failures = FailureCache(backoff_min=FAILURE_BACKOFF_MIN, backoff_max=FAILURE_BACKOFF_MAX,
+                                      max_size=FAILURES_MAX, publish=self._publish_failure)
+
+        # Advertisement records waiting to be processed, filled by scan callbacks
+        self._ingest_queue = IngestQueue(maxsize=INGEST_QUEUE_SIZE)
+
+        # Per device processing rate limiter
+        self._throttle = IngestThrottle(call_later=self._call_later)
+        self._dbus_ble_service.init_process_interval(self._on_process_interval_changed)
 
         # Load definition classes
         BleRole.load_classes(os.path.abspath(__file__))
         BleDevice.load_classes(os.path.abspath(__file__))
 
+        # Initialize BT adapters search, last as adapter callbacks use all of the above
+        self._list_adapters()
+
+    def _on_payload_refresh_changed(self, value):
+        self._payload_cache.refresh = int(value)
+
+    def _on_process_interval_changed(self, value):
+        for dev_instance in self._known_mac.values():
+            dev_instance.update_process_interval(global_interval=value)
+
+    def _on_filtered_scan_changed(self, value):
+        # Restart scanners to apply the new mode
+        self._filter_failed.clear()
+        for adapter in list(self._adapters):
+            self._restart_scheduler(adapter)
+
+    def _on_scan_profile_changed(self, value):
+        profile = get_scan_profile(value)
+        if profile.name != value:
+            logging.warning(f"Unknown scan profile {value!r}, using {profile.name!r}")
+        if profile is self._scan_profile:
+            return
+        logging.info(f"Using scan profile {profile.name!r}")
+        self._scan_profile = profile
+        for adapter in list(self._adapters):
+            self._restart_scheduler(adapter)
+
+    def _on_operating_mode_changed(self, value):
+        if bool(value) != self._operating_mode:
+            self._operating_mode = bool(value)
+            self._load_owned_mac()
+        self._update_owned_only()
+
+    def _on_device_enabled_changed(self, dev_mac: str, is_enabled: bool):
+        if not self._operating_mode:
+            # Loaded once operating mode is on
+            return
+        if is_enabled:
+            self._owned_mac.add(mac_to_int(dev_mac))
+        else:
+            self._owned_mac.discard(mac_to_int(dev_mac))
+
+    def _on_discovery_changed(self, value):
+        if value:
+            self._discovery_end_time = time.monotonic() + DISCOVERY_TIMEOUT
+            self._call_later(DISCOVERY_TIMEOUT, self._end_discovery)
+            logging.info(f"Discovering new devices for {DISCOVERY_TIMEOUT!r} seconds")
+        else:
+            self._discovery_end_time = None
+        self._update_owned_only()
+
+    def _end_discovery(self):
+        if self._discovery_end_time is None or time.monotonic() < self._discovery_end_time:
+            # Discovery stopped, or restarted since this timer was set
+            return
+        logging.info("Discovery timeout, back to operating mode")
+        self._dbus_ble_service.set_discovery(0)
+        self._on_discovery_changed(0)
+
+    def _on_census_dump(self, value):
+        if not value:
+            return
+        try:
+            with open(CENSUS_DUMP_FILE, 'w', encoding='utf-8') as file:
+                json.dump(self._census.dump(), file, indent=1)
+            logging.info(f"Discovery census of {len(self._census)} devices dumped to {CENSUS_DUMP_FILE!r}")
+        except OSError as e:
+            logging.error(f"Can not dump discovery census to {CENSUS_DUMP_FILE!r}: {e}")
+        # Back to 0 once the new value is stored, for the next request
+        self._call_later(0, self._dbus_ble_service.set_census_dump, 0)
+
+    def _load_owned_mac(self):
+        """
+        Load devices enabled in settings, only when operating mode is turned on as reading all device settings is
+        slow. They are then kept up to date by role 'Enabled' changes, cf. _on_device_enabled_changed.
+        """
+        if self._operating_mode:
+            self._owned_mac = {mac_to_int(dev_mac) for dev_mac in self._dbus_ble_service.get_enabled_device_macs()}
+        else:
+            self._owned_mac = set()
+
+    def _update_owned_only(self):
+        self._owned_only = self._operating_mode and self._discovery_end_time is None
+
+    def _publish_failure(self, key: tuple, description: str):
+        dev_mac, man_id = key
+        self._dbus_ble_service.set_device_failure(mac_to_str(dev_mac), man_id, description)
+
+    @staticmethod
+    def _call_later(delay: float, callback, *args):
+        asyncio.get_event_loop().call_later(delay, callback, *args)
+
     def _list_adapters(self):
-        # Adding callback for future connections/disconnections
+        if self._scanner_class.ADAPTERS is not None:
+            # Simulated adapters, no BlueZ involved
+            for name in self._scanner_class.ADAPTERS:
+                self._adapters.append(name)
+                self._dbus_ble_service.add_ble_adapter(name, '00:00:00:00:00:00')
+            return
+
+        # Adding callback for future connections/disconnections, matching BlueZ objects namespace only. Object paths
+        # are only matched by 'arg0path' rules, device objects below adapters are dropped by the callbacks.
         self._dbus.add_signal_receiver(
             self._on_interfaces_added,
             dbus_interface='org.freedesktop.DBus.ObjectManager',
-            signal_name='InterfacesAdded'
+            signal_name='InterfacesAdded',
+            bus_name='org.bluez',
+            path='/',
+            arg0path='/org/bluez/'
         )
         self._dbus.add_signal_receiver(
             self._on_interfaces_removed,
             dbus_interface='org.freedesktop.DBus.ObjectManager',
-            signal_name='InterfacesRemoved'
+            signal_name='InterfacesRemoved',
+            bus_name='org.bluez',
+            path='/',
+            arg0path='/org/bluez/'
         )
 
-        # Initial search for adapters
-        object_manager = dbus.Interface(
-            self._dbus.get_object('org.bluez', '/'),
-            'org.freedesktop.DBus.ObjectManager'
+        # Initial search for adapters, introspecting BlueZ root instead of getting the whole objects tree
+        introspectable = dbus.Interface(
+            self._dbus.get_object('org.bluez', '/org/bluez', introspect=False),
+            'org.freedesktop.DBus.Introspectable'
         )
-        objects = object_manager.GetManagedObjects()
-        for path, ifaces in objects.items():
-            self._on_interfaces_added(path, ifaces)
+        for node in ElementTree.fromstring(str(introspectable.Introspect())).findall('node'):
+            path = f"/org/bluez/{node.get('name')}"
+            try:
+                self._add_adapter(path)
+            except dbus.exceptions.DBusException as e:
+                logging.debug(f"{path}: not an adapter: {e}")
+
+    @staticmethod
+    def _is_adapter_path(path: str) -> bool:
+        # Adapter objects are /org/bluez/<adapter>, their devices being below them
+        return path.startswith('/org/bluez/') and path.count('/') == 3
 
     def _on_interfaces_added(self, path, interfaces):
-        if not str(path).startswith('/org/bluez'):
+        self._bluez_signals += 1
+        if not self._is_adapter_path(str(path)):
             return
-        name = path.split('/')[-1]
         if 'org.bluez.Adapter1' in interfaces:
-            adapter = self._dbus.get_object('org.bluez', path)
-            props = dbus.Interface(adapter, 'org.freedesktop.DBus.Properties')
-            mac = props.Get('org.bluez.Adapter1', 'Address')
-            logging.info(f"{name}: adding adapter, path={path!r}, address={mac!r}")
-            if name not in self._adapters:
-                self._adapters.append(name)
-                self._dbus_ble_service.add_ble_adapter(name, mac)
+            self._add_adapter(path)
+
+    def _add_adapter(self, path: str):
+        name = path.split('/')[-1]
+        adapter = self._dbus.get_object('org.bluez', path, introspect=False)
+        props = dbus.Interface(adapter, 'org.freedesktop.DBus.Properties')
+        mac = props.Get('org.bluez.Adapter1', 'Address')
+        logging.info(f"{name}: adding adapter, path={path!r}, address={mac!r}")
+        if name not in self._adapters:
+            self._adapters.append(name)
+            self._bluez_adapters[name] = dbus.Interface(adapter, 'org.bluez.Adapter1')
+            self._dbus_ble_service.add_ble_adapter(name, mac)
+            self._start_scheduler(name)
 
     def _on_interfaces_removed(self, path, interfaces):
-        if not str(path).startswith('/org/bluez'):
+        self._bluez_signals += 1
+        if not self._is_adapter_path(str(path)):
             return
         name = path.split('/')[-1]
-        if 'org.bluez.Adapter1' in interfaces:
+        if 'org.bluez.Adapter1' in interfaces and name in self._adapters:
             # Remove adapter
             self._dbus_ble_service.remove_ble_adapter(name)
             self._adapters.remove(name)
+            self._bluez_adapters.pop(name, None)
+            self._stop_scheduler(name)
+            self._adapter_selector.forget_adapter(name)
             logging.info(f"{name}: adapter removed")
 
-    async def _scan(self, adapter: str):
-        def _scan_callback(device, advertisement_data):
-            dev_mac = "".join(device.address.split(':')).lower()
+    def _reap_bluez_devices(self):
+        """
+        Prune ignored and rejected devices, and drop the ones not seen for a while, or evicted by the size cap of their
+        list, from BlueZ as well. At most BLUEZ_REMOVE_BATCH devices are removed per call, so that a burst of expiries
+        does not flood bluetoothd with requests, the others are removed by the next calls.
+        """
+        rejected = BleDevice.DEVICE_INDEX.rejected
+        stale = self._ignored_mac.prune() + self._ignored_mac.pop_evicted()
+        stale += [rejected_key[0] for rejected_key in rejected.prune() + rejected.pop_evicted()]
+        if self._scanner_class.ADAPTERS is not None:
+            # Simulated adapters, no BlueZ device objects
+            return
+        for dev_mac in stale:
+            self._bluez_stale[dev_mac] = None
+            self._bluez_stale.move_to_end(dev_mac)
+        while len(self._bluez_stale) > IGNORED_DEVICES_MAX:
+            # Flooded with random addresses, left to BlueZ temporary devices expiry
+            self._bluez_stale.popitem(last=False)
+        removed = 0
+        while self._bluez_stale and removed < BLUEZ_REMOVE_BATCH:
+            dev_mac, _ = self._bluez_stale.popitem(last=False)
+            if dev_mac in self._known_mac.keys():
+                # Rejected frames of a known device, i.e. of another model byte
+                continue
+            self._remove_bluez_device(dev_mac)
+            removed += 1
+
+    def _remove_bluez_device(self, dev_mac: int):
+        """
+        Remove the device object of a stale device from BlueZ, so that bluetoothd does not keep accumulating them.
+        The adapter which created it is not known: its properties are read on all adapters, and it is only removed
+        from the one having it, unless it is paired, trusted or connected.
+        """
+        address = f"{dev_mac:012X}"
+        device_name = 'dev_' + '_'.join(address[index:index + 2] for index in range(0, 12, 2))
+
+        def on_reply():
+            self._bluez_removed += 1
+
+        def on_error(error):
+            if error.get_dbus_name() not in _BLUEZ_MISSING_ERRORS:
+                self._bluez_remove_errors += 1
+                logging.debug(f"{device_name}: can not remove BlueZ device: {error}")
+
+        for adapter, adapter_interface in self._bluez_adapters.items():
+            device_path = f"/org/bluez/{adapter}/{device_name}"
+
+            def on_properties(props, adapter_interface=adapter_interface, device_path=device_path):
+                if any(props.get(name, False) for name in ('Paired', 'Trusted', 'Connected')):
+                    # Used by something else than this service, i.e. a phone or a keyboard
+                    self._bluez_kept += 1
+                    return
+                adapter_interface.RemoveDevice(
+                    dbus.ObjectPath(device_path), reply_handler=on_reply, error_handler=on_error)
+
+            self._dbus.call_async('org.bluez', device_path, 'org.freedesktop.DBus.Properties', 'GetAll', 's',
+                                  ('org.bluez.Device1',), on_properties, on_error)
+
+    def _scan_callback(self, adapter: str, address: str, manufacturer_data: dict, rssi: int):
+        """
+        Scanner detection callback, kept as light as possible: frames are only filtered and queued.
+        """
+        if adapter not in self._active_adapters:
+            # Scanner kept open between processing windows, advertisements are dropped while paused
+            return
+        dev_mac = self._mac_cache.to_int(address)
+        if self._capture_all is not None and manufacturer_data:
+            self._capture_all.write(adapter, dev_mac, rssi, manufacturer_data)
+        if (rssi_floor := self._scan_profile.rssi_floor) is not None and (rssi or -127) < rssi_floor:
+            # Too far away, also filtered by BlueZ on active scanners
+            return
+        if self._owned_only and dev_mac not in self._owned_mac:
+            # Operating mode, not a device enabled in settings
+            return
+        now = time.monotonic()
+        if (dev_instance := self._known_mac.get(dev_mac, None)) is None:
+            if manufacturer_data:
+                self._census.record(dev_mac, manufacturer_data, rssi, now)
             if dev_mac in self._ignored_mac:
                 # Ignoring devices already evaluated
                 return
 
-            plog = f"{dev_mac} - {device.name}:"
-            logging.debug(f"{plog} received advertisement {advertisement_data!r}")
-            if advertisement_data.manufacturer_data is None or len(advertisement_data.manufacturer_data) < 1:
-                logging.info(f"{plog} ignoring, device without manufacturer data")
-                self._ignored_mac[dev_mac] = True
-                return
+        HOT_LOG.debug(dev_mac, "%s: received advertisement %r, rssi=%r", address, manufacturer_data, rssi)
+        if manufacturer_data is None or len(manufacturer_data) < 1:
+            logging.info(f"{address}: ignoring, device without manufacturer data")
+            self._ignored_mac.add(dev_mac)
+            return
 
-            # Loop through manufacturer data fields, even though most devices only use one
-            for man_id, man_data in advertisement_data.manufacturer_data.items():
-                if dev_mac not in self._known_mac:
-                    # Snif new device advertising data
-                    self.snif_data(man_id, man_data)
-
-                    # Get device class from manufacturer id
-                    device_class = BleDevice.DEVICE_CLASSES.get(man_id, None)
-                    if device_class is None:
-                        logging.info(f"{plog} ignoring data {man_data!r}, no device configuration class for manufacturer {man_id!r}")
-                        self._ignored_mac[dev_mac] = True
-                        continue
-
-                    # Run device specific parsing
-                    logging.info(f"{plog} initializing device with class {device_class}")
-                    try:
-                        dev_instance = device_class(dev_mac)
-                        if not dev_instance.check_manufacturer_data(man_data):
-                            raise ValueError(f"{plog} ignoring data {man_data!r}, manufacturer data check failed")
-                        dev_instance.configure(man_data)
-                        dev_instance.init()
-                        self._known_mac[dev_mac] = dev_instance
-                    except Exception as e:
-                        logging.exception(f"{plog} ignoring data {man_data!r}, an error occurred during device initialization:")
-                        continue
-                else:
-                    dev_instance = self._known_mac[dev_mac]
+        priority = IngestQueue.PRIORITY_DISCOVERY
+        multi_adapter = len(self._adapters) > 1
 
-                # Parsing data
-                logging.info(f"{plog} received manufacturer data: {man_data!r}")
-                if dev_instance.check_manufacturer_data(man_data):
-                    dev_instance.handle_manufacturer_data(man_data)
-                else:
-                    logging.info(f"{plog} ignoring manufacturer data due to data check")
+        # Loop through manufacturer data fields, even though most devices only use one
+        for man_id, man_data in manufacturer_data.items():
+            # Keep frames of the device best adapter only
+            if multi_adapter and not self._adapter_selector.accept(dev_mac, adapter, man_data, rssi, now):
+                continue
+            if dev_instance is not None:
+                # Skip rebroadcasts of the same data, only recorded once dequeued as the queue may shed this frame
+                if self._payload_cache.is_recorded(dev_mac, man_data, now):
+                    continue
+                priority = IngestQueue.PRIORITY_ENABLED if dev_instance.enabled else IngestQueue.PRIORITY_KNOWN
+            self._ingest_queue.put(priority, (dev_mac, man_id, man_data, rssi, now, adapter))
+
+    async def _ingest_loop(self):
+        """
+        Drain queued advertisement records in batches, yielding to the event loop between batches.
+        """
+        while True:
+            await self._ingest_queue.wait()
+            for record in self._ingest_queue.get_batch(INGEST_BATCH_SIZE):
+                try:
+                    self._ingest(*record)
+                except Exception:
+                    logging.exception(f"{record[0]:012x}: error processing manufacturer data {record[2]!r}")
+            await asyncio.sleep(0)
+
+    def _ingest(self, dev_mac: int, man_id: int, man_data: bytes, rssi: int, timestamp: float, adapter: str):
+        plog = f"{dev_mac:012x}:"
+        if (dev_instance := self._known_mac.get(dev_mac, None)) is None:
+            if dev_mac in self._ignored_mac:
+                # Ignored while the record was queued
+                return
 
-        logging.debug(f"{adapter}: Scanning ...")
-        try:
-            async with bleak.BleakScanner(adapter=adapter, detection_callback=_scan_callback) as scanner:
-                await asyncio.sleep(SCAN_TIMEOUT)
-            logging.debug(f"{adapter}: Scan finished")
-        except Exception:
-            logging.exception(f"{adapter}: Scan error")
+            # Capture new device advertising data
+            if self._capture is not None and self._capture_all is None:
+                self._capture.write(adapter, dev_mac, rssi, {man_id: man_data})
 
-    async def scan_loop(self):
-        while True:
-            # Start scans on all adapters
-            if len(self._adapters) < 1:
-                logging.warning("Waiting for a bluetooth adapter...")
-                await asyncio.sleep(5)
-                continue
-            scan_tasks = [asyncio.create_task(self._scan(adapter)) for adapter in self._adapters]
-            await asyncio.gather(*scan_tasks)
+            # Get device class from manufacturer id and data discriminators
+            if man_id not in BleDevice.DEVICE_CLASSES:
+                # Rate limited per manufacturer, as phones and the like rotating random addresses would flood logs
+                HOT_LOG.info(man_id, "%s ignoring data %r, no device configuration class for manufacturer %r",
+                             plog, man_data, man_id)
+                self._ignored_mac.add(dev_mac)
+                return
+            device_class = BleDevice.DEVICE_INDEX.lookup(man_id, man_data, dev_mac)
+            if device_class is None:
+                # Other frames of the device may match, i.e. of another kind or length, so it is not ignored
+                HOT_LOG.debug(man_id, "%s ignoring data %r, not matching device classes of manufacturer %r",
+                              plog, man_data, man_id)
+                return
 
-            # Clean known/ignored device lists
-            self._known_mac.prune()
-            self._ignored_mac.prune()
+            # Skip devices whose initialization recently failed, all failures are retried on classes reload
+            if self._failures.generation != BleDevice.CLASSES_GENERATION:
+                self._failures.clear(BleDevice.CLASSES_GENERATION)
+            if not self._failures.should_retry((dev_mac, man_id)):
+                return
 
-            # Wait before next scan if needed
-            if self._dbus_ble_service.get_continuous_scan():
-                logging.debug(f"{self._adapters}: continuous scan on, restarting scan immediately")
-            else:
-                logging.debug(f"{self._adapters}: continuous scan off, pausing for {SCAN_SLEEP!r} seconds")
-                await asyncio.sleep(SCAN_SLEEP)
+            # Run device specific parsing
+            logging.info(f"{plog} initializing device with class {device_class}")
+            dev_instance = None
+            try:
+                dev_instance = device_class(mac_to_str(dev_mac))
+                if not dev_instance.check_manufacturer_data(man_data):
+                    raise ValueError("manufacturer data check failed")
+                dev_instance.load_model(man_data)
+                dev_instance.init()
+                self._known_mac[dev_mac] = dev_instance
+            except Exception as e:
+                count = self._failures.record((dev_mac, man_id), f"{type(e).__name__}: {e}")
+                if count == 1:
+                    logging.exception(f"{plog} ignoring data {man_data!r}, an error occurred during device initialization:")
+                else:
+                    logging.info(f"{plog} ignoring data {man_data!r}, device initialization failed {count} times: {e}")
+                if dev_instance is not None:
+                    # Release services created before the failure
+                    dev_instance.delete()
+                return
+            self._failures.discard((dev_mac, man_id))
 
-    def snif_data(self, man_id: int, man_data: bytes):
-        """
-        Snif advertising data for given manufacturer id and data.
-        Used for external sniffer mode.
-        """
-        man_name = MAN_NAMES.get(man_id, hex(man_id).upper())
-        SNIF_LOGGER.info(f"{man_name!r}: {man_data!r}")
+            # Record first data for de-duplication of the next ones
+            self._payload_cache.is_duplicate(dev_mac, man_data, timestamp)
+        elif self._payload_cache.is_duplicate(dev_mac, man_data, timestamp):
+            # Same data queued several times before the first one was processed
+            return
 
-class DatedDict(MutableMapping):
-    """
-    Dict keeping timestamps for each entries so that older ones can be purged.
-    Refreshes timestamp on read. Manual pruning required.
-    """
+        if dev_instance.adapter != adapter:
+            logging.info(f"{dev_instance._plog} received through adapter {adapter!r}")
+            dev_instance.adapter = adapter
+            self._dbus_ble_service.set_device_adapter(dev_instance.info, adapter)
 
-    def __init__(self, ttl):
-        self.ttl = ttl
-        self._store = {}
+        # Process data, at most once per device processing interval
+        self._throttle.submit(dev_mac, dev_instance.process_interval,
+                              self._process_manufacturer_data, dev_mac, man_data)
 
-    def _now(self): return time.monotonic()
+    def _process_manufacturer_data(self, dev_mac: int, man_data: bytes):
+        if (dev_instance := self._known_mac.get(dev_mac, None)) is None:
+            # Device removed while its data was pending
+            return
 
-    def __setitem__(self, key, value):
-        self._store[key] = (value, self._now() + self.ttl)
+        # Parsing data
+        plog = dev_instance._plog
+        HOT_LOG.info(dev_mac, "%s received manufacturer data: %r", plog, man_data)
+        if dev_instance.check_manufacturer_data(man_data):
+            dev_instance.handle_manufacturer_data(man_data)
+        else:
+            HOT_LOG.info(dev_mac, "%s ignoring manufacturer data due to data check", plog)
 
-    def __getitem__(self, key):
-        value, _ = self._store[key]
-        # refresh on read
-        self._store[key] = (value, self._now() + self.ttl)
-        return value
+    def _processing_window(self, adapter: str, now: float) -> tuple:
+        """
+        Tell if the adapter is in a processing window and for how long this state lasts.
+        Windows of the adapters are evenly phase shifted, so that with two adapters or more one is always scanning.
+        """
+        window = self._scan_profile.processing_window
+        period = self._scan_profile.processing_period
+        if period <= window or self._dbus_ble_service.get_continuous_scan():
+            return True, window
+        index = self._adapters.index(adapter) if adapter in self._adapters else 0
+        phase = (now - index * period / max(1, len(self._adapters))) % period
+        if phase < window:
+            return True, window - phase
+        return False, period - phase
+
+    def _new_scanner(self, adapter: str) -> BleScanner:
+        """
+        Create a scanner for the given adapter, only reporting manufacturer ids of loaded device classes if filtering
+        is on or if the scan profile is passive. Sniffer mode needs all advertisements and falls back to unfiltered
+        active scanning.
+        """
+        filtered = self._scan_profile.passive or self._dbus_ble_service.get_filtered_scan()
+        if self._capture is not None or adapter in self._filter_failed or not filtered:
+            self._filtered_adapters.discard(adapter)
+            return self._scanner_class(adapter, self._scan_callback, bus=self._dbus,
+                                       filters=self._scan_profile.discovery_filters(), options=self._backend_options)
+        self._filtered_adapters.add(adapter)
+        return self._scanner_class(adapter, self._scan_callback, bus=self._dbus,
+                                   manufacturer_ids=list(BleDevice.DEVICE_CLASSES.keys()), options=self._backend_options)
+
+    async def _scan_persistent(self, adapter: str):
+        """
+        Keep discovery running on the given adapter, processing windows are applied by pausing advertisement
+        processing.
+        """
+        logging.debug(f"{adapter}: Starting persistent scanner ...")
+        async with self._new_scanner(adapter) as scanner:
+            while True:
+                active, duration = self._processing_window(adapter, time.monotonic())
+                if active:
+                    self._active_adapters.add(adapter)
+                else:
+                    logging.debug(f"{adapter}: pausing processing for {duration:.1f} seconds")
+                    self._active_adapters.discard(adapter)
+                await asyncio.sleep(duration)
 
-    def __delitem__(self, key):
-        del self._store[key]
+    async def _scan_cycle(self, adapter: str):
+        """
+        Start and stop discovery on the given adapter around each processing window.
+        """
+        while True:
+            active, duration = self._processing_window(adapter, time.monotonic())
+            if not active:
+                logging.debug(f"{adapter}: pausing scan for {duration:.1f} seconds")
+                await asyncio.sleep(duration)
+                continue
+            logging.debug(f"{adapter}: Scanning ...")
+            async with self._new_scanner(adapter) as scanner:
+                self._active_adapters.add(adapter)
+                try:
+                    await asyncio.sleep(duration)
+                finally:
+                    self._active_adapters.discard(adapter)
+            logging.debug(f"{adapter}: Scan finished")
 
-    def __iter__(self):
-        return iter(self._store.keys())
+    async def _scan_scheduler(self, adapter: str, previous: asyncio.Task = None):
+        """
+        Scan on the given adapter until it is removed, independently of other adapters.
+        """
+        if previous is not None:
+            # Let the replaced scheduler stop its scanner first
+            await asyncio.wait([previous])
+        while True:
+            try:
+                if SCAN_PERSISTENT:
+                    await self._scan_persistent(adapter)
+                else:
+                    await self._scan_cycle(adapter)
+            except asyncio.CancelledError:
+                logging.debug(f"{adapter}: Scanner stopped")
+                raise
+            except NotImplementedError:
+                if adapter in self._filtered_adapters:
+                    # Advertisement monitors need bluetoothd experimental features and are not supported by all backends,
+                    # other errors, i.e. busy or power cycled adapter, are retried with filtering
+                    logging.exception(f"{adapter}: Filtered scan not supported, falling back to unfiltered scanning")
+                    self._filter_failed.add(adapter)
+                    continue
+                logging.exception(f"{adapter}: Scan error")
+                await asyncio.sleep(SCAN_SLEEP or SCAN_TIMEOUT)
+            except Exception:
+                logging.exception(f"{adapter}: Scan error")
+                await asyncio.sleep(SCAN_SLEEP or SCAN_TIMEOUT)
+            finally:
+                self._active_adapters.discard(adapter)
+
+    def _start_scheduler(self, adapter: str):
+        if self._scan_tasks is None:
+            # Scan loop not started yet, it will start schedulers of all known adapters
+            return
+        task = self._scan_tasks.get(adapter, None)
+        if task is None or task.done():
+            self._scan_tasks[adapter] = asyncio.get_event_loop().create_task(self._scan_scheduler(adapter))
 
-    def __len__(self):
-        return len(self._store)
+    def _restart_scheduler(self, adapter: str):
+        if self._scan_tasks is None or (task := self._scan_tasks.get(adapter, None)) is None:
+            return
+        task.cancel()
+        self._scan_tasks[adapter] = asyncio.get_event_loop().create_task(self._scan_scheduler(adapter, task))
 
-    def __contains__(self, key):
-        contains = key in self._store
-        if contains:
-            self[key]   # refresh on check
-        return contains
+    def _stop_scheduler(self, adapter: str):
+        if self._scan_tasks is not None and (task := self._scan_tasks.pop(adapter, None)) is not None:
+            task.cancel()
 
-    def prune(self):
-        now = self._now()
-        for key in list(self._store.keys()):
-            value, expire_time = self._store[key]
-            if expire_time <= now:
-                if getattr(value, 'delete', None):
-                    value.delete()  # Destroy now, don't wait for GC
-                del self._store[key]
+    async def _housekeeping_loop(self):
+        while True:
+            await asyncio.sleep(PRUNE_INTERVAL)
+            # Clean known/ignored device lists
+            for dev_mac in self._known_mac.prune():
+                self._throttle.discard(dev_mac)
+                self._payload_cache.discard(dev_mac)
+                self._adapter_selector.discard(dev_mac)
+            self._payload_cache.prune(time.monotonic())
+            self._adapter_selector.prune(time.monotonic())
+            self._failures.prune()
+            self._throttle.prune()
+            self._reap_bluez_devices()
+            # Settings changed directly on com.victronenergy.settings do not trigger item callbacks
+            self._payload_cache.refresh = self._dbus_ble_service.get_payload_refresh()
+            self._on_scan_profile_changed(self._dbus_ble_service.get_scan_profile())
+            self._on_operating_mode_changed(self._dbus_ble_service.get_operating_mode())
+            for dev_instance in self._known_mac.values():
+                dev_instance.update_process_interval()
+            HOT_LOG.flush()
+            self._publish_stats()
+            self._dbus_ble_service.set_census(self._census.summary())
+
+    def _publish_stats(self):
+        self._dbus_ble_service.set_stats({
+            'PayloadCache/Hits': self._payload_cache.hits,
+            'PayloadCache/Misses': self._payload_cache.misses,
+            'Throttle/Deferred': self._throttle.deferred,
+            'Throttle/Superseded': self._throttle.superseded,
+            'Queue/Length': len(self._ingest_queue),
+            'Ignored/Size': len(self._ignored_mac),
+            'Ignored/Evictions': self._ignored_mac.evictions,
+            'Owned/Size': len(self._owned_mac),
+            'BlueZ/Signals': self._bluez_signals,
+            'BlueZ/RemovedDevices': self._bluez_removed,
+            'BlueZ/KeptDevices': self._bluez_kept,
+            'BlueZ/RemoveErrors': self._bluez_remove_errors,
+            'BlueZ/PendingRemovals': len(self._bluez_stale),
+            'Failures/Count': len(self._failures),
+            'Dispatch/Rejected': len(BleDevice.DEVICE_INDEX.rejected),
+            'Dispatch/Rejections': BleDevice.DEVICE_INDEX.rejections,
+            'Log/Suppressed': HOT_LOG.suppressed,
+            'Adapters/Duplicates': self._adapter_selector.duplicates,
+            'Adapters/Suppressed': self._adapter_selector.suppressed,
+            'Adapters/Switches': self._adapter_selector.switches,
+        })
+        if self._capture is not None:
+            self._dbus_ble_service.set_stats({
+                'Capture/Written': self._capture.written,
+                'Capture/Dropped': self._capture.dropped,
+                'Capture/Rotations': self._capture.rotations,
+            })
+        self._dbus_ble_service.set_stats({
+            f"Queue/Dropped/{name}": self._ingest_queue.dropped[priority]
+            for priority, name in IngestQueue.PRIORITY_NAMES.items()
+        })
 
-    def keys(self):
-        return self._store.keys()
+    async def scan_loop(self):
+        asyncio.create_task(self._housekeeping_loop())
+        asyncio.create_task(self._ingest_loop())
+        self._scan_tasks = {}
+        while True:
+            if len(self._adapters) < 1:
+                logging.warning("Waiting for a bluetooth adapter...")
+                await asyncio.sleep(5)
+                continue
+            # Adapters are normally started on hot-plug, this also catches schedulers which ended unexpectedly
+            for adapter in self._adapters:
+                self._start_scheduler(adapter)
+            await asyncio.sleep(SCAN_TIMEOUT)
 
 
 def main():
     parser = ArgumentParser(description=sys.argv[0])
     parser.add_argument('--version', '-v', action='version', version=PROCESS_VERSION)
     parser.add_argument('--debug', '-d', help='Turn on debug logging', default=False, action='store_true')
-    parser.add_argument('--snif', '-s', help='Turn on advertising data sniffer', default=False, action='store_true')
+    parser.add_argument('--snif', '-s', help='Turn on advertising data sniffer, capturing frames of new devices',
+                        default=False, action='store_true')
+    parser.add_argument('--snif-file', help=f"Sniffer capture file, default {CAPTURE_FILE!r}", default=CAPTURE_FILE)
+    parser.add_argument('--snif-all', help='Capture all frames, not only the ones of new devices', default=False,
+                        action='store_true')
+    parser.add_argument('--snif-man-id', help='Only capture this manufacturer id, can be repeated', default=[],
+                        action='append', type=lambda value: int(value, 0), metavar='ID')
+    parser.add_argument('--snif-mac', help='Only capture this mac address, can be repeated', default=[],
+                        action='append', type=mac_to_int, metavar='MAC')
+    parser.add_argument('--snif-max-size', help=f"Capture file rotation size in bytes, default {CAPTURE_MAX_SIZE!r}",
+                        default=CAPTURE_MAX_SIZE, type=int)
+    parser.add_argument('--backend', '-b', help=f"Scanner backend, i.e. 'bleak', 'bluez', 'replay' or 'synthetic', default {SCAN_BACKEND!r}",
+                        default=SCAN_BACKEND)
+    parser.add_argument('--backend-option', '-o', help="Scanner backend option, as KEY=VALUE, can be repeated",
+                        default=[], action='append', metavar='KEY=VALUE')
     args = parser.parse_args()
+    backend_options = dict(option.split('=', 1) for option in args.backend_option if '=' in option)
 
     # Set default logger
     setup_logging(args.debug)
@@ -247,24 +718,20 @@ def main():
         # Mute overly verbose libraries
         logging.getLogger("bleak").setLevel(logging.INFO)
 
-    # Set sniffer logger
+    # Start sniffer capture, pending frames being written on exit
+    capture = None
     if args.snif:
-        handler = RotatingFileHandler(
-            "/var/log/dbus-ble-sensors-py/sniffer.log",
-            maxBytes=512 * 1024,  # rotate after 512KB
-            backupCount=0,        # keep 5 rolled files: sniffer.log.1 ... .5
-            encoding="utf-8",
-            delay=True            # create file only on first emit
-        )
-        handler.setFormatter(logging.Formatter(fmt='%(message)s'))
-        SNIF_LOGGER.addHandler(handler)
+        capture = CaptureWriter(args.snif_file, all_frames=args.snif_all, man_ids=args.snif_man_id, macs=args.snif_mac,
+                                max_size=args.snif_max_size)
+        capture.start()
+        atexit.register(capture.stop)
 
     # Init gbulb, configure GLib and integrate asyncio in it
     gbulb.install()
     DBusGMainLoop(set_as_default=True)
     asyncio.set_event_loop_policy(gbulb.GLibEventLoopPolicy())
 
-    pvac_output = DbusBleSensors()
+    pvac_output = DbusBleSensors(capture=capture, backend=args.backend, backend_options=backend_options)
 
     mainloop = asyncio.new_event_loop()
     asyncio.set_event_loop(mainloop)
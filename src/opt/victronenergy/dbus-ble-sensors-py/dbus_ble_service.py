@@ -4,6 +4,8 @@ import sys
 import os
 import dbus
 from dbus_settings_service import DbusSettingsService
+from conf import PAYLOAD_REFRESH_INTERVAL
+from scan_profiles import DEFAULT_SCAN_PROFILE
 from vedbus import VeDbusService, VeDbusItemImport, VeDbusItemExport
 
 
@@ -23,6 +25,9 @@ class DbusBleService(object):
         # Dbus local service, if needed
         self._dbus_ble_service: VeDbusService = None
 
+        # Called on role 'Enabled' changes, cf. init_device_enabled
+        self._device_enabled_callback = None
+
         # List services
         dbus_iface_names = dbus.Interface(
             self._bus.get_object('org.freedesktop.DBus', '/org/freedesktop/DBus'),
@@ -138,13 +143,21 @@ class DbusBleService(object):
         self._dbus_settings.get_item(custom_name_setting_path).eventCallback = set_name_callback
 
         # Add enable entry
+        item_path = f"/Devices/{dev_id}_{role_name}/Enabled"
+
+        def on_enabled_changed(is_enabled: int):
+            dbus_role_service.on_enabled_changed(is_enabled)
+            if self._device_enabled_callback:
+                # The item value is only updated once this callback returns
+                self._device_enabled_callback(
+                    dev_id.rsplit('_', 1)[-1], bool(is_enabled) or self._is_dev_id_enabled(dev_id, item_path))
         self._set_proxy_setting(
             f"/Settings/Devices/{dbus_role_service.get_dbus_id()}/Enabled",
-            f"/Devices/{dev_id}_{role_name}/Enabled",
+            item_path,
             0,
             0,
             1,
-            dbus_role_service.on_enabled_changed
+            on_enabled_changed
         )
 
     def unregister_role_service(self, dbus_role_service):
@@ -176,6 +189,68 @@ class DbusBleService(object):
                 return True
         return False
 
+    def _is_dev_id_enabled(self, dev_id: str, skipped_path: str = None) -> bool:
+        """
+        Check if at least one of the registered roles of the given device id is enabled, 'skipped_path' excepted.
+        """
+        prefix = f"/Devices/{dev_id}_"
+        return any(path.startswith(prefix) and path.endswith('/Enabled') and path != skipped_path
+                   and item.local_get_value() for path, item in self._dbus_ble_service._dbusobjects.items())
+
+    def init_device_enabled(self, callback=None):
+        """
+        'callback(dev_mac, is_enabled)' is called on role 'Enabled' changes of registered devices, 'is_enabled' being
+        True if at least one of the device roles is still enabled.
+        """
+        self._device_enabled_callback = callback
+
+    def get_enabled_device_macs(self) -> set:
+        """
+        Mac addresses of devices having at least one role enabled in settings, even if not seen since startup.
+        Device settings are stored under /Settings/Devices/<dev_prefix>_<dev_mac>/<role>/Enabled, all of them being
+        read at once: not to be called periodically, cf. init_device_enabled.
+        """
+        macs = set()
+        for path, value in self._dbus_settings.get_values('/Settings/Devices').items():
+            parts = str(path).strip('/').split('/')
+            if len(parts) == 3 and parts[2] == 'Enabled' and value:
+                dev_mac = parts[0].rsplit('_', 1)[-1]
+                if len(dev_mac) == 12:
+                    macs.add(dev_mac)
+        return macs
+
+    def init_operating_mode(self, callback=None):
+        def on_change(value):
+            logging.info(f"Operating mode set to {value!r}")
+            if callback:
+                callback(value)
+        self._set_proxy_setting(
+            '/Settings/BleSensors/OperatingMode',
+            '/OperatingMode',
+            0,
+            0,
+            1,
+            on_change
+        )
+
+    def get_operating_mode(self) -> bool:
+        return bool(self._dbus_ble_service['/OperatingMode'])
+
+    def init_discovery(self, callback=None):
+        """
+        Non persistent switch to look for new devices while in operating mode.
+        """
+        def on_change(path, value):
+            logging.info(f"Discovery set to {value!r}")
+            if callback:
+                callback(value)
+            return 1
+        self._set_value('/Discovery', 0)
+        self._get_item('/Discovery')._onchangecallback = on_change
+
+    def set_discovery(self, value: int):
+        self._set_value('/Discovery', value)
+
     def init_continuous_scan(self):
         def log(value):
             logging.info(f"Continuous scanning set to {value!r}")
@@ -190,3 +265,144 @@ class DbusBleService(object):
 
     def get_continuous_scan(self) -> bool:
         return bool(self._dbus_ble_service['/ContinuousScan'])
+
+    def init_filtered_scan(self, callback=None):
+        def on_change(value):
+            logging.info(f"Filtered scanning set to {value!r}")
+            if callback:
+                callback(value)
+        self._set_proxy_setting(
+            '/Settings/BleSensors/FilteredScan',
+            '/FilteredScan',
+            0,
+            0,
+            1,
+            on_change
+        )
+
+    def get_filtered_scan(self) -> bool:
+        return bool(self._dbus_ble_service['/FilteredScan'])
+
+    def init_scan_profile(self, callback=None):
+        self._set_proxy_setting(
+            '/Settings/BleSensors/ScanProfile',
+            '/ScanProfile',
+            DEFAULT_SCAN_PROFILE,
+            0,
+            0,
+            callback
+        )
+
+    def get_scan_profile(self) -> str:
+        return self._dbus_ble_service['/ScanProfile']
+
+    def init_payload_refresh(self, callback=None):
+        def on_change(value):
+            logging.info(f"Payload refresh interval set to {value!r}")
+            if callback:
+                callback(value)
+        self._set_proxy_setting(
+            '/Settings/BleSensors/PayloadRefresh',
+            '/PayloadRefresh',
+            PAYLOAD_REFRESH_INTERVAL,
+            0,
+            3600,
+            on_change
+        )
+
+    def get_payload_refresh(self) -> int:
+        return int(self._dbus_ble_service['/PayloadRefresh'])
+
+    def init_process_interval(self, callback=None):
+        def on_change(value):
+            logging.info(f"Process interval set to {value!r}")
+            if callback:
+                callback(value)
+        self._set_proxy_setting(
+            '/Settings/BleSensors/ProcessInterval',
+            '/ProcessInterval',
+            -1,
+            -1,
+            3600,
+            on_change
+        )
+
+    def register_device(self, ble_device, process_interval_callback=None):
+        dev_id = ble_device.info['dev_id']
+        self._set_proxy_setting(
+            f"/Settings/Devices/{dev_id}/ProcessInterval",
+            f"/Sensors/{dev_id}/ProcessInterval",
+            -1,
+            -1,
+            3600,
+            process_interval_callback
+        )
+
+    def unregister_device(self, ble_device, process_interval_callback=None):
+        dev_id = ble_device.info['dev_id']
+        if self._get_item(f"/Sensors/{dev_id}/Adapter") is not None:
+            self._delete_item(f"/Sensors/{dev_id}/Adapter")
+        self._delete_proxy_setting(
+            f"/Settings/Devices/{dev_id}/ProcessInterval",
+            f"/Sensors/{dev_id}/ProcessInterval",
+            process_interval_callback
+        )
+
+    def set_device_adapter(self, device_info: dict, adapter: str):
+        """
+        Publish the adapter the device frames are processed from.
+        """
+        self._set_value(f"/Sensors/{device_info['dev_id']}/Adapter", adapter)
+
+    def get_process_interval(self, device_info: dict, default: float, device_interval: int = None, global_interval: int = None) -> float:
+        """
+        Minimum number of seconds between two processed frames of a device: device setting if set, else global
+        setting if set, else the given device class default. Negative values mean 'not set'.
+        """
+        if device_interval is None:
+            device_interval = self._get_value(f"/Sensors/{device_info['dev_id']}/ProcessInterval")
+        if device_interval is not None and device_interval >= 0:
+            return device_interval
+        if global_interval is None:
+            global_interval = self._get_value('/ProcessInterval')
+        if global_interval is not None and global_interval >= 0:
+            return global_interval
+        return default
+
+    def set_device_failure(self, dev_mac: str, man_id: int, description: str):
+        """
+        Publish the initialization failure of a device, None to remove it.
+        """
+        path = f"/Failures/{dev_mac}_{man_id:04X}"
+        if description is not None:
+            self._set_value(path, description)
+        elif self._get_item(path) is not None:
+            self._delete_item(path)
+
+    def init_census_dump(self, callback=None):
+        """
+        Non persistent trigger, setting it to 1 dumps the discovery census.
+        """
+        def on_change(path, value):
+            if callback:
+                callback(value)
+            return 1
+        self._set_value('/Census/Dump', 0)
+        self._get_item('/Census/Dump')._onchangecallback = on_change
+
+    def set_census_dump(self, value: int):
+        self._set_value('/Census/Dump', value)
+
+    def set_census(self, summary: dict):
+        """
+        Publish the discovery census summary under /Census.
+        """
+        for name, value in summary.items():
+            self._set_value(f"/Census/{name}", value)
+
+    def set_stats(self, stats: dict):
+        """
+        Publish scan pipeline counters under /Stats.
+        """
+        for name, value in stats.items():
+            self._set_value(f"/Stats/{name}", value)
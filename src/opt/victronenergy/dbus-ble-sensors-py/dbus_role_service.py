@@ -123,6 +123,7 @@ class DbusRoleService(object):
         self._dbus_service._dbusname = None
 
     def on_enabled_changed(self, is_enabled: int):
+        self._ble_device.on_role_enabled_changed(self.ble_role.NAME, bool(is_enabled))
         if is_enabled:
             self.connect()
         else:
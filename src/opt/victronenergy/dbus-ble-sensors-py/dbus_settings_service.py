@@ -63,6 +63,17 @@ class DbusSettingsService(object):
         self._paths[path] = busitem
         return busitem
 
+    def get_values(self, path: str) -> dict:
+        """
+        Get values of all settings under the given path, keyed by their path relative to it.
+        """
+        try:
+            values = self._bus.get_object(self._SETTINGS_SERVICENAME, path).GetValue(dbus_interface='com.victronenergy.BusItem')
+        except dbus.exceptions.DBusException:
+            logging.debug(f"No settings found under {path!r}")
+            return {}
+        return dict(values) if isinstance(values, dict) else {}
+
     def set_value(self, path, new_value):
         if (setting := self._paths.get(path, None)) is None:
             logging.error(f"Can not set value of non-existing {path!r} to {new_value!r}.")
@@ -0,0 +1,106 @@
+from collections import Counter
+from expiring_table import BoundedExpiringSet
+from conf import IGNORED_DEVICES_TIMEOUT, IGNORED_DEVICES_MAX
+
+
+def get_specificity(dev_class) -> int:
+    """
+    Number of discriminators a device class declares, the most specific classes are tried first.
+    """
+    return (dev_class.DATA_LENGTHS is not None) + (dev_class.MIN_DATA_LENGTH > 0) + len(dev_class.DISCRIMINATOR) \
+        + (dev_class.MAC_ECHO_OFFSET is not None) + (dev_class.MODEL_BYTE is not None)
+
+
+def get_key_bytes(dev_class) -> list:
+    """
+    Discriminator and model bytes of a device class, as (offset, mask, set of values).
+    """
+    key_bytes = [(offset, mask, {value}) for offset, mask, value in dev_class.DISCRIMINATOR]
+    if dev_class.MODEL_BYTE is not None:
+        offset, mask, values = dev_class.MODEL_BYTE
+        key_bytes.append((offset, mask, set(values)))
+    return key_bytes
+
+
+def accepts_length(dev_class, length: int) -> bool:
+    """
+    Tell if manufacturer data of this length can match the device class discriminators.
+    """
+    if dev_class.DATA_LENGTHS is not None and length not in dev_class.DATA_LENGTHS:
+        return False
+    if length < dev_class.MIN_DATA_LENGTH:
+        return False
+    if any(offset >= length for offset, _, _ in get_key_bytes(dev_class)):
+        return False
+    if dev_class.MAC_ECHO_OFFSET is not None and dev_class.MAC_ECHO_OFFSET + 3 > length:
+        return False
+    return True
+
+
+class DeviceClassIndex(object):
+    """
+    Device class selection from the manufacturer id, data and mac address of an advertisement, cf. BleDevice
+    discriminators.
+
+    Candidate classes are indexed per (manufacturer id, data length), built on first lookup, then per value of the key
+    byte, the discriminator or model byte shared by most of them. A lookup only checks the discriminators of the
+    candidates of its key byte value, most specific first. Combinations matching no class are cached per mac address,
+    until they expire or the index is rebuilt.
+    """
+
+    def __init__(self, device_classes: dict, ttl: float = IGNORED_DEVICES_TIMEOUT, max_size: int = IGNORED_DEVICES_MAX):
+        self._classes: dict = device_classes  # man_id -> device classes, most specific first
+        self._buckets: dict = {}  # (man_id, length) -> (key offset, key mask, key value -> candidates, other candidates)
+        self.rejected = BoundedExpiringSet(ttl=ttl, max_size=max_size, keep_evicted=True)  # (mac, man_id, length, key value)
+        self.rejections: int = 0  # Lookups rejected by discriminators, cached ones excluded
+
+    def _build_bucket(self, man_id: int, length: int) -> tuple:
+        candidates = [dev_class for dev_class in self._classes[man_id] if accepts_length(dev_class, length)]
+        keys = Counter((offset, mask) for dev_class in candidates for offset, mask, _ in get_key_bytes(dev_class))
+        if not keys:
+            return None, 0, {}, tuple(candidates)
+        # Most shared key byte, lowest offset first on ties
+        (offset, mask), _ = max(keys.items(), key=lambda item: (item[1], -item[0][0]))
+        table = {}
+        others = []
+        for dev_class in candidates:
+            values = None
+            for key_offset, key_mask, key_values in get_key_bytes(dev_class):
+                if (key_offset, key_mask) == (offset, mask):
+                    values = key_values if values is None else values & key_values
+            if values is None:
+                others.append(dev_class)
+            # Else indexed for each accepted value, none if discriminators are contradictory
+            for value in values or ():
+                table.setdefault(value, []).append(dev_class)
+        # Keep the specificity order among indexed and other candidates
+        table = {value: tuple(dev_class for dev_class in candidates if dev_class in indexed or dev_class in others)
+                 for value, indexed in table.items()}
+        return offset, mask, table, tuple(others)
+
+    def lookup(self, man_id: int, manufacturer_data: bytes, mac: int):
+        """
+        Device class of the advertisement, None if there is none.
+        """
+        if (bucket := self._buckets.get((man_id, len(manufacturer_data)), None)) is None:
+            if man_id not in self._classes:
+                return None
+            bucket = self._buckets[(man_id, len(manufacturer_data))] = self._build_bucket(man_id, len(manufacturer_data))
+        offset, mask, table, others = bucket
+        if offset is None:
+            key = None
+            candidates = others
+        else:
+            key = manufacturer_data[offset] & mask
+            candidates = table.get(key, others)
+        if not candidates:
+            return None
+        if (rejected_key := (mac, man_id, len(manufacturer_data), key)) in self.rejected:
+            return None
+        mac_tail = (mac & 0xffffff).to_bytes(3, 'big')
+        for dev_class in candidates:
+            if dev_class.match_frame(manufacturer_data, mac_tail):
+                return dev_class
+        self.rejected.add(rejected_key)
+        self.rejections += 1
+        return None
@@ -0,0 +1,180 @@
+import time
+import heapq
+import itertools
+from collections import OrderedDict, deque
+
+
+class _Entry(object):
+    __slots__ = ('value', 'expire_time')
+
+    def __init__(self, value, expire_time: float):
+        self.value = value
+        self.expire_time: float = expire_time
+
+
+class ExpiringTable(object):
+    """
+    Mapping whose entries expire 'ttl' seconds after their last write or read. Manual pruning required.
+
+    Reads refresh entries in place, without any allocation but the new expiry time. Expiries are indexed in a heap
+    which is lazily rescheduled on pruning, so that a prune only visits entries whose initial expiry time has passed
+    instead of the whole table.
+    Values having a 'delete' method get it called when they expire.
+    """
+
+    def __init__(self, ttl: float, clock=time.monotonic):
+        self.ttl: float = ttl
+        self._clock = clock
+        self._store: dict = {}
+        self._heap: list = []  # (expire_time, sequence, key, entry)
+        self._sequence = itertools.count()
+
+    def __setitem__(self, key, value):
+        expire_time = self._clock() + self.ttl
+        if (entry := self._store.get(key, None)) is not None:
+            entry.value = value
+            entry.expire_time = expire_time
+            return
+        entry = _Entry(value, expire_time)
+        self._store[key] = entry
+        heapq.heappush(self._heap, (expire_time, next(self._sequence), key, entry))
+
+    def __getitem__(self, key):
+        entry = self._store[key]
+        entry.expire_time = self._clock() + self.ttl
+        return entry.value
+
+    def get(self, key, default=None):
+        if (entry := self._store.get(key, None)) is None:
+            return default
+        entry.expire_time = self._clock() + self.ttl
+        return entry.value
+
+    def __contains__(self, key) -> bool:
+        if key not in self._store:
+            return False
+        self._store[key].expire_time = self._clock() + self.ttl
+        return True
+
+    def __delitem__(self, key):
+        # Heap item is left behind, it is dropped on pruning
+        del self._store[key]
+
+    def pop(self, key, default=None):
+        if (entry := self._store.pop(key, None)) is None:
+            return default
+        return entry.value
+
+    def __iter__(self):
+        return iter(self._store.keys())
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def keys(self):
+        return self._store.keys()
+
+    def values(self) -> list:
+        # No refresh, used for bulk updates
+        return [entry.value for entry in self._store.values()]
+
+    def prune(self) -> list:
+        """
+        Remove expired entries, returns their keys.
+        """
+        now = self._clock()
+        heap = self._heap
+        expired = []
+        while heap and heap[0][0] <= now:
+            _, _, key, entry = heapq.heappop(heap)
+            if self._store.get(key, None) is not entry:
+                # Deleted or replaced since scheduled
+                continue
+            if entry.expire_time > now:
+                # Refreshed since scheduled
+                heapq.heappush(heap, (entry.expire_time, next(self._sequence), key, entry))
+                continue
+            del self._store[key]
+            expired.append(key)
+            if getattr(entry.value, 'delete', None):
+                entry.value.delete()  # Destroy now, don't wait for GC
+        return expired
+
+
+class BoundedExpiringSet(object):
+    """
+    Set of keys expiring 'ttl' seconds after their last add or lookup, capped to 'max_size' keys.
+
+    Keys are kept in least recently seen order, which is also their expiry order as the ttl is constant: lookups,
+    adds, evictions and pruning of a single key are O(1) and memory is bounded whatever the number of keys added.
+    There are no false positives, an evicted key is simply reported as absent again. With 'keep_evicted', evicted
+    keys are kept, up to 'max_size' of them, until read by pop_evicted, as prune reports expired ones.
+    """
+
+    def __init__(self, ttl: float, max_size: int, clock=time.monotonic, keep_evicted: bool = False):
+        self.ttl: float = ttl
+        self.max_size: int = max_size
+        self._clock = clock
+        self._store: OrderedDict = OrderedDict()  # key -> expire_time, least recently seen first
+        self._evicted: deque = deque(maxlen=max_size) if keep_evicted else None  # Evicted keys, oldest first
+        self.evictions: int = 0    # Keys removed because of the size cap
+        self.expirations: int = 0  # Keys removed because of the ttl
+
+    def __contains__(self, key) -> bool:
+        if (expire_time := self._store.get(key, None)) is None:
+            return False
+        now = self._clock()
+        if expire_time <= now:
+            del self._store[key]
+            self.expirations += 1
+            return False
+        self._store[key] = now + self.ttl
+        self._store.move_to_end(key)
+        return True
+
+    def add(self, key):
+        self._store[key] = self._clock() + self.ttl
+        self._store.move_to_end(key)
+        if len(self._store) > self.max_size:
+            evicted, _ = self._store.popitem(last=False)
+            self.evictions += 1
+            if self._evicted is not None:
+                self._evicted.append(evicted)
+
+    def __setitem__(self, key, _):
+        # Mapping style add, value is ignored
+        self.add(key)
+
+    def discard(self, key):
+        self._store.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __iter__(self):
+        return iter(self._store.keys())
+
+    def prune(self) -> list:
+        """
+        Remove expired keys, returns them.
+        """
+        now = self._clock()
+        expired = []
+        while self._store:
+            key, expire_time = next(iter(self._store.items()))
+            if expire_time > now:
+                break
+            del self._store[key]
+            expired.append(key)
+        self.expirations += len(expired)
+        return expired
+
+    def pop_evicted(self) -> list:
+        """
+        Returns the keys evicted since the previous call, if kept.
+        """
+        if not self._evicted:
+            return []
+        evicted = list(self._evicted)
+        self._evicted.clear()
+        return evicted
@@ -0,0 +1,104 @@
+import time
+from collections import OrderedDict
+
+
+class _Failure(object):
+    __slots__ = ('count', 'retry_time')
+
+    def __init__(self):
+        self.count: int = 0
+        self.retry_time: float = 0.0
+
+
+class FailureCache(object):
+    """
+    Devices whose initialization failed, keyed by (mac, manufacturer id, failure reason).
+
+    A failed device is retried after a delay doubling on each failure with the same reason, from 'backoff_min' up to
+    'backoff_max' seconds. Each reason has its own backoff and only the one of the latest failure applies, so that a
+    device failing for an unrelated reason is not held back by the backoff of a previous one. Cache size is capped to
+    'max_size' entries, oldest failures first.
+    The optional 'publish' callback is called with the (mac, manufacturer id) key and a description of the latest
+    failure, or None once all failures of the device are removed.
+    """
+
+    def __init__(self, backoff_min: float, backoff_max: float, max_size: int, publish=None, clock=time.monotonic):
+        self.backoff_min: float = backoff_min
+        self.backoff_max: float = backoff_max
+        self.max_size: int = max_size
+        self.generation: int = None  # Device classes generation the failures relate to
+        self._publish = publish
+        self._clock = clock
+        self._store: OrderedDict = OrderedDict()  # (mac, man_id, reason) -> failure, oldest first
+        self._reasons: dict = {}  # (mac, man_id) -> failure reasons, latest last
+
+    def should_retry(self, key) -> bool:
+        if (reasons := self._reasons.get(key, None)) is None:
+            return True
+        return self._clock() >= self._store[key + (reasons[-1],)].retry_time
+
+    def record(self, key, reason: str) -> int:
+        """
+        Record a failure, returns the number of failures with this reason.
+        """
+        failure = self._store.pop(key + (reason,), None) or _Failure()
+        failure.count += 1
+        failure.retry_time = self._clock() + min(self.backoff_max, self.backoff_min * 2 ** (failure.count - 1))
+        self._store[key + (reason,)] = failure
+        reasons = self._reasons.setdefault(key, [])
+        if reason in reasons:
+            reasons.remove(reason)
+        reasons.append(reason)
+        self._notify(key)
+        if len(self._store) > self.max_size:
+            self._remove(next(iter(self._store)))
+        return failure.count
+
+    def discard(self, key):
+        if (reasons := self._reasons.pop(key, None)) is None:
+            return
+        for reason in reasons:
+            del self._store[key + (reason,)]
+        self._notify(key)
+
+    def clear(self, generation: int = None):
+        """
+        Forget all failures, i.e. when device classes are reloaded.
+        """
+        for key in list(self._reasons.keys()):
+            self.discard(key)
+        self.generation = generation
+
+    def prune(self):
+        """
+        Remove failures not retried for the maximum backoff, the device is most likely gone or failing otherwise.
+        """
+        expire_time = self._clock() - self.backoff_max
+        for failure_key in [failure_key for failure_key, failure in self._store.items()
+                            if failure.retry_time <= expire_time]:
+            self._remove(failure_key)
+
+    def _remove(self, failure_key: tuple):
+        del self._store[failure_key]
+        key, reason = failure_key[:2], failure_key[2]
+        reasons = self._reasons[key]
+        latest = reasons[-1] == reason
+        reasons.remove(reason)
+        if not reasons:
+            del self._reasons[key]
+        if latest:
+            self._notify(key)
+
+    def _notify(self, key):
+        if self._publish is None:
+            return
+        if (reasons := self._reasons.get(key, None)) is None:
+            self._publish(key, None)
+        else:
+            self._publish(key, f"{reasons[-1]} (x{self._store[key + (reasons[-1],)].count})")
+
+    def __contains__(self, key) -> bool:
+        return key in self._reasons
+
+    def __len__(self) -> int:
+        return len(self._store)
@@ -0,0 +1,79 @@
+from operator import itemgetter
+
+
+class FrameValidator(object):
+    """
+    Manufacturer data check of a single device, compiled from its class discriminators and mac address, equivalent to
+    BleDevice.match_frame.
+
+    Fully fixed bytes, discriminators and mac address echo, are merged into a single pattern: compared as a slice when
+    they are contiguous, i.e. Mopeka, Safiery and Gobius mac address echo, else picked by a single itemgetter. Only
+    partially fixed bytes, if any, are checked one by one.
+    """
+    __slots__ = ('_lengths', '_min_length', '_start', '_end', '_pattern', '_getter', '_values', '_masked',
+                 '_model_byte')
+
+    def __init__(self, lengths: tuple = None, min_length: int = 0, discriminator: tuple = (),
+                 mac_echo_offset: int = None, mac_tail: bytes = None, model_byte: tuple = None):
+        self._lengths: frozenset = None if lengths is None else frozenset(lengths)
+        self._min_length: int = min_length
+        self._start: int = 0
+        self._end: int = 0
+        self._pattern: bytes = None  # Expected data[start:end], when fixed bytes are contiguous
+        self._getter: itemgetter = None  # Else fixed bytes getter ...
+        self._values: object = None  # ... and its expected result
+        self._masked: tuple = ()  # (offset, mask, value) of partially fixed bytes
+        self._model_byte: tuple = None  # (offset, mask, frozenset of values)
+
+        fixed = {}  # offset -> (mask, value)
+        constraints = list(discriminator)
+        if mac_echo_offset is not None:
+            constraints += [(mac_echo_offset + index, 0xFF, byte) for index, byte in enumerate(mac_tail)]
+        for offset, mask, value in constraints:
+            prev_mask, prev_value = fixed.get(offset, (0, 0))
+            if (prev_value ^ value) & prev_mask & mask or value & ~mask:
+                # Contradictory constraints, or value outside of its mask
+                self._lengths = frozenset()
+            fixed[offset] = (prev_mask | mask, prev_value | (value & mask))
+            self._min_length = max(self._min_length, offset + 1)
+        if model_byte is not None:
+            offset, mask, values = model_byte
+            self._model_byte = (offset, mask, frozenset(values))
+            self._min_length = max(self._min_length, offset + 1)
+
+        self._masked = tuple((offset, mask, value) for offset, (mask, value) in sorted(fixed.items()) if mask != 0xFF)
+        offsets = sorted(offset for offset, (mask, _) in fixed.items() if mask == 0xFF)
+        if not offsets:
+            return
+        if offsets[-1] - offsets[0] + 1 == len(offsets):
+            self._start, self._end = offsets[0], offsets[-1] + 1
+            self._pattern = bytes(fixed[offset][1] for offset in offsets)
+        else:
+            self._getter = itemgetter(*offsets)
+            self._values = tuple(fixed[offset][1] for offset in offsets)
+
+    @classmethod
+    def compile(cls, dev_class, mac_tail: bytes) -> 'FrameValidator':
+        """
+        Validator of a device of class 'dev_class', 'mac_tail' being the 3 last bytes of its mac address.
+        """
+        return cls(dev_class.DATA_LENGTHS, dev_class.MIN_DATA_LENGTH, dev_class.DISCRIMINATOR,
+                   dev_class.MAC_ECHO_OFFSET, mac_tail, dev_class.MODEL_BYTE)
+
+    def __call__(self, manufacturer_data: bytes) -> bool:
+        length = len(manufacturer_data)
+        if length < self._min_length or (self._lengths is not None and length not in self._lengths):
+            return False
+        if self._pattern is not None:
+            if manufacturer_data[self._start:self._end] != self._pattern:
+                return False
+        elif self._getter is not None:
+            if self._getter(manufacturer_data) != self._values:
+                return False
+        for offset, mask, value in self._masked:
+            if manufacturer_data[offset] & mask != value:
+                return False
+        if (model_byte := self._model_byte) is not None:
+            offset, mask, values = model_byte
+            return manufacturer_data[offset] & mask in values
+        return True
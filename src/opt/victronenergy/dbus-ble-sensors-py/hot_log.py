@@ -0,0 +1,87 @@
+import logging
+import time
+from conf import HOT_LOG_INTERVAL, HOT_LOG_BURST, HOT_LOG_MAX_KEYS
+
+
+class _MessageState(object):
+    __slots__ = ('level', 'start_time', 'count', 'suppressed', 'args')
+
+    def __init__(self, level: int, start_time: float):
+        self.level: int = level
+        self.start_time: float = start_time
+        self.count: int = 0       # Messages emitted in the current interval
+        self.suppressed: int = 0  # Messages suppressed in the current interval
+        self.args: tuple = ()     # Arguments of the last suppressed message
+
+
+class HotLog(object):
+    """
+    Logging for the advertisement hot path, where a message can be issued for every frame of every device.
+
+    Messages use logging %-style arguments, only formatted when emitted. Each (key, message) pair, the key being
+    typically a device mac address, emits at most 'burst' messages per 'interval' seconds. Suppressed messages are
+    counted, and summarized with the last one of them once the interval is over, on the next message or on flush().
+    """
+
+    def __init__(self, interval: float = HOT_LOG_INTERVAL, burst: int = HOT_LOG_BURST, max_keys: int = HOT_LOG_MAX_KEYS,
+                 logger: logging.Logger = None, clock=time.monotonic):
+        self.interval: float = interval
+        self.burst: int = burst
+        self.max_keys: int = max_keys
+        self.suppressed: int = 0  # Total suppressed messages
+        self._logger: logging.Logger = logger or logging.getLogger()
+        self._clock = clock
+        self._states: dict = {}  # (key, msg) -> _MessageState
+
+    def debug(self, key, msg: str, *args):
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._log(logging.DEBUG, key, msg, args)
+
+    def info(self, key, msg: str, *args):
+        if self._logger.isEnabledFor(logging.INFO):
+            self._log(logging.INFO, key, msg, args)
+
+    def warning(self, key, msg: str, *args):
+        if self._logger.isEnabledFor(logging.WARNING):
+            self._log(logging.WARNING, key, msg, args)
+
+    def _log(self, level: int, key, msg: str, args: tuple):
+        now = self._clock()
+        if (state := self._states.get((key, msg), None)) is None:
+            if len(self._states) >= self.max_keys:
+                self.flush(force=True)
+            state = self._states[(key, msg)] = _MessageState(level, now)
+        elif now - state.start_time >= self.interval:
+            self._summarize(msg, state)
+            state.start_time = now
+            state.count = 0
+        if state.count < self.burst:
+            state.count += 1
+            self._logger.log(level, msg, *args, stacklevel=3)
+        else:
+            state.suppressed += 1
+            state.args = args
+            self.suppressed += 1
+
+    def _summarize(self, msg: str, state: _MessageState):
+        if state.suppressed > 0:
+            self._logger.log(state.level, f"{msg} (%d similar messages suppressed)", *state.args, state.suppressed)
+            state.suppressed = 0
+            state.args = ()
+
+    def flush(self, force: bool = False):
+        """
+        Summarize suppressed messages of the intervals over, or of all intervals if 'force', and drop idle keys.
+        """
+        now = self._clock()
+        for (key, msg), state in list(self._states.items()):
+            if force or now - state.start_time >= self.interval:
+                self._summarize(msg, state)
+                del self._states[(key, msg)]
+
+    def __len__(self):
+        return len(self._states)
+
+
+# Shared instance
+HOT_LOG = HotLog()
@@ -0,0 +1,71 @@
+import asyncio
+from collections import deque
+
+
+class IngestQueue(object):
+    """
+    Bounded multi-priority queue of advertisement records, filled by scan callbacks and drained in batches by a worker.
+
+    When full, the oldest record of the lowest priority is shed first. A new record is only refused when everything
+    queued has a higher priority than it. Shed records are counted per priority.
+    """
+
+    PRIORITY_DISCOVERY = 0  # Device not known yet
+    PRIORITY_KNOWN = 1      # Known device, not enabled
+    PRIORITY_ENABLED = 2    # Known and enabled device
+
+    PRIORITY_NAMES = {
+        PRIORITY_DISCOVERY: 'Discovery',
+        PRIORITY_KNOWN: 'Known',
+        PRIORITY_ENABLED: 'Enabled',
+    }
+
+    def __init__(self, maxsize: int):
+        self.maxsize: int = maxsize
+        self._queues: list = [deque() for _ in self.PRIORITY_NAMES]
+        self._size: int = 0
+        self._event = asyncio.Event()
+        self.dropped: list = [0 for _ in self.PRIORITY_NAMES]
+
+    def put(self, priority: int, record: tuple) -> bool:
+        """
+        Queue a record, returns False if it was shed.
+        """
+        if self._size >= self.maxsize:
+            for lower in range(priority + 1):
+                if self._queues[lower]:
+                    self._queues[lower].popleft()
+                    self.dropped[lower] += 1
+                    self._size -= 1
+                    break
+            else:
+                self.dropped[priority] += 1
+                return False
+        self._queues[priority].append(record)
+        self._size += 1
+        self._event.set()
+        return True
+
+    def get_batch(self, size: int) -> list:
+        """
+        Pop up to 'size' records, highest priorities first, oldest first within a priority.
+        """
+        batch = []
+        for queue in reversed(self._queues):
+            while queue and len(batch) < size:
+                batch.append(queue.popleft())
+            if len(batch) >= size:
+                break
+        self._size -= len(batch)
+        return batch
+
+    async def wait(self):
+        """
+        Wait until at least one record is queued.
+        """
+        while self._size < 1:
+            self._event.clear()
+            await self._event.wait()
+
+    def __len__(self):
+        return self._size
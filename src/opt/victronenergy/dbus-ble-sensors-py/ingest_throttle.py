@@ -0,0 +1,64 @@
+import time
+
+
+class IngestThrottle(object):
+    """
+    Latest-wins processing rate limiter.
+
+    Each key is processed at most once per interval. Frames arriving inside the window only overwrite a pending
+    slot, and the newest one is processed when the window expires.
+    """
+
+    def __init__(self, call_later, clock=time.monotonic):
+        self._call_later = call_later  # call_later(delay, callback, *args), i.e. asyncio loop.call_later
+        self._clock = clock
+        self._next_time: dict = {}  # key -> earliest time next frame can be processed
+        self._pending: dict = {}    # key -> (interval, process, args) of the newest deferred frame
+        self.deferred: int = 0      # Frames put in pending slots
+        self.superseded: int = 0    # Pending frames overwritten by a newer one before being processed
+
+    def submit(self, key, interval: float, process, *args):
+        """
+        Call process(*args) now if the key window is open, else keep it as the key pending frame.
+        """
+        if interval <= 0:
+            process(*args)
+            return
+
+        now = self._clock()
+        if key in self._pending:
+            self.superseded += 1
+            self._pending[key] = (interval, process, args)
+            return
+
+        next_time = self._next_time.get(key, 0)
+        if now >= next_time:
+            self._next_time[key] = now + interval
+            process(*args)
+            return
+
+        self.deferred += 1
+        self._pending[key] = (interval, process, args)
+        self._call_later(next_time - now, self._flush, key)
+
+    def _flush(self, key):
+        if (pending := self._pending.pop(key, None)) is None:
+            return
+        interval, process, args = pending
+        self._next_time[key] = self._clock() + interval
+        process(*args)
+
+    def discard(self, key):
+        self._pending.pop(key, None)
+        self._next_time.pop(key, None)
+
+    def prune(self):
+        """
+        Remove windows already expired, they do not constrain the next frame anymore.
+        """
+        now = self._clock()
+        for key in [key for key, next_time in self._next_time.items() if next_time <= now and key not in self._pending]:
+            del self._next_time[key]
+
+    def __len__(self):
+        return len(self._next_time)
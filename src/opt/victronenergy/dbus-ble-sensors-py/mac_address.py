@@ -0,0 +1,41 @@
+class MacAddressCache(object):
+    """
+    Converts bluetooth address strings ('AA:BB:CC:DD:EE:FF') to 48 bits integers, caching the conversions.
+
+    The cache is emptied when reaching its maximum size, to stay bounded with devices rotating random addresses.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size: int = max_size
+        self._cache: dict = {}
+
+    def to_int(self, address: str) -> int:
+        if (mac := self._cache.get(address, None)) is None:
+            if len(self._cache) >= self.max_size:
+                self._cache.clear()
+            mac = self._cache[address] = mac_to_int(address)
+        return mac
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def mac_to_int(address: str) -> int:
+    """
+    Convert a bluetooth address, with or without ':' separators, to an integer.
+    """
+    return int(address.replace(':', ''), 16)
+
+
+def mac_to_str(mac: int) -> str:
+    """
+    Convert an integer address to the lowercase, separator-less string used in device ids.
+    """
+    return f"{mac:012x}"
+
+
+def mac_to_address(mac: int) -> str:
+    """
+    Convert an integer address to the uppercase, ':' separated bluetooth address string.
+    """
+    return ':'.join(f"{byte:02X}" for byte in mac.to_bytes(6, 'big'))
@@ -0,0 +1,48 @@
+class PayloadCache(object):
+    """
+    Keeps the last manufacturer data received from each device, so that byte-identical rebroadcasts can be dropped
+    before any parsing.
+
+    An identical payload is still reported as new once every 'refresh' seconds so that device liveness, alarms and
+    dbus services keep being updated. A refresh of 0 disables de-duplication.
+    """
+
+    def __init__(self, refresh: float):
+        self.refresh: float = refresh
+        self.hits: int = 0
+        self.misses: int = 0
+        self._store: dict = {}
+
+    def is_recorded(self, key, payload: bytes, now: float) -> bool:
+        """
+        Check if the payload is the same as the previous one of the given key, without recording it: for frames which
+        may still be dropped before being processed, i.e. by a full ingest queue.
+        """
+        entry = self._store.get(key, None)
+        if entry is not None and now < entry[1] and entry[0] == payload:
+            self.hits += 1
+            return True
+        return False
+
+    def is_duplicate(self, key, payload: bytes, now: float) -> bool:
+        """
+        Check if the payload is the same as the previous one of the given key, and record it if not.
+        """
+        if self.is_recorded(key, payload, now):
+            return True
+        self._store[key] = (payload, now + self.refresh)
+        self.misses += 1
+        return False
+
+    def discard(self, key):
+        self._store.pop(key, None)
+
+    def prune(self, now: float):
+        """
+        Remove entries older than the refresh period, next payload of those devices would be processed anyway.
+        """
+        for key in [key for key, (_, refresh_time) in self._store.items() if refresh_time <= now]:
+            del self._store[key]
+
+    def __len__(self):
+        return len(self._store)
@@ -0,0 +1,51 @@
+from conf import SCAN_TIMEOUT, SCAN_SLEEP
+
+
+class ScanProfile(object):
+    """
+    Named set of scan parameters, applied to all adapters.
+
+    The processing window and period are a duty cycle of the service, not the HCI scan window and interval of the
+    controllers, which bluetoothd sets on its own and does not expose on D-Bus: advertisements are only processed
+    during processing windows, scanners being paused, or stopped if they are not persistent, in between.
+    """
+
+    def __init__(self, name: str, passive: bool, duplicate_data: bool, rssi_floor: int, processing_window: float,
+                 processing_period: float):
+        self.name: str = name
+        self.passive: bool = passive                # Passive scanning, only possible through manufacturer id filtering
+        self.duplicate_data: bool = duplicate_data  # BlueZ 'DuplicateData' discovery filter, report every advertisement
+        self.rssi_floor: int = rssi_floor           # Advertisements received below this RSSI are ignored, None for all
+        self.processing_window: float = processing_window  # Processing window duration, in seconds
+        self.processing_period: float = processing_period  # Processing windows period, in seconds, equal to
+                                                           # processing_window to process all advertisements
+
+    def discovery_filters(self) -> dict:
+        """
+        BlueZ discovery filters of an active scanner, cf. org.bluez.Adapter1.SetDiscoveryFilter.
+        """
+        filters = {'Transport': 'le', 'DuplicateData': self.duplicate_data}
+        if self.rssi_floor is not None:
+            filters['RSSI'] = self.rssi_floor
+        return filters
+
+    def __repr__(self):
+        return f"ScanProfile({self.name!r})"
+
+
+SCAN_PROFILES = {profile.name: profile for profile in [
+    # Default scan parameters
+    ScanProfile('balanced', passive=False, duplicate_data=False, rssi_floor=None,
+                processing_window=SCAN_TIMEOUT, processing_period=SCAN_TIMEOUT + SCAN_SLEEP),
+    # All sensors a few metres away: no scan requests, short processing windows and far away devices ignored
+    ScanProfile('low-power passive', passive=True, duplicate_data=False, rssi_floor=-85,
+                processing_window=SCAN_TIMEOUT, processing_period=4 * SCAN_TIMEOUT),
+    # Looking for new devices: continuous active scanning reporting every advertisement
+    ScanProfile('discovery', passive=False, duplicate_data=True, rssi_floor=None,
+                processing_window=SCAN_TIMEOUT, processing_period=SCAN_TIMEOUT),
+]}
+DEFAULT_SCAN_PROFILE = 'balanced'
+
+
+def get_scan_profile(name: str) -> ScanProfile:
+    return SCAN_PROFILES.get(name, SCAN_PROFILES[DEFAULT_SCAN_PROFILE])
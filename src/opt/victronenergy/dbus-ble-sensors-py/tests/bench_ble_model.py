@@ -0,0 +1,57 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext', 'velib_python'))
+import gc
+import tracemalloc
+from ble_role import BleRole
+from ble_device import BleDevice
+from ble_device_mopeka import BleDeviceMopeka
+from ble_device_ruuvi import BleDeviceRuuvi
+from ble_device_teltonika import BleDeviceTeltonika
+from ble_scanner_synthetic import _SyntheticDevice
+
+# Memory per device instance, each device configured on its own against devices sharing their model definition.
+# To be executed with command : python3 bench_ble_model.py
+
+DEVICES = 40
+
+
+def _load(devices: list, frames: list, shared: bool):
+    for device, man_data in zip(devices, frames):
+        if shared:
+            device.load_model(man_data)
+        else:
+            device.configure(man_data)
+        device._load_configuration()
+        device._parse_manufacturer_data(man_data)
+
+
+def _bench(name: str, dev_class, kind: str, shared: bool) -> float:
+    BleDevice.MODEL_DEFINITIONS.clear()
+    synthetics = [_SyntheticDevice(kind, index) for index in range(DEVICES)]
+    frames = [synthetic.next_frame()[1] for synthetic in synthetics]
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    devices = [dev_class(synthetic.address.replace(':', '').lower()) for synthetic in synthetics]
+    _load(devices, frames, shared)
+    gc.collect()
+    size = (tracemalloc.get_traced_memory()[0] - start) / DEVICES
+    tracemalloc.stop()
+    print(f"{name:<45} {size:12.0f} bytes/device")
+    return size
+
+
+def main():
+    BleRole.load_classes(os.path.dirname(os.path.abspath(__file__)))
+    for kind, dev_class in [('mopeka', BleDeviceMopeka), ('ruuvi', BleDeviceRuuvi), ('teltonika', BleDeviceTeltonika)]:
+        print(f"{dev_class.__name__}, {DEVICES} devices:")
+        before = _bench("  configured on their own", dev_class, kind, False)
+        after = _bench("  shared model definition", dev_class, kind, True)
+        print(f"  Reduction: x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
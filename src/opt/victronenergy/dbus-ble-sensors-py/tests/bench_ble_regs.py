@@ -0,0 +1,41 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext', 'velib_python'))
+import timeit
+from ble_role import BleRole
+from ble_device_mopeka import BleDeviceMopeka
+from ble_device_ruuvi import BleDeviceRuuvi
+from ble_device_teltonika import BleDeviceTeltonika
+from ble_scanner_synthetic import _SyntheticDevice
+
+# Manufacturer data parsing throughput, each reg parsed on its own against the compiled regs plan.
+# To be executed with command : python3 bench_ble_regs.py
+
+NUMBER = 20000
+
+
+def _bench(name: str, statement) -> float:
+    duration = min(timeit.repeat(statement, number=NUMBER, repeat=5)) / NUMBER
+    print(f"{name:<45} {1 / duration:12.0f} frames/s")
+    return duration
+
+
+def main():
+    BleRole.load_classes(os.path.dirname(os.path.abspath(__file__)))
+    for index, (kind, dev_class) in enumerate(
+            [('mopeka', BleDeviceMopeka), ('ruuvi', BleDeviceRuuvi), ('teltonika', BleDeviceTeltonika)]):
+        synthetic = _SyntheticDevice(kind, index)
+        _, man_data = synthetic.next_frame()
+        device = dev_class(synthetic.address.replace(':', '').lower())
+        device.configure(man_data)
+        device._load_configuration()
+        print(f"{dev_class.__name__}, {len(device.info['regs'])} regs, {len(man_data)} bytes:")
+        before = _bench("  regs parsed one by one", lambda: device._parse_regs(man_data))
+        after = _bench("  compiled regs plan", lambda: device._parse_manufacturer_data(man_data))
+        print(f"  Speedup: x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
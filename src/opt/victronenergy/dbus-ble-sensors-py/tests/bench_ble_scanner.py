@@ -0,0 +1,66 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import timeit
+import dbus
+from ble_scanner_bleak import BleScannerBleak
+from ble_scanner_bluez import BleScannerBluez
+
+# Per advertisement cost of the scanner backends signal handlers only, from the arguments of a BlueZ Device1
+# PropertiesChanged signal to the scan callback. Handlers are called directly, bleak through its BlueZ backend
+# advertisement handler after the property cache update done by its BlueZ manager: D-Bus message delivery and
+# decoding, match rules and start up GetManagedObjects costs are not measured, so this is not the whole backend
+# overhead.
+# To be executed with command : python3 bench_ble_scanner.py
+
+PATH = '/org/bluez/hci0/dev_01_23_45_AB_CD_EF'
+NUMBER = 100000
+
+
+def _callback(adapter, address, manufacturer_data, rssi):
+    pass
+
+
+def _bench(name: str, statement) -> float:
+    duration = min(timeit.repeat(statement, number=NUMBER, repeat=5)) / NUMBER
+    print(f"{name:<45} {duration * 1e9:10.1f} ns/advertisement")
+    return duration
+
+
+def main():
+    changed = dbus.Dictionary({
+        'ManufacturerData': dbus.Dictionary({dbus.UInt16(0x0059): dbus.ByteArray(b'\x03\x64\x3c\x88\x53\x11\x22\x33')},
+                                            signature='qv'),
+        'RSSI': dbus.Int16(-60),
+    }, signature='sv')
+    props = {
+        'Address': '01:23:45:AB:CD:EF',
+        'Alias': '01-23-45-AB-CD-EF',
+        'AddressType': 'public',
+        'Paired': False,
+        'Trusted': False,
+        'Blocked': False,
+        'LegacyPairing': False,
+        'Connected': False,
+        'UUIDs': [],
+        'Adapter': '/org/bluez/hci0',
+        'ServicesResolved': False,
+    }
+
+    bleak_scanner = BleScannerBleak('hci0', _callback)
+    bleak_backend = bleak_scanner._scanner._backend
+    bleak_backend.seen_devices = {}
+
+    def bleak_advertisement():
+        props.update(changed)
+        bleak_backend._handle_advertising_data(PATH, props)
+
+    bluez_scanner = BleScannerBluez('hci0', _callback)
+    bluez_advertisement = lambda: bluez_scanner._on_properties_changed('org.bluez.Device1', changed, [], path=PATH)
+
+    _bench("bleak backend signal handler", bleak_advertisement)
+    _bench("bluez backend signal handler", bluez_advertisement)
+
+
+if __name__ == "__main__":
+    main()
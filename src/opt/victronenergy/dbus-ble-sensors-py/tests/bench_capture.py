@@ -0,0 +1,53 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import logging
+import tempfile
+import timeit
+from logging.handlers import RotatingFileHandler
+from capture_writer import CaptureWriter
+
+# Scan callback cost of sniffer captures: the binary capture writer, only queuing frames, against the former text
+# logging, formatting and writing each frame to a rotating file.
+# To be executed with command : python3 bench_capture.py
+
+NUMBER = 100000
+MANUFACTURER_DATA = {0x0059: b'\x03\x64\x3c\x88\x53\x11\x22\x33\xf4\x08'}
+
+
+def _bench(name: str, statement) -> float:
+    duration = min(timeit.repeat(statement, number=NUMBER, repeat=5)) / NUMBER
+    print(f"{name:<45} {duration * 1e9:10.1f} ns/advertisement")
+    return duration
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        logger = logging.getLogger('bench_sniffer')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = RotatingFileHandler(os.path.join(directory, 'sniffer.log'), maxBytes=512 * 1024, backupCount=0)
+        handler.setFormatter(logging.Formatter(fmt='%(message)s'))
+        logger.addHandler(handler)
+
+        def log_frame():
+            for man_id, man_data in MANUFACTURER_DATA.items():
+                logger.info(f"{hex(man_id).upper()!r}: {man_data!r}")
+
+        writer = CaptureWriter(os.path.join(directory, 'sniffer.cap'), all_frames=True, max_pending=10 * NUMBER)
+        writer.start()
+
+        def capture_frame():
+            writer.write('hci0', 0x012345112233, -60, MANUFACTURER_DATA)
+
+        text = _bench("text logging", log_frame)
+        binary = _bench("binary capture", capture_frame)
+        writer.stop()
+        handler.close()
+        print(f"Saved per advertisement: {(text - binary) * 1e9:.1f} ns ({(1 - binary / text) * 100:.0f}%)")
+        print(f"Capture size: {os.path.getsize(writer.file_path) / writer.written:.1f} bytes/advertisement, "
+              f"{writer.dropped} dropped")
+
+
+if __name__ == "__main__":
+    main()
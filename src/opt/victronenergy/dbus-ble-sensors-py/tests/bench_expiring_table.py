@@ -0,0 +1,125 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import time
+import timeit
+import random
+from collections.abc import MutableMapping
+from expiring_table import ExpiringTable
+from mac_address import MacAddressCache
+
+# Known/ignored devices table micro benchmark, 10k entries.
+# To be executed with command : python3 bench_expiring_table.py
+
+ENTRIES = 10000
+EXPIRED_RATIO = 0.01
+
+
+class DatedDict(MutableMapping):
+    """
+    Previous implementation of the known/ignored device tables, kept as reference.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._store = {}
+
+    def _now(self): return time.monotonic()
+
+    def __setitem__(self, key, value):
+        self._store[key] = (value, self._now() + self.ttl)
+
+    def __getitem__(self, key):
+        value, _ = self._store[key]
+        self._store[key] = (value, self._now() + self.ttl)
+        return value
+
+    def __delitem__(self, key):
+        del self._store[key]
+
+    def __iter__(self):
+        return iter(self._store.keys())
+
+    def __len__(self):
+        return len(self._store)
+
+    def __contains__(self, key):
+        contains = key in self._store
+        if contains:
+            self[key]
+        return contains
+
+    def prune(self):
+        now = self._now()
+        for key in list(self._store.keys()):
+            value, expire_time = self._store[key]
+            if expire_time <= now:
+                del self._store[key]
+
+
+def _addresses() -> list:
+    rand = random.Random(42)
+    return [':'.join(f"{rand.randrange(256):02X}" for _ in range(6)) for _ in range(ENTRIES)]
+
+
+def _bench(name: str, statement, number: int):
+    duration = min(timeit.repeat(statement, number=number, repeat=5))
+    print(f"{name:<45} {duration / number * 1e9:10.1f} ns/op")
+
+
+def main():
+    addresses = _addresses()
+    str_keys = ["".join(address.split(':')).lower() for address in addresses]
+    cache = MacAddressCache(max_size=2 * ENTRIES)
+    int_keys = [cache.to_int(address) for address in addresses]
+
+    print(f"{ENTRIES} entries")
+    _bench("address -> str key (split/join/lower)", lambda: "".join(addresses[0].split(':')).lower(), 100000)
+    _bench("address -> int key (cached)", lambda: cache.to_int(addresses[0]), 100000)
+
+    dated = DatedDict(ttl=600)
+    table = ExpiringTable(ttl=600)
+    for str_key, int_key in zip(str_keys, int_keys):
+        dated[str_key] = True
+        table[int_key] = True
+
+    _bench("DatedDict hit (refresh)", lambda: str_keys[5000] in dated, 100000)
+    _bench("ExpiringTable hit (refresh)", lambda: int_keys[5000] in table, 100000)
+    _bench("DatedDict miss", lambda: 'ffffffffffff' in dated, 100000)
+    _bench("ExpiringTable miss", lambda: 0xffffffffffff in table, 100000)
+
+    # Pruning, EXPIRED_RATIO of entries being expired
+    expired = int(ENTRIES * EXPIRED_RATIO)
+    now = [0.0]
+    dated._now = lambda: now[0]
+    table._clock = lambda: now[0]
+
+    def fill():
+        now[0] = 0.0
+        dated._store.clear()
+        table._store.clear()
+        table._heap.clear()
+        for index, (str_key, int_key) in enumerate(zip(str_keys, int_keys)):
+            now[0] = 0.0 if index < expired else 100.0
+            dated[str_key] = True
+            table[int_key] = True
+        now[0] = 600.0
+
+    def prune_dated():
+        fill()
+        start = time.perf_counter()
+        dated.prune()
+        return time.perf_counter() - start
+
+    def prune_table():
+        fill()
+        start = time.perf_counter()
+        table.prune()
+        return time.perf_counter() - start
+
+    print(f"DatedDict prune ({expired} expired)              {min(prune_dated() for _ in range(20)) * 1e6:10.1f} us")
+    print(f"ExpiringTable prune ({expired} expired)          {min(prune_table() for _ in range(20)) * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext', 'velib_python'))
+import timeit
+from ble_device_mopeka import BleDeviceMopeka
+from ble_device_victronenergy import BleDeviceVictronEnergy
+from frame_validator import FrameValidator
+
+# Per frame cost of check_manufacturer_data: hand-written NIC check re-parsing the mac address, as Mopeka, Safiery and
+# Gobius select with HAND_WRITTEN_CHECK, class discriminators checked one by one, and their compiled per device
+# validator, the default.
+# To be executed with command : python3 bench_frame_validator.py
+
+NUMBER = 200000
+MOPEKA = ('012345112233', b'\x03\x64\x3C\x88\x53\x11\x22\x33\xF4\x08')
+SOLARSENSE = ('012345678901',
+              b'\x10\x00\x00\x00\xFF\x00\x00\x01\x05\x14\x00\x00\x74\x00\x00\x00\x00\x00\x00\xC0\xC2\x48\x77\x01')
+
+
+def _bench(name: str, statement) -> float:
+    duration = min(timeit.repeat(statement, number=NUMBER, repeat=5)) / NUMBER
+    print(f"{name:<45} {duration * 1e9:10.1f} ns/frame")
+    return duration
+
+
+def main():
+    for dev_class, (dev_mac, raw) in [(BleDeviceMopeka, MOPEKA), (BleDeviceVictronEnergy, SOLARSENSE)]:
+        print(f"{dev_class.__name__}:")
+        mac_tail = bytes.fromhex(dev_mac[6:])
+        validator = FrameValidator.compile(dev_class, mac_tail)
+        if dev_class is BleDeviceMopeka:
+            device = dev_class(dev_mac)
+            _bench("hand-written", lambda: device.check_frame(raw))
+        reference = _bench("class discriminators", lambda: dev_class.match_frame(raw, mac_tail))
+        compiled = _bench("compiled validator", lambda: validator(raw))
+        print(f"Saved per frame: {(reference - compiled) * 1e9:.1f} ns ({(1 - compiled / reference) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
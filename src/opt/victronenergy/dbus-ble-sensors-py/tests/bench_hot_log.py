@@ -0,0 +1,53 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import logging
+import timeit
+from hot_log import HotLog
+
+# Per advertisement logging cost of the processing path, as done by dbus_ble_sensors.py for every frame of known
+# devices: f-string logging against the rate limited hot path logging, with INFO enabled and disabled.
+# Logs are written to /dev/null, as multilog would write them to flash.
+# To be executed with command : python3 bench_hot_log.py
+
+NUMBER = 100000
+DEVICES = 50
+MAN_DATA = b'\x03\x64\x3c\x88\x53\x11\x22\x33\xf4\x08'
+
+
+def _bench(name: str, statement) -> float:
+    duration = min(timeit.repeat(statement, number=NUMBER, repeat=5)) / NUMBER
+    print(f"{name:<45} {duration * 1e9:10.1f} ns/advertisement")
+    return duration
+
+
+def main():
+    logger = logging.getLogger('bench_hot_log')
+    logger.propagate = False
+    with open(os.devnull, 'w') as devnull:
+        handler = logging.StreamHandler(devnull)
+        handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        logger.addHandler(handler)
+        hot_log = HotLog(logger=logger)
+        plogs = [f"{dev_mac:012x}:" for dev_mac in range(DEVICES)]
+        frames = iter(range(1 << 62))
+
+        def log_frame():
+            dev_mac = next(frames) % DEVICES
+            logger.info(f"{plogs[dev_mac]} received manufacturer data: {MAN_DATA!r}")
+
+        def hot_log_frame():
+            dev_mac = next(frames) % DEVICES
+            hot_log.info(dev_mac, "%s received manufacturer data: %r", plogs[dev_mac], MAN_DATA)
+
+        for level in (logging.INFO, logging.WARNING):
+            logger.setLevel(level)
+            print(f"Level {logging.getLevelName(level)}:")
+            standard = _bench("logging f-string", log_frame)
+            hot = _bench("hot path logging", hot_log_frame)
+            print(f"Saved per advertisement: {(standard - hot) * 1e9:.1f} ns ({(1 - hot / standard) * 100:.0f}%)")
+        handler.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,10 @@ class BleDeviceBaseTests(unittest.TestCase):
 
         # Test
         self.assertTrue(self.device.check_manufacturer_data(raw_data))
+        # Class discriminators, the compiled ones of check_manufacturer_data by default, accept it too
+        self.assertTrue(self.device.match_frame(raw_data, bytes.fromhex(self.device.info['dev_mac'][6:])))
         parsed_dict = self.device._parse_manufacturer_data(raw_data)
         self.assertDictEqual(parsed_dict, expected_dict)
+        # Compiled plan gives the same values, types and order as parsing each reg on its own
+        self.assertEqual(repr(parsed_dict), repr(self.device._parse_regs(raw_data)))
         return parsed_dict
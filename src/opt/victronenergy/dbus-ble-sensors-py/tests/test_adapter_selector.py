@@ -0,0 +1,58 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import unittest
+from adapter_selector import AdapterSelector
+
+
+class TestAdapterSelector(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_adapter_selector.py
+
+    def setUp(self):
+        self.selector = AdapterSelector(window=1, hysteresis=5, failover=60, smoothing=1)
+
+    def test_single_adapter(self):
+        self.assertTrue(self.selector.accept('aa', 'hci0', b'\x01', -70, 0))
+        self.assertTrue(self.selector.accept('aa', 'hci0', b'\x02', -70, 0.5))
+        # Same frame received again within the window
+        self.assertFalse(self.selector.accept('aa', 'hci0', b'\x02', -70, 0.6))
+        self.assertTrue(self.selector.accept('aa', 'hci0', b'\x02', -70, 2))
+        self.assertEqual(self.selector.pinned('aa'), 'hci0')
+        self.assertEqual(self.selector.duplicates, 1)
+
+    def test_pinning(self):
+        self.assertTrue(self.selector.accept('aa', 'hci0', b'\x01', -80, 0))
+        # Slightly better signal on the other adapter, within hysteresis
+        self.assertFalse(self.selector.accept('aa', 'hci1', b'\x01', -77, 0.1))
+        self.assertFalse(self.selector.accept('aa', 'hci1', b'\x02', -77, 2))
+        self.assertEqual(self.selector.suppressed, 2)
+        self.assertTrue(self.selector.accept('aa', 'hci0', b'\x02', -80, 2.1))
+        # Much better signal, other adapter takes over and the already processed frame is dropped
+        self.assertFalse(self.selector.accept('aa', 'hci1', b'\x02', -60, 2.2))
+        self.assertEqual(self.selector.pinned('aa'), 'hci1')
+        self.assertEqual(self.selector.switches, 1)
+        self.assertFalse(self.selector.accept('aa', 'hci0', b'\x03', -80, 3))
+        self.assertTrue(self.selector.accept('aa', 'hci1', b'\x03', -60, 3.1))
+
+    def test_failover(self):
+        self.assertTrue(self.selector.accept('aa', 'hci0', b'\x01', -60, 0))
+        self.assertFalse(self.selector.accept('aa', 'hci1', b'\x01', -90, 0.1))
+        self.assertTrue(self.selector.accept('aa', 'hci1', b'\x02', -90, 61))
+        self.assertEqual(self.selector.pinned('aa'), 'hci1')
+
+    def test_forget_adapter(self):
+        self.selector.accept('aa', 'hci0', b'\x01', -60, 0)
+        self.selector.accept('aa', 'hci1', b'\x01', -90, 0.1)
+        self.selector.forget_adapter('hci0')
+        self.assertIsNone(self.selector.pinned('aa'))
+        self.assertTrue(self.selector.accept('aa', 'hci1', b'\x02', -90, 1))
+        self.assertEqual(self.selector.pinned('aa'), 'hci1')
+
+    def test_prune(self):
+        self.selector.accept('aa', 'hci0', b'\x01', -60, 0)
+        self.selector.accept('bb', 'hci0', b'\x01', -60, 30)
+        self.selector.prune(70)
+        self.assertIsNone(self.selector.pinned('aa'))
+        self.assertEqual(len(self.selector), 1)
+        self.selector.discard('bb')
+        self.assertEqual(len(self.selector), 0)
@@ -0,0 +1,207 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext', 'velib_python'))
+import json
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+from ve_types import *
+from ble_role import BleRole
+from ble_device import BleDevice
+from ble_device_gobius import BleDeviceGobius
+import ble_definition
+from ble_definition import compile_definition, load_definition, _get_cache_paths
+
+
+class TestDeviceDefinition(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_ble_definition.py
+
+    SOURCE = {
+        'class_name': 'BleDeviceJsonTest',
+        'manufacturer_id': '0xFFF0',
+        'product_id': '0xC0FF',
+        'product_name': 'Test sensor',
+        'device_name': 'Test',
+        'dev_prefix': 'test',
+        'min_length': 4,
+        'discriminator': [{'offset': 0, 'value': '0x10', 'mask': '0xF0'}],
+        'model': {'type': 'VE_UN8', 'offset': 0, 'bits': 4},
+        'roles': {'temperature': {}},
+        'regs': [
+            {'name': 'Temperature', 'type': 'VE_SN16', 'offset': 1, 'scale': 100},
+            {'name': 'Humidity', 'type': 'VE_UN8', 'offset': 3, 'flags': ['REG_FLAG_INVALID'], 'inval': '0xff'},
+        ],
+        'models': {
+            '1': {'device_name': 'Test v1'},
+            '2': {'device_name': 'Test v2', 'settings': [
+                {'name': 'Offset', 'props': {'type': 'VE_SN32', 'def': 0, 'min': -10, 'max': 10}}]},
+        },
+    }
+
+    def setUp(self):
+        BleRole.load_classes(os.path.dirname(os.path.abspath(__file__)))
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, 'ble_device_jsontest.json')
+        self._write(self.SOURCE)
+        self.cache_home = os.path.join(self.directory.name, 'cache')
+        patcher = mock.patch.dict(os.environ, {'XDG_CACHE_HOME': self.cache_home})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _write(self, source: dict):
+        with open(self.file_path, 'w') as file:
+            json.dump(source, file)
+
+    def test_compile(self):
+        definition = load_definition(self.file_path)
+        self.assertEqual(definition['manufacturer_id'], 0xFFF0)
+        self.assertEqual(definition['info']['product_id'], 0xC0FF)
+        self.assertEqual(definition['discriminator'], ((0, 0xF0, 0x10),))
+        self.assertEqual(definition['model_byte'], (0, 0x0F, (1, 2)))
+        self.assertEqual(definition['min_length'], 4)
+        self.assertEqual(definition['info']['regs'][0]['type'], VE_SN16)
+        self.assertEqual(definition['info']['regs'][1]['inval'], 0xff)
+        self.assertEqual(sorted(definition['models']), [1, 2])
+        self.assertEqual(definition['models'][2]['settings'][0]['props']['type'], VE_SN32)
+        self.assertNotIn('models', definition['info'])
+
+    def test_invalid(self):
+        for source in [
+            dict(self.SOURCE, manufacturer_id='abc'),
+            {key: value for key, value in self.SOURCE.items() if key != 'manufacturer_id'},
+            dict(self.SOURCE, regs=[{'name': 'Bad', 'type': 'VE_UN12', 'offset': 0}]),
+            dict(self.SOURCE, regs=[{'name': 'Bad', 'type': 'VE_UN8', 'offset': 0, 'xlate': 12}]),
+            {key: value for key, value in self.SOURCE.items() if key != 'model'},
+            dict(self.SOURCE, length=2, discriminator=[{'offset': 2, 'value': 1}]),
+            # Keys the loader would silently ignore
+            dict(self.SOURCE, regs=[{'name': 'Bad', 'type': 'VE_UN8', 'offset': 0, 'format': 'veUnitNone'}]),
+        ]:
+            with self.assertRaises(ValueError):
+                compile_definition(source)
+
+    def test_cache(self):
+        definition = load_definition(self.file_path)
+        cache_path = _get_cache_paths(self.file_path)[0]
+        self.assertTrue(os.path.exists(cache_path))
+        # Loaded from the cache while the file is unchanged
+        with open(cache_path, 'rb') as file:
+            stamp, _ = pickle.load(file)
+        with open(cache_path, 'wb') as file:
+            pickle.dump((stamp, 'cached'), file)
+        self.assertEqual(load_definition(self.file_path), 'cached')
+        # Compiled again once changed
+        self._write(dict(self.SOURCE, product_name='Another test sensor'))
+        self.assertEqual(load_definition(self.file_path)['info']['product_name'], 'Another test sensor')
+        # Corrupted cache
+        with open(cache_path, 'wb') as file:
+            file.write(b'garbage')
+        with self.assertLogs(level='WARNING'):
+            self.assertEqual(load_definition(self.file_path)['info'], definition['info'] | {'product_name': 'Another test sensor'})
+
+    def test_cache_stamp(self):
+        load_definition(self.file_path)
+        cache_path = _get_cache_paths(self.file_path)[0]
+        with open(cache_path, 'rb') as file:
+            stamp, _ = pickle.load(file)
+        self.assertIn(sys.implementation.cache_tag, stamp)
+        # Cached by another Python version
+        with open(cache_path, 'wb') as file:
+            pickle.dump((tuple('cpython-00' if item == sys.implementation.cache_tag else item for item in stamp),
+                         'cached'), file)
+        self.assertEqual(load_definition(self.file_path)['info']['product_name'], 'Test sensor')
+
+    def test_cache_dirs(self):
+        pycache_path = os.path.join(self.directory.name, '__pycache__', 'ble_device_jsontest.json.pickle')
+        self.assertEqual(_get_cache_paths(self.file_path), [
+            os.path.join(self.cache_home, ble_definition.PROCESS_NAME, 'ble_device_jsontest.json.pickle'), pycache_path])
+        with mock.patch.dict(os.environ, {'XDG_CACHE_HOME': ''}), \
+                mock.patch.object(ble_definition, 'DATA_DIR', self.directory.name), \
+                mock.patch.object(ble_definition, 'DEFINITION_CACHE_DIR', self.cache_home):
+            self.assertEqual(_get_cache_paths(self.file_path),
+                             [os.path.join(self.cache_home, 'ble_device_jsontest.json.pickle'), pycache_path])
+            # No data partition
+            with mock.patch.object(ble_definition, 'DATA_DIR', os.path.join(self.directory.name, 'data')):
+                self.assertEqual(_get_cache_paths(self.file_path), [pycache_path])
+        # Next to the definition file when the cache directory is not writable, i.e. no home directory
+        with open(self.cache_home, 'w'):
+            pass
+        load_definition(self.file_path)
+        self.assertTrue(os.path.exists(pycache_path))
+        self.assertEqual(load_definition(self.file_path)['info']['product_name'], 'Test sensor')
+
+    def test_cache_write_failure(self):
+        expected = compile_definition(self.SOURCE)
+        # No cache directory
+        for path in (self.cache_home, os.path.join(self.directory.name, '__pycache__')):
+            with open(path, 'w'):
+                pass
+        with self.assertLogs(level='DEBUG') as logs:
+            self.assertEqual(load_definition(self.file_path)['info'], expected['info'])
+        self.assertTrue(all(record.levelname == 'DEBUG' for record in logs.records))
+        # Not picklable
+        os.remove(self.cache_home)
+        with mock.patch('ble_definition.pickle.dump', side_effect=pickle.PicklingError('not picklable')), \
+                self.assertLogs(level='DEBUG') as logs:
+            self.assertEqual(load_definition(self.file_path)['info'], expected['info'])
+        self.assertTrue(all(record.levelname == 'DEBUG' for record in logs.records))
+        self.assertEqual([name for _, _, names in os.walk(self.directory.name) for name in names
+                          if name.endswith(('.pickle', '.tmp'))], [])
+
+    def test_json_class(self):
+        device_classes = dict(BleDevice.DEVICE_CLASSES)
+        device_index = BleDevice.DEVICE_INDEX
+        try:
+            BleDevice.load_classes(self.file_path)
+            dev_class, = BleDevice.DEVICE_CLASSES[0xFFF0]
+        finally:
+            BleDevice.DEVICE_CLASSES.clear()
+            BleDevice.DEVICE_CLASSES.update(device_classes)
+            BleDevice.DEVICE_INDEX = device_index
+        self.assertEqual(dev_class.__name__, 'BleDeviceJsonTest')
+
+        device = dev_class('001122334455')
+        raw = b'\x12\x10\x27\x2a'
+        self.assertTrue(device.check_manufacturer_data(raw))
+        self.assertFalse(device.check_manufacturer_data(raw[:3]))
+        self.assertFalse(device.check_manufacturer_data(b'\x22' + raw[1:]))
+        device.load_model(raw)
+        device._load_configuration()
+        self.assertEqual(device._model.key, 2)
+        self.assertEqual(device.info['device_name'], 'Test v2 334455')
+        self.assertEqual(device.info['settings'][0]['name'], 'Offset')
+        self.assertEqual(device._parse_manufacturer_data(raw), {'temperature': {'Temperature': 100.0, 'Humidity': 42}})
+        # Unknown model
+        with self.assertRaises(ValueError):
+            dev_class('001122334466').load_model(b'\x13\x10\x27\x2a')
+
+    def test_missing_hook(self):
+        self._write(dict(self.SOURCE, regs=[{'name': 'Level', 'type': 'VE_UN8', 'offset': 1, 'xlate': 'missing'}]))
+        with self.assertRaises(ValueError):
+            type('BleDeviceHookTest', (BleDevice,), {'DEFINITION_FILE': self.file_path})
+
+    def test_instance_hook(self):
+        # Shared by all devices of a model, hooks must be static or class methods
+        self._write(dict(self.SOURCE, regs=[{'name': 'Level', 'type': 'VE_UN8', 'offset': 1, 'xlate': 'level'}]))
+        with self.assertRaises(ValueError):
+            type('BleDeviceHookTest', (BleDevice,), {'DEFINITION_FILE': self.file_path, 'level': lambda self, value: value})
+        dev_class = type('BleDeviceHookTest', (BleDevice,), {'DEFINITION_FILE': self.file_path,
+                                                             'level': staticmethod(lambda value: value)})
+        self.assertEqual(dev_class.DEFINITION['info']['regs'][0]['xlate'], 'level')
+
+    def test_python_hooks(self):
+        # Per firmware version models, with the xlate method of the class
+        raw = b'\x05\x3C\x96\x00\x67\x89\x01\x01\x01\x02\x09\x00\x00\x00'
+        first = BleDeviceGobius('012345678901')
+        first.load_model(raw)
+        first._load_configuration()
+        second = BleDeviceGobius('012345678902')
+        second.load_model(raw[:7] + b'\x02\x00\x00' + raw[10:])
+        second._load_configuration()
+        self.assertEqual((first.info['firmware_version'], second.info['firmware_version']), ('1.1.2', '2.0.0'))
+        self.assertEqual(first._parse_manufacturer_data(raw), {'tank': {'HardwareID': 5, 'Temperature': 20.0, 'RawValue': 15.0}})
@@ -4,6 +4,8 @@ sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext'))
 sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext', 'velib_python'))
 from ble_device_base_tests import BleDeviceBaseTests
+from functools import partial
+from ble_device import BleDevice
 from ble_device_mopeka import BleDeviceMopeka
 
 
@@ -39,6 +41,7 @@ class BleDeviceSafieryTests(BleDeviceBaseTests):
                     'HardwareID': 3,
                     'TankLevelExtension': 0,
                     'BatteryVoltage': 3.125,
+                    'Temperature': 20.0,
                     'RawValue': 5000,
                 },
                 "temperature": {
@@ -54,3 +57,60 @@ class BleDeviceSafieryTests(BleDeviceBaseTests):
                 }
             }
         )
+
+    def test_tank_level(self):
+        # Same frame as test_parsing_1: LPG sensor, 20°C, raw value 5000 us, butane ratio 0
+        raw = b'\x03\x64\x3C\x88\x53\x11\x22\x33\xF4\x08'
+        self.device.configure(raw)
+        self.device._load_configuration()
+        tank_data = self.device._parse_manufacturer_data(raw)['tank']
+        self.device.update_data({'ButaneRatio': 0}, tank_data)
+        # 5000 * (0.03615 + 0.573045 - 0.002822 * 60 - 0.00000535 * 60²) / 10
+        self.assertAlmostEqual(tank_data['RawValue'], 210.3075)
+
+    def test_compensation_tables(self):
+        self.device.configure(b'\x03\x64\x3C\x88\x53\x11\x22\x33\xF4\x08')
+        self.device._load_configuration()
+        for coefs in [BleDeviceMopeka._COEFS_H2O, BleDeviceMopeka._COEFS_LPG, BleDeviceMopeka._COEFS_GASOLINE]:
+            for butane_ratio in [None, 0, 35, 100]:
+                table = self.device.lookup_table((coefs, butane_ratio), BleDeviceMopeka._TEMPERATURE_STEPS,
+                                                 partial(self.device._get_scale, coefs, butane_ratio))
+                self.assertIs(table, self.device.lookup_table((coefs, butane_ratio), 0, None))
+                for temperature in range(BleDeviceMopeka._TEMPERATURE_STEPS):
+                    # Parsed temperature plus 40, as computed by update_data
+                    value = temperature - 40 + 40.0
+                    scale = 0.0 if butane_ratio is None else self.device._get_scale_butane(butane_ratio, value)
+                    scale += coefs[0] + coefs[1] * value + coefs[2] * value * value
+                    self.assertEqual(table[temperature].hex(), scale.hex())
+
+    def test_compensated_parsing(self):
+        # Shared model, plan specialized to the tank role as when only it is enabled, then update_data through the
+        # compensation tables
+        BleDevice.MODEL_DEFINITIONS.clear()
+        BleDevice.LOOKUP_TABLES.clear()
+        for hardware_id, settings, coefs, butane_ratio in [
+            (3, {'ButaneRatio': 35}, BleDeviceMopeka._COEFS_LPG, 35),
+            (5, {}, BleDeviceMopeka._COEFS_H2O, None),
+            (12, {'FluidType': 6}, BleDeviceMopeka._COEFS_GASOLINE, None),
+        ]:
+            for temperature_byte in [0x00, 0x3C, 0xFF]:
+                for extension in [0, 1]:
+                    raw = bytes([hardware_id | extension << 7, 0x64, temperature_byte, 0x88, 0x53, 0x11, 0x22, 0x33,
+                                 0xF4, 0x08])
+                    with self.subTest(hardware_id=hardware_id, temperature_byte=temperature_byte, extension=extension):
+                        device = BleDeviceMopeka('012345112233')
+                        device.load_model(raw)
+                        device._load_configuration()
+                        device._enabled_roles = {'tank'}
+                        device._compile_regs()
+                        tank_data = device._parse_manufacturer_data(raw)['tank']
+                        device.update_data(settings, tank_data)
+                        # Temperature plus 40, as advertised
+                        value = temperature_byte & 0x7F
+                        scale = coefs[0] + coefs[1] * value + coefs[2] * value * value
+                        if butane_ratio is not None:
+                            scale += BleDeviceMopeka._COEFS_BUTANE[0] + \
+                                BleDeviceMopeka._COEFS_BUTANE[1] * value * (butane_ratio / 100.0)
+                        raw_value = 16384 + 4 * 5000 if extension else 5000
+                        self.assertAlmostEqual(tank_data['RawValue'], raw_value * scale / 10)
+                        self.assertIn((BleDeviceMopeka, (coefs, butane_ratio)), BleDevice.LOOKUP_TABLES)
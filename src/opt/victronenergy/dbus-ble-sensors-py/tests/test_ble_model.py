@@ -0,0 +1,117 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext', 'velib_python'))
+import unittest
+from ble_role import BleRole
+from ble_device import BleDevice
+from ble_device_mopeka import BleDeviceMopeka
+from ble_device_ruuvi import BleDeviceRuuvi
+from ble_model import freeze
+from test_ble_device_dummy import _DummyDevice
+
+
+class _BoundHookDevice(_DummyDevice):
+    # Per model configuration referring to an instance method
+    def get_model_key(self, manufacturer_data: bytes) -> object:
+        return 0
+
+    def configure(self, manufacturer_data: bytes):
+        super().configure(manufacturer_data)
+        self.info['alarms'] = [{'name': '/Alarms/LowBattery', 'update': self._get_low_battery_state}]
+
+    def _get_low_battery_state(self, role_service) -> int:
+        return 0
+
+
+class TestModelDefinition(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_ble_model.py
+
+    RAW = b'\x03\x64\x3C\x88\x53\x11\x22\x33\xF4\x08'
+
+    def setUp(self):
+        BleRole.load_classes(os.path.dirname(os.path.abspath(__file__)))
+        BleDevice.MODEL_DEFINITIONS.clear()
+
+    def _load(self, dev_class, dev_mac: str, raw: bytes) -> BleDevice:
+        device = dev_class(dev_mac)
+        device.load_model(raw)
+        device._load_configuration()
+        return device
+
+    def test_shared(self):
+        first = self._load(BleDeviceMopeka, '012345112233', self.RAW)
+        second = self._load(BleDeviceMopeka, '012345445566', self.RAW)
+        self.assertIs(first._model, second._model)
+        self.assertIs(first.info['regs'], second.info['regs'])
+        self.assertIs(first._regs_plan, second._regs_plan)
+        # Per device values
+        self.assertEqual(first.info['device_name'], 'Mopeka LPG 112233')
+        self.assertEqual(second.info['device_name'], 'Mopeka LPG 445566')
+        self.assertEqual(second.info['dev_id'], 'mopeka_012345445566')
+        self.assertEqual(sorted(second.info.maps[0]), ['dev_id', 'dev_mac', 'device_name'])
+        self.assertEqual(first._model.info['device_name'], 'Mopeka LPG')
+        # Another model
+        other = self._load(BleDeviceMopeka, '012345778899', b'\x05' + self.RAW[1:])
+        self.assertIsNot(other._model, first._model)
+        self.assertEqual(other.info['device_name'], 'Mopeka H20 778899')
+
+    def test_same_values(self):
+        shared = self._load(BleDeviceMopeka, '012345112233', self.RAW)
+        device = BleDeviceMopeka('012345112233')
+        device.configure(self.RAW)
+        device._load_configuration()
+        self.assertIsNone(device._model)
+        self.assertEqual(repr(shared._parse_manufacturer_data(self.RAW)), repr(device._parse_manufacturer_data(self.RAW)))
+        self.assertEqual(repr(shared._parse_regs(self.RAW)), repr(device._parse_regs(self.RAW)))
+        for key in ['manufacturer_id', 'product_id', 'product_name', 'device_name', 'dev_prefix', 'dev_id']:
+            self.assertEqual(shared.info[key], device.info[key])
+        self.assertEqual(shared.info['regs'], freeze(device.info['regs']))
+
+    def test_read_only(self):
+        device = self._load(BleDeviceMopeka, '012345112233', self.RAW)
+        with self.assertRaises(TypeError):
+            device.info['regs'][0]['offset'] = 1
+        with self.assertRaises(AttributeError):
+            device.info['regs'].append({})
+        with self.assertRaises(TypeError):
+            device.info['roles']['tank']['flags'] = []
+
+    def test_not_shared(self):
+        # No model key, configured on its own
+        device = self._load(_DummyDevice, '001122334455', bytes(14))
+        self.assertIsNone(device._model)
+        self.assertIsInstance(device.info['regs'], list)
+        self.assertEqual(BleDevice.MODEL_DEFINITIONS, {})
+
+    def test_invalid_model(self):
+        with self.assertRaises(ValueError):
+            self._load(BleDeviceMopeka, '012345112233', b'\x7f' + self.RAW[1:])
+        self.assertEqual(BleDevice.MODEL_DEFINITIONS, {})
+
+    def test_ruuvi_length(self):
+        raw = bytes.fromhex('0512FC5394C37C0004FFFC040CAC364200CDCBB8334C884F')
+        device = self._load(BleDeviceRuuvi, 'cbb8334c884f', raw)
+        self.assertTrue(device.check_manufacturer_data(raw))
+        self.assertFalse(device.check_manufacturer_data(raw[:20]))
+
+    def test_hooks(self):
+        first = self._load(BleDeviceMopeka, '012345112233', self.RAW)
+        second = self._load(BleDeviceMopeka, '012345445566', self.RAW)
+        # Shared, bound to no device, per device values being given by their role services
+        update = first.info['alarms'][0]['update']
+        self.assertIs(update, second.info['alarms'][0]['update'])
+        self.assertIsNone(getattr(update, '__self__', None))
+        self.assertEqual(first.info['alarms'][0]['update']({'BatteryVoltage': 2.25}), 1)
+        self.assertEqual(second.info['alarms'][0]['update']({'BatteryVoltage': 3.0}), 0)
+        self.assertEqual(first.info['alarms'][0]['update']({}), 0)
+
+    def test_bound_hook(self):
+        with self.assertRaisesRegex(ValueError, "'_get_low_battery_state' is shared by all devices"):
+            self._load(_BoundHookDevice, '001122334455', bytes(14))
+        self.assertEqual(BleDevice.MODEL_DEFINITIONS, {})
+        # Configured on its own, it can be bound to the device
+        device = _BoundHookDevice('001122334455')
+        device.configure(bytes(14))
+        self.assertIs(device.info['alarms'][0]['update'].__self__, device)
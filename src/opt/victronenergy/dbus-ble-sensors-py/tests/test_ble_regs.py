@@ -0,0 +1,99 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext', 'velib_python'))
+import math
+import logging
+import random
+import unittest
+from ve_types import *
+from ble_device import BleDevice
+from ble_regs import RegsPlan
+
+
+class TestRegsPlan(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_ble_regs.py
+
+    REGS = [
+        {'name': 'U8', 'type': VE_UN8, 'offset': 0},
+        {'name': 'S16', 'type': VE_SN16, 'offset': 1, 'scale': 10, 'roles': ['temperature']},
+        {'name': 'S16BE', 'type': VE_SN16, 'offset': 1, 'flags': ['REG_FLAG_BIG_ENDIAN']},
+        {'name': 'U32', 'type': VE_UN32, 'offset': 3, 'flags': ['REG_FLAG_INVALID'], 'inval': 0xffffffff},
+        {'name': 'S24', 'type': VE_SN24, 'offset': 7, 'bias': -5, 'roles': ['tank']},
+        {'name': 'Bits', 'type': VE_UN8, 'offset': 2, 'shift': 3, 'bits': 3, 'xlate': lambda value: value * 2},
+        {'name': 'SBitsBE', 'type': VE_SN16, 'offset': 9, 'shift': 2, 'bits': 10, 'flags': ['REG_FLAG_BIG_ENDIAN']},
+        {'name': 'Ignored', 'type': VE_UN8, 'offset': 0, 'roles': [None]},
+        {'name': 'Str', 'type': VE_HEAP_STR, 'offset': 11, 'bits': 32},
+        {'name': 'Float', 'type': VE_FLOAT, 'offset': 0},
+        {'name': 'Last', 'type': VE_UN16, 'offset': 14, 'roles': []},
+    ]
+
+    def setUp(self):
+        self.device = BleDevice('aabbccddeeff')
+        self.device._plog = 'aabbccddeeff:'
+        self.device.info.update({'roles': {'temperature': {}, 'tank': {}}, 'regs': self.REGS})
+        self.plan = RegsPlan(self.REGS, self.device.info['roles'], self.device._load_reg)
+
+    def test_equivalence(self):
+        generator = random.Random(42)
+        logging.disable(logging.CRITICAL)
+        try:
+            for length in range(0, 18):
+                for _ in range(50):
+                    data = bytes(generator.getrandbits(8) for _ in range(length))
+                    self.assertEqual(repr(self.plan.parse(data)), repr(self.device._parse_regs(data)), data)
+            data = b'\x01\x02\x03\xff\xff\xff\xff\x00\x00\x80\x00abc\x00\x00\x00'
+            self.assertEqual(repr(self.plan.parse(data)), repr(self.device._parse_regs(data)))
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def test_values(self):
+        data = b'\x01\x02\x83\xff\xff\xff\xff\x00\x00\xff\x80ab\x00\x00\x00\x00'
+        self.assertEqual(self.plan.parse(data), {
+            'temperature': {'U8': 1, 'S16': -3199.8, 'S16BE': 643, 'Bits': 0, 'SBitsBE': -32, 'Str': 'ab'},
+            'tank': {'U8': 1, 'S16BE': 643, 'S24': -65541, 'Bits': 0, 'SBitsBE': -32, 'Str': 'ab'},
+        })
+
+    def test_short_frame(self):
+        with self.assertLogs(level='ERROR') as logs:
+            self.assertEqual(self.plan.parse(b'\x01\x02'), {'temperature': {'U8': 1}, 'tank': {'U8': 1}})
+        # Regs routed to no role are not parsed
+        self.assertEqual(len(logs.records), 8)
+
+    def test_enabled_roles(self):
+        data = b'\x01\x02\x83\xff\xff\xff\xff\x00\x00\xff\x80ab\x00\x00\x00\x00'
+        dependencies = {'tank': ['S16', 'Ignored']}
+        plan = RegsPlan(self.REGS, self.device.info['roles'], self.device._load_reg, enabled_roles={'tank'},
+                        dependencies=dependencies)
+        self.assertEqual(plan.parse(data), {
+            'tank': {'U8': 1, 'S16': -3199.8, 'S16BE': 643, 'S24': -65541, 'Bits': 0, 'Ignored': 1, 'SBitsBE': -32,
+                     'Str': 'ab'},
+        })
+        # Same values as regs parsed one by one
+        self.device.info['dependencies'] = dependencies
+        self.assertEqual(repr(plan.parse(data)['tank']), repr(self.device._parse_regs(data)['tank']))
+        # Only regs of the temperature role parsed
+        plan = RegsPlan(self.REGS, self.device.info['roles'], self.device._load_reg, enabled_roles={'temperature'})
+        self.assertEqual([field.name for field in plan._fields], ['U8', 'S16', 'S16BE', 'U32', 'Bits', 'SBitsBE', 'Str', 'Float'])
+        self.assertEqual(plan.parse(data), {
+            'temperature': {'U8': 1, 'S16': -3199.8, 'S16BE': 643, 'Bits': 0, 'SBitsBE': -32, 'Str': 'ab'},
+        })
+
+    def test_lookup_tables(self):
+        regs = [
+            {'name': 'Lum', 'type': VE_UN8, 'offset': 0, 'flags': ['REG_FLAG_INVALID'], 'inval': 0xff,
+             'xlate': lambda value: math.exp(value * 16 * math.log(2) / 254) - 1.0},
+            {'name': 'Signed', 'type': VE_SN16, 'offset': 1, 'bits': 10, 'scale': 3, 'bias': -0.5},
+            {'name': 'Level', 'type': VE_UN16, 'offset': 2, 'shift': 2, 'bits': 12, 'xlate': lambda value: value / 10},
+            {'name': 'NoLut', 'type': VE_UN8, 'offset': 0, 'flags': ['REG_FLAG_NO_LUT'], 'scale': 2},
+            {'name': 'Wide', 'type': VE_UN16, 'offset': 1, 'scale': 100},
+            {'name': 'Partial', 'type': VE_UN8, 'offset': 4, 'xlate': lambda value: 100 // (value - 3)},
+        ]
+        self.device.info['regs'] = regs
+        plan = RegsPlan(regs, self.device.info['roles'], self.device._load_reg)
+        self.assertEqual([field.table is not None for field in plan._fields], [True, True, True, False, False, False])
+        # Same values as regs parsed one by one, for all raw values of tabulated regs
+        for value in range(1 << 16):
+            data = bytes((value & 0xff, value >> 8, value & 0xff, value >> 8, 4 + (value & 0x7f)))
+            self.assertEqual(repr(plan.parse(data)), repr(self.device._parse_regs(data)), data)
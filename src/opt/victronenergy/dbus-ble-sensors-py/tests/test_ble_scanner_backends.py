@@ -0,0 +1,94 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import asyncio
+import tempfile
+import unittest
+from ble_scanner_replay import BleScannerReplay
+from ble_scanner_synthetic import BleScannerSynthetic, _SyntheticDevice
+from unittest import mock
+try:
+    from bleak.exc import BleakError, BleakDBusError
+    from ble_scanner_bleak import BleScannerBleak
+except ImportError:
+    BleScannerBleak = None
+
+
+class TestBleScannerBackends(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_ble_scanner_backends.py
+
+    def setUp(self):
+        self.received = []
+
+    def _callback(self, adapter, address, manufacturer_data, rssi):
+        self.received.append((adapter, address, manufacturer_data, rssi))
+
+    def _scan(self, scanner, duration: float):
+        async def scan():
+            async with scanner:
+                await asyncio.sleep(duration)
+        asyncio.run(scan())
+
+    def test_replay(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as capture:
+            capture.write("# Capture\n\n"
+                          "10.0 01:23:45:11:22:33 0x0059 03643c8853112233f408 -60\n"
+                          "10.1 aa:bb:cc:dd:ee:ff 0x1234 0102\n"
+                          "invalid\n")
+        try:
+            frames = BleScannerReplay.read_capture(capture.name)
+            self.assertEqual(frames, [
+                (10.0, '01:23:45:11:22:33', 0x0059, b'\x03\x64\x3c\x88\x53\x11\x22\x33\xf4\x08', -60),
+                (10.1, 'AA:BB:CC:DD:EE:FF', 0x1234, b'\x01\x02', -127),
+            ])
+            scanner = BleScannerReplay('replay0', self._callback, manufacturer_ids=[0x0059],
+                                       options={'file': capture.name, 'speed': '0'})
+            self._scan(scanner, 0.05)
+        finally:
+            os.unlink(capture.name)
+        # Manufacturer ids filter applied
+        self.assertEqual(self.received, [
+            ('replay0', '01:23:45:11:22:33', {0x0059: b'\x03\x64\x3c\x88\x53\x11\x22\x33\xf4\x08'}, -60)])
+
+    def test_synthetic_frames(self):
+        mopeka = _SyntheticDevice('mopeka', 1)
+        man_id, man_data = mopeka.next_frame()
+        self.assertEqual((man_id, len(man_data), man_data[5:8]), (0x0059, 10, mopeka.mac[3:]))
+        ruuvi = _SyntheticDevice('ruuvi', 2)
+        man_id, man_data = ruuvi.next_frame()
+        self.assertEqual((man_id, len(man_data), man_data[0], man_data[18:]), (0x0499, 24, 5, ruuvi.mac))
+        man_id, man_data = _SyntheticDevice('teltonika', 3).next_frame()
+        self.assertEqual((man_id, len(man_data)), (0x089A, 11))
+        self.assertEqual(ruuvi.address, 'C0:5E:00:00:00:02')
+
+    def test_synthetic_rate(self):
+        scanner = BleScannerSynthetic('synthetic0', self._callback, filters={'RSSI': -80},
+                                      options={'devices': '6', 'interval': '0.05'})
+        self._scan(scanner, 0.12)
+        self.assertGreaterEqual(len(self.received), 12)
+        self.assertEqual(len({address for _, address, _, _ in self.received}), 6)
+        # Below RSSI floor
+        self.received.clear()
+        scanner = BleScannerSynthetic('synthetic0', self._callback, filters={'RSSI': -50}, options={'devices': '3'})
+        self._scan(scanner, 0.05)
+        self.assertEqual(self.received, [])
+
+    @unittest.skipIf(BleScannerBleak is None, "bleak is not available")
+    def test_bleak_monitor_errors(self):
+        unsupported = [
+            BleakError("passive scanning on Linux requires BlueZ >= 5.56 with --experimental enabled"),
+            BleakDBusError('org.bluez.Error.NotSupported', []),
+        ]
+        transient = [
+            BleakError("adapter 'hci0' not found"),
+            BleakDBusError('org.bluez.Error.InProgress', []),
+            BleakDBusError('org.freedesktop.DBus.Error.NoReply', []),
+        ]
+        for error in unsupported + transient:
+            for manufacturer_ids in ([0x0059], None):
+                scanner = BleScannerBleak('hci0', self._callback, manufacturer_ids=manufacturer_ids)
+                with mock.patch.object(scanner._scanner, 'start', mock.AsyncMock(side_effect=error)):
+                    # Only monitor registration errors of filtered scanners mean filtering is not supported
+                    expected = NotImplementedError if manufacturer_ids and error in unsupported else type(error)
+                    with self.assertRaises(expected):
+                        asyncio.run(scanner.start())
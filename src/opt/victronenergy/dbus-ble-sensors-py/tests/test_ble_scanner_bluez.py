@@ -0,0 +1,86 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import asyncio
+import unittest
+from unittest import mock
+try:
+    import dbus
+    import ble_scanner_bluez
+    from ble_scanner_bluez import BleScannerBluez
+except ImportError:
+    dbus = None
+
+
+@unittest.skipIf(dbus is None, "dbus-python is not available")
+class TestBleScannerBluez(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_ble_scanner_bluez.py
+
+    PATH = '/org/bluez/hci0/dev_01_23_45_AB_CD_EF'
+
+    def setUp(self):
+        self.received = []
+        self.scanner = BleScannerBluez('hci0', lambda *args: self.received.append(args),
+                                       filters={'RSSI': -80, 'DuplicateData': True})
+
+    def test_properties_changed(self):
+        self.scanner._on_properties_changed(
+            'org.bluez.Device1', {'ManufacturerData': {0x0059: b'\x03\x64'}, 'RSSI': -60}, [], path=self.PATH)
+        # Unchanged manufacturer data are not signaled again
+        self.scanner._on_properties_changed('org.bluez.Device1', {'RSSI': -62}, [], path=self.PATH)
+        # Not advertisement related
+        self.scanner._on_properties_changed('org.bluez.Device1', {'Connected': True}, [], path=self.PATH)
+        # Other adapter
+        self.scanner._on_properties_changed(
+            'org.bluez.Device1', {'RSSI': -62}, [], path='/org/bluez/hci1/dev_01_23_45_AB_CD_EF')
+        self.assertEqual(self.received, [
+            ('hci0', '01:23:45:AB:CD:EF', {0x0059: b'\x03\x64'}, -60),
+            ('hci0', '01:23:45:AB:CD:EF', {0x0059: b'\x03\x64'}, -62),
+        ])
+
+    def test_interfaces(self):
+        self.scanner._on_interfaces_added(self.PATH, {'org.bluez.Device1': {
+            'Address': '01:23:45:AB:CD:EF', 'RSSI': -70, 'ManufacturerData': {0x0059: b'\x03\x64'}}})
+        self.scanner._on_interfaces_added(self.PATH + '/service0001', {'org.bluez.GattService1': {}})
+        self.assertEqual(self.received, [('hci0', '01:23:45:AB:CD:EF', {0x0059: b'\x03\x64'}, -70)])
+        self.scanner._on_interfaces_removed(self.PATH, ['org.bluez.Device1'])
+        self.assertEqual(self.scanner._devices, {})
+
+    def test_manufacturer_data_unknown(self):
+        # Not reported until manufacturer data are known, else the device would be ignored
+        self.scanner._on_interfaces_added(self.PATH, {'org.bluez.Device1': {'Address': '01:23:45:AB:CD:EF', 'RSSI': -70}})
+        self.scanner._on_properties_changed('org.bluez.Device1', {'RSSI': -68}, [], path=self.PATH)
+        self.assertEqual(self.received, [])
+        self.scanner._on_properties_changed(
+            'org.bluez.Device1', {'ManufacturerData': {0x0059: b'\x03\x64'}}, [], path=self.PATH)
+        self.assertEqual(self.received, [('hci0', '01:23:45:AB:CD:EF', {0x0059: b'\x03\x64'}, -68)])
+
+    def test_discovery_filter(self):
+        self.assertEqual(self.scanner._discovery_filter(), {'Transport': 'le', 'RSSI': -80, 'DuplicateData': True})
+        self.assertIsInstance(self.scanner._discovery_filter()['RSSI'], dbus.Int16)
+
+    def test_start(self):
+        devices = {
+            f"{self.PATH}": {'ManufacturerData': {0x0059: b'\x03\x64'}, 'RSSI': -60},
+            '/org/bluez/hci0/dev_01_23_45_AB_CD_F0': {'RSSI': -70},
+        }
+        bus = mock.MagicMock()
+        bus.call_async.side_effect = lambda service, path, interface, method, signature, args, reply, error, **kwargs: \
+            reply(devices[path])
+        proxy = mock.MagicMock()
+        proxy.Introspect.return_value = \
+            '<node><interface name="org.bluez.Adapter1"/><node name="dev_01_23_45_AB_CD_EF"/>' \
+            '<node name="dev_01_23_45_AB_CD_F0"/></node>'
+        scanner = BleScannerBluez('hci0', lambda *args: None, bus=bus)
+        with mock.patch.object(ble_scanner_bluez.dbus, 'Interface', return_value=proxy):
+            asyncio.run(scanner.start())
+        # Only the adapter device objects are read, not the whole BlueZ objects tree
+        self.assertEqual(sorted(call.args[1] for call in bus.call_async.call_args_list), sorted(devices))
+        bus.get_object.assert_any_call('org.bluez', '/org/bluez/hci0', introspect=False)
+        proxy.GetManagedObjects.assert_not_called()
+        self.assertEqual(scanner._devices, {path: [props.get('ManufacturerData', None), props['RSSI']]
+                                            for path, props in devices.items()})
+        # Adapter objects signals only
+        for call in bus.add_signal_receiver.call_args_list[1:]:
+            self.assertEqual(call.kwargs['arg0path'], '/org/bluez/hci0/')
+        proxy.StartDiscovery.assert_called_once_with()
@@ -0,0 +1,33 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import unittest
+from bluez_filter import manufacturer_or_patterns, scanner_args, AD_TYPE_MANUFACTURER_SPECIFIC_DATA
+
+
+class TestBluezFilter(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_bluez_filter.py
+
+    def test_patterns(self):
+        self.assertEqual(manufacturer_or_patterns([0x0499, 0x0059, 0x0499]), [
+            (0, AD_TYPE_MANUFACTURER_SPECIFIC_DATA, b'\x59\x00'),
+            (0, AD_TYPE_MANUFACTURER_SPECIFIC_DATA, b'\x99\x04'),
+        ])
+
+    def test_scanner_args(self):
+        args = scanner_args({0x02E1: None})
+        self.assertEqual(args['scanning_mode'], 'passive')
+        self.assertEqual(args['bluez']['or_patterns'], [(0, 0xFF, b'\xe1\x02')])
+
+    @unittest.skipUnless(os.environ.get('DBUS_SYSTEM_BUS_ADDRESS'), "needs a stand-in BlueZ bus in DBUS_SYSTEM_BUS_ADDRESS")
+    def test_bleak_scanner(self):
+        # Bleak always uses the system bus, point DBUS_SYSTEM_BUS_ADDRESS to a stand-in BlueZ to run this test
+        import asyncio
+        import bleak
+        from bleak.backends.bluezdbus.advertisement_monitor import OrPattern
+
+        async def scan():
+            async with bleak.BleakScanner(adapter='hci0', **scanner_args([0x0059])):
+                await asyncio.sleep(0.1)
+        asyncio.run(scan())
+        self.assertEqual(OrPattern(*manufacturer_or_patterns([0x0059])[0]).content_of_pattern, b'\x59\x00')
@@ -0,0 +1,83 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import tempfile
+import unittest
+from capture import FILE_MAGIC, RECORD_HEADER, is_capture, read_capture
+from capture_writer import CaptureWriter
+from ble_scanner_replay import BleScannerReplay
+
+
+class TestCapture(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_capture.py
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, 'sniffer.cap')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _capture(self, writer: CaptureWriter, frames: list):
+        writer.start()
+        for frame in frames:
+            writer.write(*frame)
+        writer.stop()
+
+    def test_round_trip(self):
+        writer = CaptureWriter(self.file_path)
+        self._capture(writer, [
+            ('hci0', 0x012345112233, -60, {0x0059: b'\x03\x64\x3c\x88\x53\x11\x22\x33\xf4\x08'}),
+            ('hci1', 0xaabbccddeeff, None, {0x0499: bytearray(b'\x05'), 0x1234: b''}),
+        ])
+        self.assertEqual(writer.written, 3)
+        self.assertTrue(is_capture(self.file_path))
+        frames = list(read_capture(self.file_path))
+        self.assertEqual([frame[1:] for frame in frames], [
+            ('hci0', 0x012345112233, -60, 0x0059, b'\x03\x64\x3c\x88\x53\x11\x22\x33\xf4\x08'),
+            ('hci1', 0xaabbccddeeff, -127, 0x0499, b'\x05'),
+            ('hci1', 0xaabbccddeeff, -127, 0x1234, b''),
+        ])
+        # Appended to on restart
+        self._capture(CaptureWriter(self.file_path), [('hci0', 1, -70, {0x0059: b'\x01'})])
+        self.assertEqual(len(list(read_capture(self.file_path))), 4)
+        # Readable by the replay backend
+        self.assertEqual(BleScannerReplay.read_capture(self.file_path)[0][1:],
+                         ('01:23:45:11:22:33', 0x0059, b'\x03\x64\x3c\x88\x53\x11\x22\x33\xf4\x08', -60))
+
+    def test_filters(self):
+        writer = CaptureWriter(self.file_path, man_ids=[0x0059], macs=[1, 2])
+        self._capture(writer, [
+            ('hci0', 1, -60, {0x0059: b'\x01', 0x0499: b'\x02'}),
+            ('hci0', 2, -60, {0x0499: b'\x03'}),
+            ('hci0', 3, -60, {0x0059: b'\x04'}),
+        ])
+        self.assertEqual([(frame.mac, frame.man_data) for frame in read_capture(self.file_path)], [(1, b'\x01')])
+
+    def test_rotation(self):
+        record_size = RECORD_HEADER.size + len('hci0') + 10
+        writer = CaptureWriter(self.file_path, max_size=len(FILE_MAGIC) + 2 * record_size, backup_count=2)
+        for index in range(4):
+            self._capture(writer, [('hci0', index, -60, {0x0059: bytes(10)})])
+        self.assertEqual(writer.rotations, 1)
+        self.assertEqual([frame.mac for frame in read_capture(self.file_path + '.1')], [0, 1])
+        self.assertEqual([frame.mac for frame in read_capture(self.file_path)], [2, 3])
+        self.assertFalse(os.path.exists(self.file_path + '.2'))
+
+    def test_truncated(self):
+        self._capture(CaptureWriter(self.file_path), [('hci0', index, -60, {0x0059: bytes(10)}) for index in range(2)])
+        with open(self.file_path, 'r+b') as file:
+            file.truncate(os.path.getsize(self.file_path) - 3)
+        with self.assertLogs(level='WARNING'):
+            self.assertEqual([frame.mac for frame in read_capture(self.file_path)], [0])
+
+    def test_not_a_capture(self):
+        with open(self.file_path, 'w') as file:
+            file.write("'Mopeka': b'\\x03'\n")
+        self.assertFalse(is_capture(self.file_path))
+        with self.assertRaises(ValueError):
+            list(read_capture(self.file_path))
+        # Previous file moved away
+        self._capture(CaptureWriter(self.file_path), [('hci0', 1, -60, {0x0059: b'\x01'})])
+        self.assertTrue(is_capture(self.file_path))
+        self.assertFalse(is_capture(self.file_path + '.1'))
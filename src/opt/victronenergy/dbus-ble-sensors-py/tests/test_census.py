@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import json
+import unittest
+from census import DiscoveryCensus
+
+
+class TestDiscoveryCensus(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_census.py
+
+    def setUp(self):
+        self.now = 100.0
+        self.census = DiscoveryCensus(max_manufacturers=2, max_devices=2, clock=lambda: self.now)
+
+    def test_summary(self):
+        self.census.record(0xaa, {0x0059: bytes(10)}, -60, 10)
+        self.census.record(0xaa, {0x0059: bytes(12)}, -80, 20)
+        self.census.record(0xbb, {0x0059: bytes(10), 0x0499: bytes(24)}, None, 30)
+        summary = self.census.summary()
+        self.assertEqual({key: value for key, value in summary.items() if key.startswith('0059/')}, {
+            '0059/Name': 'Nordic Semiconductor ASA',
+            '0059/Frames': 3,
+            '0059/Devices': 2,
+            '0059/RssiMin': -127,
+            '0059/RssiMax': -60,
+            '0059/Lengths': '10,12',
+            '0059/LastSeen': 70,
+        })
+        self.assertEqual((summary['0499/Frames'], summary['0499/Devices'], summary['Overflow']), (1, 0, 0))
+
+    def test_bounds(self):
+        for mac in range(3):
+            self.census.record(mac, {0x0059: b'\x01'}, -60, mac)
+        self.census.record(3, {0x1234: b'\x01'}, -60, 3)
+        self.census.record(3, {0x5678: b'\x01'}, -60, 4)
+        self.assertEqual(len(self.census), 2)
+        dump = self.census.dump()
+        self.assertEqual([device['mac'] for device in dump['devices']], ['000000000002', '000000000003'])
+        self.assertEqual([manufacturer['man_id'] for manufacturer in dump['manufacturers']], [0x0059, 0x1234])
+        self.assertEqual(dump['overflow'], 1)
+        # Serializable, with wall clock times
+        self.assertGreater(json.loads(json.dumps(dump))['devices'][0]['last_seen'], 1e9)
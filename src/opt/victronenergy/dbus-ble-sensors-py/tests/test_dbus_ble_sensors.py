@@ -0,0 +1,310 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext', 'velib_python'))
+import asyncio
+import unittest
+from unittest import mock
+try:
+    import dbus
+    import dbus_ble_sensors
+    from dbus_ble_sensors import DbusBleSensors
+    from dbus_ble_service import DbusBleService
+except ImportError:
+    dbus = None
+
+
+class _BluezError(Exception):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._name = name
+
+    def get_dbus_name(self) -> str:
+        return self._name
+
+
+class _BluezInterface(object):
+    """
+    BlueZ object interface, as given by dbus.Interface.
+    """
+
+    def __init__(self, bus, path: str, interface: str):
+        self._bus = bus
+        self._path = path
+        self._interface = interface
+
+    def Introspect(self) -> str:
+        nodes = ''.join(f'<node name="{name}"/>' for name in self._bus.adapters)
+        return f"<node>{nodes}</node>"
+
+    def Get(self, interface: str, name: str):
+        return self.GetAll(interface)[name]
+
+    def GetAll(self, interface: str) -> dict:
+        if (props := self._bus.objects.get(self._path, {}).get(interface, None)) is None:
+            raise _BluezError('org.freedesktop.DBus.Error.UnknownObject')
+        return props
+
+    def RemoveDevice(self, path, reply_handler=None, error_handler=None):
+        if self._bus.objects.pop(str(path), None) is None:
+            error_handler(_BluezError('org.bluez.Error.DoesNotExist'))
+            return
+        self._bus.removed.append((self._path, str(path)))
+        reply_handler()
+
+
+class _BluezBus(object):
+    """
+    System bus with a BlueZ service, recording signal receivers and device removals.
+    """
+
+    def __init__(self, adapters: dict):
+        self.adapters: dict = adapters  # Adapter name -> address
+        self.objects: dict = {f"/org/bluez/{name}": {'org.bluez.Adapter1': {'Address': address}}
+                              for name, address in adapters.items()}
+        self.receivers: list = []
+        self.removed: list = []
+        self.interfaces: list = []
+
+    def get_object(self, bus_name: str, path: str, introspect: bool = True):
+        return (self, path)
+
+    def add_signal_receiver(self, handler, **kwargs):
+        self.receivers.append((handler, kwargs))
+
+    def emit(self, signal_name: str, *args):
+        for handler, kwargs in self.receivers:
+            if kwargs['signal_name'] == signal_name and str(args[0]).startswith(kwargs['arg0path']):
+                handler(*args)
+
+    def call_async(self, bus_name: str, path: str, interface: str, method: str, signature: str, args: tuple,
+                   reply_handler, error_handler, **kwargs):
+        try:
+            reply = getattr(_BluezInterface(self, path, interface), method)(*args)
+        except _BluezError as e:
+            error_handler(e)
+        else:
+            reply_handler(reply)
+
+    def interface(self, proxy, interface: str) -> _BluezInterface:
+        self.interfaces.append((proxy[1], interface))
+        return _BluezInterface(proxy[0], proxy[1], interface)
+
+
+@unittest.skipIf(dbus is None, "dbus-python is not available")
+class TestDbusBleSensors(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_dbus_ble_sensors.py
+
+    def setUp(self):
+        self.bus = _BluezBus({'hci0': '00:11:22:33:44:55'})
+        self.service = mock.MagicMock()
+        self.service.get_operating_mode.return_value = 0
+        self.service.get_scan_profile.return_value = 'balanced'
+        self.service.get_payload_refresh.return_value = 0
+        for patcher in [
+            mock.patch.object(dbus_ble_sensors.dbus, 'SystemBus', return_value=self.bus),
+            mock.patch.object(dbus_ble_sensors.dbus, 'SessionBus', return_value=self.bus),
+            mock.patch.object(dbus_ble_sensors.dbus, 'Interface',
+                              side_effect=lambda proxy, interface: proxy[0].interface(proxy, interface)),
+            mock.patch.object(dbus_ble_sensors, 'DbusBleService', return_value=self.service),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_startup(self):
+        sensors = DbusBleSensors(backend='bluez')
+        self.assertEqual(sensors._adapters, ['hci0'])
+        self.service.add_ble_adapter.assert_called_once_with('hci0', '00:11:22:33:44:55')
+
+        # Scan loop starts a scheduler per adapter
+        started = []
+
+        async def scan_scheduler(adapter: str, previous: asyncio.Task = None):
+            started.append(adapter)
+
+        async def run():
+            task = asyncio.create_task(sensors.scan_loop())
+            await asyncio.sleep(0.01)
+            task.cancel()
+
+        with mock.patch.object(sensors, '_scan_scheduler', scan_scheduler), \
+                mock.patch.object(sensors, '_housekeeping_loop', mock.AsyncMock()), \
+                mock.patch.object(sensors, '_ingest_loop', mock.AsyncMock()):
+            asyncio.run(run())
+        self.assertEqual(started, ['hci0'])
+
+    def test_adapter_hotplug(self):
+        sensors = DbusBleSensors(backend='bluez')
+        # A single receiver per signal, on the BlueZ objects namespace as object paths are not strings
+        self.assertEqual([(kwargs['signal_name'], kwargs['arg0path']) for _, kwargs in self.bus.receivers], [
+            ('InterfacesAdded', '/org/bluez/'), ('InterfacesRemoved', '/org/bluez/')])
+        self.assertTrue(all('arg0' not in kwargs for _, kwargs in self.bus.receivers))
+
+        self.bus.objects['/org/bluez/hci1'] = {'org.bluez.Adapter1': {'Address': '66:77:88:99:AA:BB'}}
+        self.bus.emit('InterfacesAdded', dbus.ObjectPath('/org/bluez/hci1'), {'org.bluez.Adapter1': {}})
+        # Device objects are not adapters
+        self.bus.emit('InterfacesAdded', dbus.ObjectPath('/org/bluez/hci1/dev_01_23_45_67_89_AB'),
+                      {'org.bluez.Device1': {}})
+        self.assertEqual(sensors._adapters, ['hci0', 'hci1'])
+        self.service.add_ble_adapter.assert_called_with('hci1', '66:77:88:99:AA:BB')
+
+        self.bus.emit('InterfacesRemoved', dbus.ObjectPath('/org/bluez/hci1/dev_01_23_45_67_89_AB'),
+                      ['org.bluez.Device1'])
+        self.assertEqual(sensors._adapters, ['hci0', 'hci1'])
+        self.bus.emit('InterfacesRemoved', dbus.ObjectPath('/org/bluez/hci1'), ['org.bluez.Adapter1'])
+        self.assertEqual(sensors._adapters, ['hci0'])
+        self.service.remove_ble_adapter.assert_called_once_with('hci1')
+        self.assertEqual(list(sensors._bluez_adapters), ['hci0'])
+        self.assertEqual(sensors._bluez_signals, 4)
+
+    def test_filtered_scan_fallback(self):
+        self.service.get_filtered_scan.return_value = True
+        sensors = DbusBleSensors(backend='bluez')
+        errors = [OSError('org.bluez.Error.InProgress'), NotImplementedError('No advertisement monitor')]
+        filtered = []
+
+        async def scan(adapter: str):
+            scanner = sensors._new_scanner(adapter)
+            filtered.append(bool(scanner.manufacturer_ids))
+            if not errors:
+                raise asyncio.CancelledError()
+            raise errors.pop(0)
+
+        with mock.patch.object(sensors, '_scan_persistent', scan), mock.patch.object(sensors, '_scan_cycle', scan), \
+                mock.patch.object(dbus_ble_sensors, 'SCAN_SLEEP', 0.01):
+            with self.assertRaises(asyncio.CancelledError):
+                asyncio.run(sensors._scan_scheduler('hci0'))
+        # Transient errors are retried with filtering, unsupported filtering is not
+        self.assertEqual(filtered, [True, True, False])
+        self.assertEqual(sensors._filter_failed, {'hci0'})
+
+    def test_owned_devices(self):
+        self.service.get_operating_mode.return_value = 1
+        self.service.get_enabled_device_macs.return_value = {'0123456789ab'}
+        sensors = DbusBleSensors(backend='bluez')
+        self.assertEqual(sensors._owned_mac, {0x0123456789AB})
+        self.assertTrue(sensors._owned_only)
+        # Settings subtree only read again when the operating mode changes, as on each housekeeping pass
+        sensors._on_operating_mode_changed(1)
+        self.service.get_enabled_device_macs.assert_called_once_with()
+        # Kept up to date by role 'Enabled' changes instead
+        sensors._on_device_enabled_changed('0123456789ac', True)
+        sensors._on_device_enabled_changed('0123456789ab', False)
+        self.assertEqual(sensors._owned_mac, {0x0123456789AC})
+        with mock.patch.object(sensors, '_call_later'):
+            sensors._on_discovery_changed(1)
+        self.assertFalse(sensors._owned_only)
+        self.assertEqual(self.service.get_enabled_device_macs.call_count, 1)
+        sensors._on_operating_mode_changed(0)
+        sensors._on_device_enabled_changed('0123456789ad', True)
+        self.assertEqual(sensors._owned_mac, set())
+
+    def test_device_enabled_callback(self):
+        service = DbusBleService.__new__(DbusBleService)
+        service._dbus_settings = mock.MagicMock()
+        service._dbus_ble_service = mock.MagicMock()
+        service._dbus_ble_service._dbusobjects = {}
+        service._device_enabled_callback = None
+        received = []
+        service.init_device_enabled(lambda dev_mac, is_enabled: received.append((dev_mac, is_enabled)))
+        callbacks = {}
+        role_services = {}
+        with mock.patch.object(service, '_set_proxy_setting',
+                               side_effect=lambda setting_path, item_path, *args: callbacks.update({item_path: args[-1]})):
+            for role_name in ('tank', 'temperature'):
+                role_service = role_services[role_name] = mock.MagicMock()
+                role_service.ble_role.NAME = role_name
+                role_service.get_dev_id.return_value = 'mopeka_0123456789ab'
+                service.register_role_service(role_service)
+        for role_name, value in (('tank', 1), ('temperature', 0)):
+            item = service._dbus_ble_service._dbusobjects[f"/Devices/mopeka_0123456789ab_{role_name}/Enabled"] = \
+                mock.MagicMock()
+            item.local_get_value.return_value = value
+        # Item values are not updated yet when called
+        callbacks['/Devices/mopeka_0123456789ab_temperature/Enabled'](1)
+        callbacks['/Devices/mopeka_0123456789ab_tank/Enabled'](0)
+        self.assertEqual(received, [('0123456789ab', True), ('0123456789ab', False)])
+        role_services['temperature'].on_enabled_changed.assert_called_once_with(1)
+        role_services['tank'].on_enabled_changed.assert_called_once_with(0)
+
+    def test_shed_frame_not_deduplicated(self):
+        sensors = DbusBleSensors(backend='bluez')
+        sensors._active_adapters.add('hci0')
+        sensors._payload_cache.refresh = 30
+        sensors._ingest_queue = dbus_ble_sensors.IngestQueue(maxsize=1)
+        dev_mac = 0x0123456789AB
+        sensors._known_mac[dev_mac] = mock.MagicMock(enabled=False, adapter='hci0')
+        frame = {0x0059: b'\x03\x64'}
+        # Queue full of records of enabled devices, the frame of a known device is shed
+        sensors._ingest_queue.put(dbus_ble_sensors.IngestQueue.PRIORITY_ENABLED, (0x0123456789AC,))
+        sensors._scan_callback('hci0', '01:23:45:67:89:AB', frame, -40)
+        self.assertEqual(sensors._ingest_queue.dropped[dbus_ble_sensors.IngestQueue.PRIORITY_KNOWN], 1)
+        sensors._ingest_queue.get_batch(1)
+        # Same data again, not taken as already processed
+        sensors._scan_callback('hci0', '01:23:45:67:89:AB', frame, -40)
+        sensors._scan_callback('hci0', '01:23:45:67:89:AB', frame, -40)
+        records = sensors._ingest_queue.get_batch(2)
+        self.assertEqual(len(records), 1)
+        with mock.patch.object(sensors._throttle, 'submit') as submit:
+            for record in records * 2:
+                sensors._ingest(*record)
+        # Processed once, then skipped
+        submit.assert_called_once()
+        sensors._scan_callback('hci0', '01:23:45:67:89:AB', frame, -40)
+        self.assertEqual(len(sensors._ingest_queue), 0)
+
+    def test_remove_bluez_device(self):
+        self.bus = _BluezBus({'hci0': '00:11:22:33:44:55', 'hci1': '66:77:88:99:AA:BB'})
+        self.bus.objects.update({
+            '/org/bluez/hci1/dev_01_23_45_67_89_AB': {'org.bluez.Device1': {'Paired': False, 'Trusted': False,
+                                                                            'Connected': False}},
+            '/org/bluez/hci0/dev_01_23_45_67_89_AC': {'org.bluez.Device1': {'Paired': True}},
+            '/org/bluez/hci0/dev_01_23_45_67_89_AD': {'org.bluez.Device1': {'Trusted': True}},
+            '/org/bluez/hci1/dev_01_23_45_67_89_AE': {'org.bluez.Device1': {'Connected': True}},
+        })
+        with mock.patch.object(dbus_ble_sensors.dbus, 'SystemBus', return_value=self.bus), \
+                mock.patch.object(dbus_ble_sensors.dbus, 'SessionBus', return_value=self.bus):
+            sensors = DbusBleSensors(backend='bluez')
+        interfaces = len(self.bus.interfaces)
+        self.assertIn(('/org/bluez/hci1', 'org.bluez.Adapter1'), self.bus.interfaces)
+        for dev_mac in [0x0123456789AB, 0x0123456789AC, 0x0123456789AD, 0x0123456789AE, 0x0123456789AF]:
+            sensors._remove_bluez_device(dev_mac)
+        # Only from its own adapter, paired, trusted and connected devices being kept
+        self.assertEqual(self.bus.removed, [('/org/bluez/hci1', '/org/bluez/hci1/dev_01_23_45_67_89_AB')])
+        self.assertEqual((sensors._bluez_removed, sensors._bluez_kept, sensors._bluez_remove_errors), (1, 3, 0))
+        # Adapter interfaces are built once
+        self.assertEqual(len(self.bus.interfaces), interfaces)
+
+    def test_reap_bluez_devices(self):
+        sensors = DbusBleSensors(backend='bluez')
+        now = [0.0]
+        clock = lambda: now[0]
+        sensors._ignored_mac = dbus_ble_sensors.BoundedExpiringSet(ttl=10, max_size=2, clock=clock, keep_evicted=True)
+        rejected = dbus_ble_sensors.BoundedExpiringSet(ttl=10, max_size=2, clock=clock, keep_evicted=True)
+        for dev_mac in range(1, 4):
+            self.bus.objects[f"/org/bluez/hci0/dev_00_00_00_00_00_0{dev_mac}"] = {'org.bluez.Device1': {}}
+        for dev_mac in range(4, 7):
+            self.bus.objects[f"/org/bluez/hci0/dev_00_00_00_00_00_0{dev_mac}"] = {'org.bluez.Device1': {}}
+            rejected.add((dev_mac, 0x0059, 10, None))
+        for dev_mac in range(1, 4):
+            sensors._ignored_mac.add(dev_mac)
+        # Rejected frames of a known device
+        sensors._known_mac[5] = mock.MagicMock()
+
+        with mock.patch.object(dbus_ble_sensors.BleDevice.DEVICE_INDEX, 'rejected', rejected), \
+                mock.patch.object(dbus_ble_sensors, 'BLUEZ_REMOVE_BATCH', 2):
+            # Evicted ones first
+            sensors._reap_bluez_devices()
+            self.assertEqual(self.bus.removed, [('/org/bluez/hci0', '/org/bluez/hci0/dev_00_00_00_00_00_01'),
+                                                ('/org/bluez/hci0', '/org/bluez/hci0/dev_00_00_00_00_00_04')])
+            self.assertEqual(len(sensors._bluez_stale), 0)
+            # Then expired ones, a batch per call
+            now[0] = 20
+            sensors._reap_bluez_devices()
+            self.assertEqual(len(self.bus.removed), 4)
+            self.assertEqual(list(sensors._bluez_stale), [5, 6])
+            sensors._reap_bluez_devices()
+        self.assertEqual(sorted(path for _, path in self.bus.removed),
+                         [f"/org/bluez/hci0/dev_00_00_00_00_00_0{dev_mac}" for dev_mac in (1, 2, 3, 4, 6)])
+        self.assertEqual(len(sensors._bluez_stale), 0)
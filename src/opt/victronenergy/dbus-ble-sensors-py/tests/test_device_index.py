@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext', 'velib_python'))
+import unittest
+from ble_device import BleDevice
+from ble_device_mopeka import BleDeviceMopeka
+from device_index import DeviceClassIndex
+
+
+class _NordicBeacon(BleDevice):
+    MANUFACTURER_ID = 0x0059
+    MANUFACTURER_IDS = (0x0059, 0xFFF1)
+    DATA_LENGTHS = (10,)
+    DISCRIMINATOR = ((0, 0xFF, 0x42), (1, 0x0F, 0x01))
+
+
+class _NordicGeneric(BleDevice):
+    MANUFACTURER_ID = 0x0059
+    MIN_DATA_LENGTH = 4
+
+
+class TestDeviceClassIndex(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_device_index.py
+
+    MAC = 0x012345112233
+    RAW = b'\x03\x64\x3C\x88\x53\x11\x22\x33\xF4\x08'
+
+    def setUp(self):
+        self.device_classes = dict(BleDevice.DEVICE_CLASSES)
+        self.device_index = BleDevice.DEVICE_INDEX
+        BleDevice.DEVICE_CLASSES.clear()
+        for dev_class in [_NordicGeneric, BleDeviceMopeka, _NordicBeacon]:
+            self.assertTrue(BleDevice._register_class(dev_class, dev_class.__module__, __file__))
+        self.index = DeviceClassIndex(BleDevice.DEVICE_CLASSES)
+
+    def tearDown(self):
+        BleDevice.DEVICE_CLASSES.clear()
+        BleDevice.DEVICE_CLASSES.update(self.device_classes)
+        BleDevice.DEVICE_INDEX = self.device_index
+
+    def test_register(self):
+        # Most specific first, registered under all their manufacturer ids
+        self.assertEqual(BleDevice.DEVICE_CLASSES[0x0059], [BleDeviceMopeka, _NordicBeacon, _NordicGeneric])
+        self.assertEqual(BleDevice.DEVICE_CLASSES[0xFFF1], [_NordicBeacon])
+        with self.assertLogs(level='ERROR'):
+            BleDevice._register_class(BleDeviceMopeka, BleDeviceMopeka.__module__, __file__)
+        self.assertEqual(BleDevice.DEVICE_CLASSES[0x0059].count(BleDeviceMopeka), 1)
+
+    def test_lookup(self):
+        self.assertIs(self.index.lookup(0x0059, self.RAW, self.MAC), BleDeviceMopeka)
+        # Key byte selected candidates
+        beacon = b'\x42\x31' + self.RAW[2:]
+        self.assertIs(self.index.lookup(0x0059, beacon, self.MAC), _NordicBeacon)
+        self.assertIs(self.index.lookup(0xFFF1, beacon, self.MAC), _NordicBeacon)
+        self.assertIsNone(self.index.lookup(0xFFF1, self.RAW, self.MAC))
+        # Other lengths, not matching Mopeka nor the beacon
+        self.assertIs(self.index.lookup(0x0059, self.RAW[:6], self.MAC), _NordicGeneric)
+        self.assertIsNone(self.index.lookup(0x0059, self.RAW[:3], self.MAC))
+        # Unknown model
+        self.assertIs(self.index.lookup(0x0059, b'\x07' + self.RAW[1:], self.MAC), _NordicGeneric)
+        # Not echoing the mac address
+        self.assertIs(self.index.lookup(0x0059, self.RAW, 0x012345112234), _NordicGeneric)
+        self.assertIsNone(self.index.lookup(0xFFF2, self.RAW, self.MAC))
+
+    def test_rejected(self):
+        BleDevice.DEVICE_CLASSES[0x0059].remove(_NordicGeneric)
+        calls = []
+        match_frame = BleDeviceMopeka.match_frame
+        BleDeviceMopeka.match_frame = classmethod(lambda cls, *args: calls.append(args) or match_frame(*args))
+        try:
+            other_mac = 0x012345112234
+            self.assertIsNone(self.index.lookup(0x0059, self.RAW, other_mac))
+            self.assertIsNone(self.index.lookup(0x0059, self.RAW, other_mac))
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(self.index.rejections, 1)
+            self.assertEqual(len(self.index.rejected), 1)
+            # Cached per mac address
+            self.assertIs(self.index.lookup(0x0059, self.RAW, self.MAC), BleDeviceMopeka)
+            self.assertEqual(len(calls), 2)
+            # Another key byte value is another combination
+            self.assertIsNone(self.index.lookup(0x0059, b'\x42\x30' + self.RAW[2:], other_mac))
+            self.assertEqual(self.index.rejections, 2)
+        finally:
+            del BleDeviceMopeka.match_frame
+        self.assertIs(BleDeviceMopeka.match_frame.__func__, match_frame.__func__)
+
+    def test_check_manufacturer_data(self):
+        device = BleDeviceMopeka('012345112233')
+        self.assertTrue(device.check_manufacturer_data(self.RAW))
+        self.assertFalse(device.check_manufacturer_data(self.RAW[:9]))
+        self.assertFalse(device.check_manufacturer_data(self.RAW[:6] + b'\x00' + self.RAW[7:]))
@@ -0,0 +1,133 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import unittest
+from expiring_table import ExpiringTable, BoundedExpiringSet
+
+
+class _Deletable(object):
+    def __init__(self):
+        self.deleted = False
+
+    def delete(self):
+        self.deleted = True
+
+
+class TestExpiringTable(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_expiring_table.py
+
+    def setUp(self):
+        self.now = 0.0
+        self.table = ExpiringTable(ttl=10, clock=lambda: self.now)
+
+    def test_mapping(self):
+        self.table[1] = 'a'
+        self.table[2] = 'b'
+        self.assertIn(1, self.table)
+        self.assertNotIn(3, self.table)
+        self.assertEqual(self.table[1], 'a')
+        self.assertEqual(self.table.get(3, 'z'), 'z')
+        self.assertEqual(sorted(self.table.keys()), [1, 2])
+        self.assertEqual(sorted(self.table.values()), ['a', 'b'])
+        del self.table[1]
+        self.assertEqual(self.table.pop(2), 'b')
+        self.assertEqual(len(self.table), 0)
+
+    def test_expiry(self):
+        self.table[1] = 'a'
+        self.now = 5
+        self.table[2] = 'b'
+        self.now = 10
+        self.assertEqual(self.table.prune(), [1])
+        self.assertEqual(list(self.table.keys()), [2])
+        self.now = 15
+        self.assertEqual(self.table.prune(), [2])
+
+    def test_refresh_on_read(self):
+        self.table[1] = 'a'
+        self.table[2] = 'b'
+        self.now = 8
+        self.assertIn(1, self.table)
+        self.now = 12
+        self.assertEqual(self.table.prune(), [2])
+        self.now = 16
+        self.assertEqual(self.table.get(1), 'a')
+        self.now = 25
+        self.assertEqual(self.table.prune(), [])
+        self.now = 26
+        self.assertEqual(self.table.prune(), [1])
+
+    def test_delete_and_readd(self):
+        self.table[1] = 'a'
+        del self.table[1]
+        self.now = 5
+        self.table[1] = 'b'
+        self.now = 10
+        self.assertEqual(self.table.prune(), [])
+        self.assertEqual(self.table[1], 'b')
+        self.now = 21
+        self.assertEqual(self.table.prune(), [1])
+        self.assertEqual(self.table._heap, [])
+
+    def test_delete_on_expiry(self):
+        value = _Deletable()
+        self.table[1] = value
+        self.now = 10
+        self.table.prune()
+        self.assertTrue(value.deleted)
+
+
+class TestBoundedExpiringSet(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.set = BoundedExpiringSet(ttl=10, max_size=3, clock=lambda: self.now)
+
+    def test_membership(self):
+        self.set.add(1)
+        self.set[2] = True
+        self.assertIn(1, self.set)
+        self.assertIn(2, self.set)
+        self.assertNotIn(3, self.set)
+        self.set.discard(1)
+        self.assertNotIn(1, self.set)
+        self.assertEqual(len(self.set), 1)
+
+    def test_size_cap(self):
+        for key in range(3):
+            self.set.add(key)
+        # Refresh 0, 1 becomes the least recently seen
+        self.assertIn(0, self.set)
+        self.set.add(3)
+        self.assertEqual(len(self.set), 3)
+        self.assertEqual(self.set.evictions, 1)
+        self.assertNotIn(1, self.set)
+        self.assertEqual(sorted(self.set), [0, 2, 3])
+
+    def test_expiry(self):
+        self.set.add(1)
+        self.now = 5
+        self.set.add(2)
+        self.now = 8
+        self.assertIn(1, self.set)
+        self.now = 15
+        self.assertEqual(self.set.prune(), [2])
+        # Expired keys are absent even before pruning
+        self.now = 18
+        self.assertNotIn(1, self.set)
+        self.assertEqual(self.set.expirations, 2)
+        self.assertEqual(len(self.set), 0)
+
+    def test_evicted(self):
+        self.set.add(0)
+        self.assertEqual(self.set.pop_evicted(), [])
+        kept = BoundedExpiringSet(ttl=10, max_size=2, clock=lambda: self.now, keep_evicted=True)
+        for key in range(4):
+            self.set.add(key)
+            kept.add(key)
+        self.assertEqual(self.set.pop_evicted(), [])
+        self.assertEqual(kept.pop_evicted(), [0, 1])
+        self.assertEqual(kept.pop_evicted(), [])
+        # Only the last 'max_size' evicted keys are kept
+        for key in range(4, 8):
+            kept.add(key)
+        self.assertEqual(kept.pop_evicted(), [4, 5])
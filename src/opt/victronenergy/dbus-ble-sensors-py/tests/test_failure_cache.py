@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import unittest
+from failure_cache import FailureCache
+
+
+class TestFailureCache(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_failure_cache.py
+
+    def setUp(self):
+        self.now = 0.0
+        self.published = {}
+        self.cache = FailureCache(backoff_min=10, backoff_max=60, max_size=2, publish=self._publish,
+                                  clock=lambda: self.now)
+
+    def _publish(self, key, text):
+        if text is None:
+            self.published.pop(key)
+        else:
+            self.published[key] = text
+
+    def test_backoff(self):
+        key = (0xaa, 0x59)
+        self.assertTrue(self.cache.should_retry(key))
+        retry_times = []
+        for _ in range(5):
+            self.cache.record(key, 'ValueError: bad id')
+            while not self.cache.should_retry(key):
+                self.now += 1
+            retry_times.append(self.now)
+        # Retried after 10, 20, 40, then capped to 60 seconds
+        self.assertEqual(retry_times, [10, 30, 70, 130, 190])
+        self.assertEqual(self.published[key], 'ValueError: bad id (x5)')
+
+    def test_reason_change(self):
+        key = (0xaa, 0x59)
+        self.assertEqual(self.cache.record(key, 'a'), 1)
+        self.assertEqual(self.cache.record(key, 'a'), 2)
+        self.assertEqual(self.cache.record(key, 'b'), 1)
+        # Backoff of the latest reason only
+        self.now = 10
+        self.assertTrue(self.cache.should_retry(key))
+        self.assertEqual(self.published[key], 'b (x1)')
+        # Each reason keeps its own count
+        self.assertEqual(self.cache.record(key, 'a'), 3)
+        self.assertFalse(self.cache.should_retry(key))
+        self.assertEqual(len(self.cache), 2)
+        self.cache.discard(key)
+        self.assertEqual((len(self.cache), self.published), (0, {}))
+        self.assertNotIn(key, self.cache)
+
+    def test_size_and_clear(self):
+        for mac in range(3):
+            self.cache.record((mac, 0x59), 'error')
+        self.assertEqual(len(self.cache), 2)
+        self.assertNotIn((0, 0x59), self.cache)
+        self.assertEqual(set(self.published), {(1, 0x59), (2, 0x59)})
+        self.cache.clear(generation=2)
+        self.assertEqual((len(self.cache), self.published, self.cache.generation), (0, {}, 2))
+
+    def test_prune(self):
+        self.cache.record((1, 0x59), 'error')
+        self.now = 69
+        self.cache.prune()
+        self.assertEqual(len(self.cache), 1)
+        self.now = 70
+        self.cache.prune()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_prune_reason(self):
+        key = (1, 0x59)
+        self.cache.record(key, 'a')
+        self.now = 30
+        self.cache.record(key, 'b')
+        # Older reason pruned, the latest one is still published
+        self.now = 70
+        self.cache.prune()
+        self.assertEqual((len(self.cache), self.published), (1, {key: 'b (x1)'}))
+        self.cache.record(key, 'a')
+        self.cache.record((2, 0x59), 'a')
+        # Size capped on reasons, oldest first
+        self.assertEqual((len(self.cache), self.published), (2, {key: 'a (x1)', (2, 0x59): 'a (x1)'}))
+        self.assertFalse(self.cache.should_retry(key))
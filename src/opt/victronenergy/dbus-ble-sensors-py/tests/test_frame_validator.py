@@ -0,0 +1,143 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext'))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..', 'ext', 'velib_python'))
+import random
+import unittest
+from ble_device_gobius import BleDeviceGobius
+from ble_device_mopeka import BleDeviceMopeka
+from ble_device_ruuvi import BleDeviceRuuvi
+from ble_device_safiery import BleDeviceSafiery
+from ble_device_teltonika import BleDeviceTeltonika
+from ble_device_victronenergy import BleDeviceVictronEnergy
+from frame_validator import FrameValidator
+
+
+class TestFrameValidator(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_frame_validator.py
+
+    # Device test vectors, cf. test_ble_device_*.py, and their acceptance
+    VECTORS = [
+        (BleDeviceMopeka, '012345112233', b'\x03\x64\x3C\x88\x53\x11\x22\x33\xF4\x08', True),
+        (BleDeviceMopeka, '012345112233', b'\x03\x64\x3C\x88\x53\x11\x00\x33\xF4\x08', False),
+        (BleDeviceSafiery, '012345332211', b'\x0A\x64\xB2\x2C\x01\x33\x22\x11\xFE\x05', True),
+        (BleDeviceSafiery, '012345332211', b'\x0A\x64\xB2\x2C\x01\x00\x00\x00\xFE\x05', False),
+        (BleDeviceGobius, '012345678901', b'\x05\x3C\x96\x00\x67\x89\x01\x01\x01\x02\x09\x00\x00\x00', True),
+        (BleDeviceVictronEnergy, '012345678901',
+         b'\x10\x00\x00\x00\xFF\x00\x00\x01\x05\x14\x00\x00\x74\x00\x00\x00\x00\x00\x00\xC0\xC2\x48\x77\x01', True),
+        (BleDeviceRuuvi, '012345332211',
+         b'\x05\x11\x94\x55\xA8\xC8\x7D\x00\x64\xFF\x9C\x00\x00\x05\x78\x10\x12\x34\x56\x78\x9A\xBC\xDE\xF0', True),
+        (BleDeviceRuuvi, '012345332211',
+         b'\x06\x0F\xA0\x55\xA8\xC8\x7D\x00\x7B\x01\x9F\x40\x20\x50\x00\x01\x12\xAA\xBB\xCC', True),
+        (BleDeviceTeltonika, '7cd9f411427d', b'\x01\xb7\x08\xb4\x12\x0c\xcb\x0b\xff\xc7\x67', True),
+        (BleDeviceTeltonika, '7cd9f411427d', b'\x01\xC0\x4D', True),
+    ]
+
+    # Classes with a hand-written check, cf. HAND_WRITTEN_CHECK, and their NIC offset
+    HAND_WRITTEN = {BleDeviceMopeka: 5, BleDeviceSafiery: 5, BleDeviceGobius: 4}
+
+    @staticmethod
+    def _variants(raw: bytes, rand: random.Random) -> list:
+        # Truncated, extended and single byte altered frames
+        variants = [raw[:length] for length in range(len(raw) + 1)] + [raw + b'\x00', raw + raw]
+        for offset in range(len(raw)):
+            for value in [0x00, 0xFF, raw[offset] ^ 0x01, raw[offset] ^ 0x80, rand.randrange(256)]:
+                variants.append(raw[:offset] + bytes([value]) + raw[offset + 1:])
+        return variants
+
+    @staticmethod
+    def _hand_written(device, manufacturer_data: bytes) -> bool:
+        if isinstance(device, BleDeviceMopeka):
+            # Unknown models are only rejected by configure
+            return device.check_frame(manufacturer_data) and manufacturer_data[0] & 0x7F in BleDeviceMopeka.MODELS
+        return device.check_frame(manufacturer_data)
+
+    def test_equivalence(self):
+        rand = random.Random(0)
+        for dev_class, dev_mac, raw, accepted in self.VECTORS:
+            mac_tail = bytes.fromhex(dev_mac[6:])
+            validator = FrameValidator.compile(dev_class, mac_tail)
+            self.assertEqual(validator(raw), accepted)
+            device = dev_class(dev_mac) if dev_class in self.HAND_WRITTEN else None
+            for variant in self._variants(raw, rand):
+                with self.subTest(dev_class=dev_class.__name__, data=variant.hex()):
+                    self.assertEqual(validator(variant), dev_class.match_frame(variant, mac_tail))
+                    if device is not None:
+                        self.assertEqual(validator(variant), self._hand_written(device, variant))
+
+    def test_hand_written(self):
+        for dev_class, dev_mac, raw, accepted in self.VECTORS:
+            if dev_class not in self.HAND_WRITTEN or not accepted:
+                continue
+            nic_offset = self.HAND_WRITTEN[dev_class]
+            device = dev_class(dev_mac)
+            self.assertTrue(device.check_manufacturer_data(raw))
+            self.assertTrue(self._hand_written(device, raw))
+            mutations = {
+                'truncated': (raw[:-1], False),
+                'extended': (raw + b'\x00', False),
+                'empty': (b'', False),
+            }
+            for index in range(3):
+                offset = nic_offset + index
+                mutations[f"mac echo {index}"] = (raw[:offset] + bytes([raw[offset] ^ 0x01]) + raw[offset + 1:], False)
+            mutations['mac echo shifted'] = (raw[:nic_offset] + raw[nic_offset + 1:nic_offset + 3] +
+                                             raw[nic_offset:nic_offset + 1] + raw[nic_offset + 3:], False)
+            if dev_class is BleDeviceMopeka:
+                # Hardware id is Mopeka only discriminator byte, its 8th bit not being part of it
+                unknown = next(value for value in range(0x80) if value not in BleDeviceMopeka.MODELS)
+                mutations['unknown model'] = (bytes([unknown]) + raw[1:], False)
+                mutations['model extension bit'] = (bytes([raw[0] | 0x80]) + raw[1:], True)
+            else:
+                # Length and mac address echo are Safiery and Gobius only discriminators
+                mutations['hardware id'] = (bytes([raw[0] ^ 0x7F]) + raw[1:], True)
+            mutations['payload'] = (raw[:-1] + bytes([raw[-1] ^ 0xFF]), True)
+            # Same class, selecting its hand-written check
+            hand_written_class = type(dev_class.__name__, (dev_class,), {'HAND_WRITTEN_CHECK': True})
+            for name, (data, expected) in mutations.items():
+                with self.subTest(dev_class=dev_class.__name__, mutation=name):
+                    device = dev_class(dev_mac)
+                    self.assertEqual(self._hand_written(device, data), expected)
+                    self.assertEqual(device.check_manufacturer_data(data), expected)
+                    self.assertIsInstance(device._frame_validator, FrameValidator)
+                    device = hand_written_class(dev_mac)
+                    self.assertEqual(device.check_manufacturer_data(data), device.check_frame(data))
+                    self.assertEqual(device._frame_validator, device.check_frame)
+                    if name != 'unknown model':
+                        self.assertEqual(device.check_manufacturer_data(data), expected)
+
+    def test_compiled(self):
+        mac_tail = b'\x11\x22\x33'
+        # Fully fixed bytes are a single slice compare
+        validator = FrameValidator.compile(BleDeviceMopeka, mac_tail)
+        self.assertEqual((validator._start, validator._end, validator._pattern), (5, 8, mac_tail))
+        self.assertIsNone(validator._getter)
+        # Fixed bytes with gaps, a single itemgetter, and partially fixed bytes
+        validator = FrameValidator(discriminator=((0, 0xF0, 0x10), (2, 0xFF, 0x01)), mac_echo_offset=4,
+                                   mac_tail=mac_tail)
+        self.assertIsNone(validator._pattern)
+        self.assertEqual(validator._values, (0x01, 0x11, 0x22, 0x33))
+        self.assertEqual((validator._masked, validator._min_length), (((0, 0xF0, 0x10),), 7))
+        self.assertTrue(validator(b'\x1A\x00\x01\x00\x11\x22\x33\x44'))
+        self.assertFalse(validator(b'\x2A\x00\x01\x00\x11\x22\x33\x44'))
+        self.assertFalse(validator(b'\x1A\x00\x02\x00\x11\x22\x33\x44'))
+        # Contradictory discriminators never match
+        validator = FrameValidator(discriminator=((0, 0xF0, 0x10), (0, 0x30, 0x20)))
+        self.assertFalse(validator(b'\x10'))
+        self.assertFalse(validator(b'\x30'))
+        validator = FrameValidator(discriminator=((0, 0x0F, 0x10),))
+        self.assertFalse(validator(b'\x10'))
+
+    def test_fallback(self):
+        class _HandWritten(BleDeviceSafiery):
+            @classmethod
+            def match_frame(cls, manufacturer_data: bytes, mac_tail: bytes) -> bool:
+                return manufacturer_data[0] == 0x0A
+
+        device = BleDeviceSafiery('012345332211')
+        self.assertTrue(device.check_manufacturer_data(self.VECTORS[2][2]))
+        self.assertIsInstance(device._frame_validator, FrameValidator)
+        device = _HandWritten('012345332211')
+        self.assertTrue(device.check_manufacturer_data(self.VECTORS[3][2]))
+        self.assertNotIsInstance(device._frame_validator, FrameValidator)
@@ -0,0 +1,58 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import logging
+import unittest
+from hot_log import HotLog
+
+
+class _Unformattable(object):
+    def __repr__(self):
+        raise AssertionError("formatted although not emitted")
+
+
+class TestHotLog(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_hot_log.py
+
+    def setUp(self):
+        self.now = 0.0
+        self.logger = logging.getLogger('test_hot_log')
+        self.logger.setLevel(logging.INFO)
+        self.hot_log = HotLog(interval=60, burst=2, max_keys=3, logger=self.logger, clock=lambda: self.now)
+
+    def test_rate_limit(self):
+        with self.assertLogs(self.logger, level='INFO') as logs:
+            for index in (0, 1, _Unformattable(), 2, 3):
+                self.hot_log.info(0xaa, "%s received %r", 'aa:', index)
+            self.hot_log.info(0xbb, "%s received %r", 'bb:', 0)
+            # Suppressed messages are not formatted, nor are disabled ones
+            self.hot_log.debug(0xbb, "%s debug %r", 'bb:', _Unformattable())
+            self.hot_log.info(0xaa, "%s received %r", 'aa:', 4)
+            self.now = 60
+            self.hot_log.info(0xaa, "%s received %r", 'aa:', 5)
+        self.assertEqual([record.getMessage() for record in logs.records], [
+            "aa: received 0",
+            "aa: received 1",
+            "bb: received 0",
+            "aa: received 4 (4 similar messages suppressed)",
+            "aa: received 5",
+        ])
+        self.assertEqual(self.hot_log.suppressed, 4)
+
+    def test_flush(self):
+        self.hot_log.info(0xaa, "%s received %r", 'aa:', 0)
+        with self.assertLogs(self.logger, level='INFO') as logs:
+            for key in range(4):
+                for index in range(3):
+                    self.hot_log.info(key, "%d: %d", key, index)
+            # Table full on the third key, the first ones were summarized and dropped
+            self.assertEqual(len(self.hot_log), 2)
+            self.now = 60
+            self.hot_log.flush()
+        self.assertEqual([record.getMessage() for record in logs.records if 'suppressed' in record.getMessage()], [
+            "0: 2 (1 similar messages suppressed)",
+            "1: 2 (1 similar messages suppressed)",
+            "2: 2 (1 similar messages suppressed)",
+            "3: 2 (1 similar messages suppressed)",
+        ])
+        self.assertEqual(len(self.hot_log), 0)
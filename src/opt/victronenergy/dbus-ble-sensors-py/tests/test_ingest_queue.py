@@ -0,0 +1,54 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import asyncio
+import unittest
+from ingest_queue import IngestQueue
+
+
+class TestIngestQueue(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_ingest_queue.py
+
+    def setUp(self):
+        self.queue = IngestQueue(maxsize=4)
+
+    def test_priority_order(self):
+        self.queue.put(IngestQueue.PRIORITY_DISCOVERY, ('d1',))
+        self.queue.put(IngestQueue.PRIORITY_ENABLED, ('e1',))
+        self.queue.put(IngestQueue.PRIORITY_KNOWN, ('k1',))
+        self.queue.put(IngestQueue.PRIORITY_ENABLED, ('e2',))
+        self.assertEqual(self.queue.get_batch(3), [('e1',), ('e2',), ('k1',)])
+        self.assertEqual(len(self.queue), 1)
+        self.assertEqual(self.queue.get_batch(3), [('d1',)])
+        self.assertEqual(len(self.queue), 0)
+
+    def test_shed_lowest_priority_first(self):
+        self.queue.put(IngestQueue.PRIORITY_DISCOVERY, ('d1',))
+        self.queue.put(IngestQueue.PRIORITY_DISCOVERY, ('d2',))
+        self.queue.put(IngestQueue.PRIORITY_KNOWN, ('k1',))
+        self.queue.put(IngestQueue.PRIORITY_ENABLED, ('e1',))
+
+        # Full: oldest discovery record is shed
+        self.assertTrue(self.queue.put(IngestQueue.PRIORITY_ENABLED, ('e2',)))
+        self.assertTrue(self.queue.put(IngestQueue.PRIORITY_ENABLED, ('e3',)))
+        self.assertEqual(self.queue.dropped, [2, 0, 0])
+
+        # Only higher priorities queued: incoming discovery record is refused
+        self.assertFalse(self.queue.put(IngestQueue.PRIORITY_DISCOVERY, ('d3',)))
+        self.assertEqual(self.queue.dropped, [3, 0, 0])
+
+        # Same priority: oldest is shed
+        self.assertTrue(self.queue.put(IngestQueue.PRIORITY_KNOWN, ('k2',)))
+        self.assertEqual(self.queue.dropped, [3, 1, 0])
+        self.assertEqual(self.queue.get_batch(10), [('e1',), ('e2',), ('e3',), ('k2',)])
+
+    def test_wait(self):
+        async def scenario():
+            waiter = asyncio.create_task(self.queue.wait())
+            await asyncio.sleep(0)
+            self.assertFalse(waiter.done())
+            self.queue.put(IngestQueue.PRIORITY_KNOWN, ('k1',))
+            await asyncio.wait_for(waiter, 1)
+            # Returns immediately while records are queued
+            await asyncio.wait_for(self.queue.wait(), 1)
+        asyncio.run(scenario())
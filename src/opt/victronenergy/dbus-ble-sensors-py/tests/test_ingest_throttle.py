@@ -0,0 +1,76 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import unittest
+from ingest_throttle import IngestThrottle
+
+
+class TestIngestThrottle(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_ingest_throttle.py
+
+    def setUp(self):
+        self.now = 0.0
+        self.timers = []
+        self.processed = []
+        self.throttle = IngestThrottle(
+            call_later=lambda delay, callback, *args: self.timers.append((self.now + delay, callback, args)),
+            clock=lambda: self.now
+        )
+
+    def _run_timers(self, until: float):
+        self.now = until
+        for timer in [timer for timer in self.timers if timer[0] <= until]:
+            self.timers.remove(timer)
+            timer[1](*timer[2])
+
+    def _process(self, value):
+        self.processed.append(value)
+
+    def test_no_interval(self):
+        self.throttle.submit('aa', 0, self._process, 1)
+        self.throttle.submit('aa', 0, self._process, 2)
+        self.assertEqual(self.processed, [1, 2])
+        self.assertEqual(self.timers, [])
+
+    def test_latest_wins(self):
+        self.throttle.submit('aa', 5, self._process, 1)
+        self.now = 1
+        self.throttle.submit('aa', 5, self._process, 2)
+        self.now = 2
+        self.throttle.submit('aa', 5, self._process, 3)
+        self.assertEqual(self.processed, [1])
+        self.assertEqual((self.throttle.deferred, self.throttle.superseded), (1, 1))
+
+        # Window expires, newest frame is processed
+        self._run_timers(5)
+        self.assertEqual(self.processed, [1, 3])
+
+        # New window started at flush time
+        self.now = 6
+        self.throttle.submit('aa', 5, self._process, 4)
+        self.assertEqual(self.processed, [1, 3])
+        self._run_timers(10)
+        self.assertEqual(self.processed, [1, 3, 4])
+
+        # Past the window, processed immediately
+        self.now = 20
+        self.throttle.submit('aa', 5, self._process, 5)
+        self.assertEqual(self.processed, [1, 3, 4, 5])
+
+    def test_keys_are_independent(self):
+        self.throttle.submit('aa', 5, self._process, 'a1')
+        self.throttle.submit('bb', 5, self._process, 'b1')
+        self.assertEqual(self.processed, ['a1', 'b1'])
+
+    def test_discard_and_prune(self):
+        self.throttle.submit('aa', 5, self._process, 1)
+        self.throttle.submit('aa', 5, self._process, 2)
+        self.throttle.discard('aa')
+        self._run_timers(5)
+        self.assertEqual(self.processed, [1])
+
+        self.throttle.submit('bb', 5, self._process, 1)
+        self.assertEqual(len(self.throttle), 1)
+        self.now = 10
+        self.throttle.prune()
+        self.assertEqual(len(self.throttle), 0)
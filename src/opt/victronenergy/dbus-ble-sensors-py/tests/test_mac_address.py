@@ -0,0 +1,26 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import unittest
+from mac_address import MacAddressCache, mac_to_int, mac_to_str, mac_to_address
+
+
+class TestMacAddress(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_mac_address.py
+
+    def test_conversions(self):
+        self.assertEqual(mac_to_int('01:23:45:AB:CD:EF'), 0x012345abcdef)
+        self.assertEqual(mac_to_int('012345abcdef'), 0x012345abcdef)
+        self.assertEqual(mac_to_str(0x012345abcdef), '012345abcdef')
+        self.assertEqual(mac_to_str(0x1), '000000000001')
+        self.assertEqual(mac_to_address(0x012345abcdef), '01:23:45:AB:CD:EF')
+
+    def test_cache(self):
+        cache = MacAddressCache(max_size=2)
+        self.assertEqual(cache.to_int('00:00:00:00:00:01'), 1)
+        self.assertEqual(cache.to_int('00:00:00:00:00:01'), 1)
+        self.assertEqual(cache.to_int('00:00:00:00:00:02'), 2)
+        self.assertEqual(len(cache), 2)
+        # Bounded
+        self.assertEqual(cache.to_int('00:00:00:00:00:03'), 3)
+        self.assertEqual(len(cache), 1)
@@ -0,0 +1,52 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import unittest
+from payload_cache import PayloadCache
+
+
+class TestPayloadCache(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_payload_cache.py
+
+    def setUp(self):
+        self.cache = PayloadCache(refresh=30)
+
+    def test_duplicates(self):
+        self.assertFalse(self.cache.is_duplicate('aa', b'\x01\x02', 0))
+        self.assertTrue(self.cache.is_duplicate('aa', b'\x01\x02', 1))
+        self.assertTrue(self.cache.is_duplicate('aa', b'\x01\x02', 2))
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_not_recorded(self):
+        # Checking only, i.e. for frames which may still be dropped
+        self.assertFalse(self.cache.is_recorded('aa', b'\x01\x02', 0))
+        self.assertFalse(self.cache.is_recorded('aa', b'\x01\x02', 1))
+        self.assertFalse(self.cache.is_duplicate('aa', b'\x01\x02', 2))
+        self.assertTrue(self.cache.is_recorded('aa', b'\x01\x02', 3))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_changed_payload(self):
+        self.assertFalse(self.cache.is_duplicate('aa', b'\x01\x02', 0))
+        self.assertFalse(self.cache.is_duplicate('aa', b'\x01\x03', 1))
+        self.assertTrue(self.cache.is_duplicate('aa', b'\x01\x03', 2))
+        # Keys are independent
+        self.assertFalse(self.cache.is_duplicate('bb', b'\x01\x03', 3))
+
+    def test_forced_refresh(self):
+        self.assertFalse(self.cache.is_duplicate('aa', b'\x01', 0))
+        self.assertTrue(self.cache.is_duplicate('aa', b'\x01', 29.9))
+        self.assertFalse(self.cache.is_duplicate('aa', b'\x01', 30))
+        self.assertTrue(self.cache.is_duplicate('aa', b'\x01', 31))
+
+    def test_disabled(self):
+        self.cache.refresh = 0
+        self.assertFalse(self.cache.is_duplicate('aa', b'\x01', 0))
+        self.assertFalse(self.cache.is_duplicate('aa', b'\x01', 0))
+
+    def test_prune(self):
+        self.cache.is_duplicate('aa', b'\x01', 0)
+        self.cache.is_duplicate('bb', b'\x01', 20)
+        self.cache.prune(40)
+        self.assertEqual(len(self.cache), 1)
+        self.cache.discard('bb')
+        self.assertEqual(len(self.cache), 0)
@@ -0,0 +1,24 @@
+import sys
+import os
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), '..'))
+import unittest
+from scan_profiles import SCAN_PROFILES, DEFAULT_SCAN_PROFILE, get_scan_profile
+
+
+class TestScanProfiles(unittest.TestCase):
+    # To be executed with command : python3 -m unittest test_scan_profiles.py
+
+    def test_get_scan_profile(self):
+        self.assertEqual(get_scan_profile('discovery').name, 'discovery')
+        self.assertEqual(get_scan_profile('unknown').name, DEFAULT_SCAN_PROFILE)
+        self.assertEqual(get_scan_profile(None).name, DEFAULT_SCAN_PROFILE)
+
+    def test_profiles(self):
+        for profile in SCAN_PROFILES.values():
+            self.assertGreater(profile.processing_window, 0)
+            self.assertGreaterEqual(profile.processing_period, profile.processing_window)
+        self.assertTrue(SCAN_PROFILES['low-power passive'].passive)
+
+    def test_discovery_filters(self):
+        self.assertEqual(SCAN_PROFILES['discovery'].discovery_filters(), {'Transport': 'le', 'DuplicateData': True})
+        self.assertEqual(SCAN_PROFILES['low-power passive'].discovery_filters()['RSSI'], -85)